@@ -2,6 +2,10 @@ from core.state import AgentState
 from utils.date_resolver import resolve_date_expression
 from utils.validation import validate_insert_payload
 from utils.insert_data import insert_transaction
+from utils.write_behind import write_behind_active, enqueue_transaction
+from core.logger import get_logger
+
+logger = get_logger("AddTransaction")
 
 
 def add_transaction_action(state: AgentState) -> AgentState:
@@ -9,20 +13,20 @@ def add_transaction_action(state: AgentState) -> AgentState:
     Add Transaction Action:
     - Validates transaction payload
     - Resolves and normalizes date
-    - Inserts transaction into database
+    - Inserts transaction into database (journaled write-behind when enabled)
     - Appends result entry for response generation
     """
 
-    print("\n===== Add Transaction Action =====")
+    logger.debug("Add Transaction Action started")
 
     current_task = state.get("current_task", {})
     task_payload = current_task.get("entities", {})
 
-    print(f"[AddTransaction] Current task: {current_task}")
+    logger.debug("Current task: %s", current_task)
 
     # 1. Validate input (NON-FATAL)
     validation_result = validate_insert_payload(task_payload)
-    print(f"[AddTransaction] Validation result: {validation_result}")
+    logger.debug("Validation result: %s", validation_result)
 
     if not validation_result["valid"]:
         error_entry = {
@@ -36,16 +40,16 @@ def add_transaction_action(state: AgentState) -> AgentState:
             "fatal": False
         }
 
-        print("[AddTransaction] Validation failed")
+        logger.warning("Validation failed")
 
         return {
-            "results": state.get("results", []) + [error_entry],
+            "results": [error_entry],
             "should_continue": True
         }
 
     # 2. Extract clean payload
     clean_payload = validation_result["clean_data"]
-    print(f"[AddTransaction] Clean payload: {clean_payload}")
+    logger.debug("Clean payload: %s", clean_payload)
 
     # 3. Resolve date (NON-FATAL, external boundary)
     try:
@@ -63,16 +67,21 @@ def add_transaction_action(state: AgentState) -> AgentState:
             "fatal": False
         }
 
-        print(f"[AddTransaction] Date resolution failed: {e}")
+        logger.warning("Date resolution failed: %s", e)
 
         return {
-            "results": state.get("results", []) + [error_entry],
+            "results": [error_entry],
             "should_continue": True
         }
 
     # 4. Insert into database (SYSTEM BOUNDARY)
+    # Write-behind: journaled locally and acknowledged with a provisional ID,
+    # flushed to Supabase in the background
     try:
-        insert_result = insert_transaction(clean_payload)
+        if write_behind_active():
+            insert_result = enqueue_transaction(clean_payload)
+        else:
+            insert_result = insert_transaction(clean_payload)
         transaction_id = insert_result.get("transaction_id")
     except Exception as e:
         error_entry = {
@@ -86,14 +95,14 @@ def add_transaction_action(state: AgentState) -> AgentState:
             "fatal": False
         }
 
-        print(f"[AddTransaction] Database insert failed: {e}")
+        logger.warning("Database insert failed: %s", e)
 
         return {
-            "results": state.get("results", []) + [error_entry],
+            "results": [error_entry],
             "should_continue": True
         }
 
-    print(f"[AddTransaction] Inserted transaction_id={transaction_id}")
+    logger.info("Inserted transaction_id=%s", transaction_id)
 
     # 5. Build success result entry
     result_entry = {
@@ -106,10 +115,13 @@ def add_transaction_action(state: AgentState) -> AgentState:
         "date": clean_payload["date_of_transaction"]
     }
 
-    print(f"[AddTransaction] Result entry: {result_entry}")
+    if insert_result.get("provisional"):
+        result_entry["provisional"] = True
+
+    logger.debug("Result entry: %s", result_entry)
 
     return {
-        "results": state.get("results", []) + [result_entry],
+        "results": [result_entry],
         "should_continue": True
     }
 
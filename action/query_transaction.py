@@ -1,24 +1,29 @@
+import asyncio
 from core.state import AgentState
 from utils.validation import validate_select_sql
-from utils.generate_sql_query import generate_sql_query
-from utils.execute_sql_query import execute_select_query
+from utils.generate_sql_query import generate_sql_query, agenerate_sql_query
+from utils.rollup_router import execute_query_routed
+from utils.sql_translation_cache import lookup_sql_translation, store_sql_translation
+from utils.write_behind import flush_before_read
+from utils.result_shaping import apply_row_limit, shape_query_result
+from core.logger import get_logger
 
+logger = get_logger("QueryTransactions")
 
-def query_transaction_action(state: AgentState) -> AgentState:
+
+def prepare_query(state: AgentState):
     """
-    Query Transactions Action:
-    - Uses LLM to generate SQL from natural language
-    - Validates SQL
-    - Executes SQL
-    - Appends result rows
+    Returns:
+        (natural_language_query, None) when the query should be run
+        (None, state_update) when it ends early
     """
 
-    print("\n===== Query Transactions Action =====")
+    logger.debug("Query Transactions Action started")
 
     current_task = state.get("current_task", {})
     task_payload = current_task.get("entities", {})
 
-    print(f"[QueryTransactions] Current task: {current_task}")
+    logger.debug("Current task: %s", current_task)
 
     # 0. Ambiguous query (NON-FATAL)
     if task_payload.get("ambiguous", False) is True:
@@ -32,28 +37,34 @@ def query_transaction_action(state: AgentState) -> AgentState:
             "fatal": False
         }
 
-        return {
-            "results": state.get("results", []) + [error_entry],
+        return None, {
+            "results": [error_entry],
             "should_continue": True
         }
 
     natural_language_query = task_payload.get("custom_query", "").strip()
-    print(f"[QueryTransactions] User query: {natural_language_query}")
+    logger.debug("User query: %s", natural_language_query)
+
+    return natural_language_query, None
 
-    # 1. Generate SQL via LLM
-    sql, llm_error = generate_sql_query(natural_language_query)
 
+def check_generated_sql(state: AgentState, sql, llm_error):
+    """
+    Returns:
+        (clean_sql, None) when the generated SQL is safe to execute
+        (None, state_update) when generation or validation failed
+    """
     if llm_error:
-        return {
-            "results": state.get("results", []) + [llm_error],
+        return None, {
+            "results": [llm_error],
             "should_continue": True
         }
 
-    print(f"[QueryTransactions] Generated SQL:\n{sql}")
+    logger.debug("Generated SQL: %s", sql)
 
     # 2. Validate SQL (NON-FATAL)
     validation_result = validate_select_sql(sql)
-    print(f"[QueryTransactions] SQL validation result: {validation_result}")
+    logger.debug("SQL validation result: %s", validation_result)
 
     if not validation_result["valid"]:
         error_entry = {
@@ -64,51 +75,126 @@ def query_transaction_action(state: AgentState) -> AgentState:
             "fatal": False
         }
 
-        print("[QueryTransactions] SQL validation failed")
+        logger.warning("SQL validation failed")
 
-        return {
-            "results": state.get("results", []) + [error_entry],
+        return None, {
+            "results": [error_entry],
             "should_continue": True
         }
 
-    clean_sql = validation_result["clean_data"]
+    return validation_result["clean_data"], None
 
-    # 3. Execute SQL (SYSTEM BOUNDARY)
-    try:
-        rows = execute_select_query(clean_sql)
-    except RuntimeError as e:
-        error_entry = {
-            "type": "error",
-            "source": "query_transactions",
-            "message": str(e),
-            "fatal": False
-        }
 
-        print(f"[QueryTransactions] SQL execution failed: {e}")
+def execution_failed(state: AgentState, e: Exception) -> AgentState:
+    error_entry = {
+        "type": "error",
+        "source": "query_transactions",
+        "message": str(e),
+        "fatal": False
+    }
 
-        return {
-            "results": state.get("results", []) + [error_entry],
-            "should_continue": True
-        }
+    logger.warning("SQL execution failed: %s", e)
 
-    print(f"[QueryTransactions] Returned {len(rows)} rows")
+    return {
+        "results": [error_entry],
+        "should_continue": True
+    }
 
-    # 4. Build success result entry
+
+def build_query_result(state: AgentState, natural_language_query: str, clean_sql: str, shaped, unflushed) -> AgentState:
+    logger.info("Returned %s rows", shaped.get('row_count', len(shaped['data_fetched_from_database'])))
+
+    # 4. Build success result entry (rows capped, summarized and column-encoded by shape_query_result)
     result_entry = {
         "type": "query_transactions",
         "custom_query": natural_language_query,
         "sql": clean_sql,
-        "data_fetched_from_database": rows
+        **shaped
     }
 
-    print(f"[QueryTransactions] Result entry: {result_entry}")
+    # Added this session but not yet in the database (write-behind flush still retrying)
+    if unflushed:
+        result_entry["recent_transactions_not_in_database_yet"] = unflushed
+
+    logger.debug("Result entry: %s", result_entry)
 
     return {
-        "results": state.get("results", []) + [result_entry],
+        "results": [result_entry],
         "should_continue": True
     }
 
 
+def query_transaction_action(state: AgentState) -> AgentState:
+    """
+    Query Transactions Action:
+    - Reuses a cached translation for equivalent queries, otherwise
+      uses LLM to generate SQL from natural language
+    - Validates SQL
+    - Executes SQL (period aggregates are answered from the category rollups)
+    - Caps and summarizes the rows for the responder
+    - Appends result rows
+    """
+    natural_language_query, early_result = prepare_query(state)
+    if early_result:
+        return early_result
+
+    # 1. Reuse a cached translation, or generate SQL via LLM
+    clean_sql = lookup_sql_translation(natural_language_query)
+
+    if clean_sql is None:
+        sql, llm_error = generate_sql_query(natural_language_query)
+
+        clean_sql, early_result = check_generated_sql(state, sql, llm_error)
+        if early_result:
+            return early_result
+
+        store_sql_translation(natural_language_query, clean_sql)
+
+    # 3. Execute SQL (SYSTEM BOUNDARY), after flushing journaled inserts
+    unflushed = flush_before_read()
+    try:
+        rows = execute_query_routed(apply_row_limit(clean_sql))["rows"]
+    except RuntimeError as e:
+        return execution_failed(state, e)
+
+    shaped = shape_query_result(clean_sql, rows)
+
+    return build_query_result(state, natural_language_query, clean_sql, shaped, unflushed)
+
+
+async def aquery_transaction_action(state: AgentState) -> AgentState:
+    """
+    Async version of query_transaction_action.
+    The LLM call is awaited; the blocking Supabase RPC runs in a worker thread.
+    """
+    natural_language_query, early_result = prepare_query(state)
+    if early_result:
+        return early_result
+
+    # 1. Reuse a cached translation, or generate SQL via LLM
+    clean_sql = lookup_sql_translation(natural_language_query)
+
+    if clean_sql is None:
+        sql, llm_error = await agenerate_sql_query(natural_language_query)
+
+        clean_sql, early_result = check_generated_sql(state, sql, llm_error)
+        if early_result:
+            return early_result
+
+        store_sql_translation(natural_language_query, clean_sql)
+
+    # 3. Execute SQL (SYSTEM BOUNDARY), after flushing journaled inserts
+    unflushed = await asyncio.to_thread(flush_before_read)
+    try:
+        rows = (await asyncio.to_thread(execute_query_routed, apply_row_limit(clean_sql)))["rows"]
+    except RuntimeError as e:
+        return execution_failed(state, e)
+
+    shaped = await asyncio.to_thread(shape_query_result, clean_sql, rows)
+
+    return build_query_result(state, natural_language_query, clean_sql, shaped, unflushed)
+
+
 # from core.state import AgentState
 # from utils.validation import validate_select_sql
 # from utils.generate_sql_query import generate_sql_query
@@ -1,22 +1,32 @@
 import json
+from langgraph.config import get_stream_writer
 from core.state import AgentState
-from core.llm import llm_call
+from core.llm import llm_call, allm_call, llm_stream, allm_stream
 from prompts.responder import (
     NORMAL_CONVERSATION_PROMPT,
     UNKNOWN_PROMPT,
     FINANCIAL_PROMPT
 )
+from core.logger import get_logger
 
+logger = get_logger("ResponseGenerator")
 
-def response_generator_action(state: AgentState) -> AgentState:
+# Cache TTL per response type (seconds). Financial summaries embed fresh
+# operation results (new transaction ids, live totals) and are never cached.
+RESPONSE_CACHE_TTL = {
+    "respond_to_user_convo": 60 * 60,
+    "respond_to_user_unknown": 24 * 60 * 60
+}
+
+
+def build_response_prompt(state: AgentState):
     """
-    Final response generator node:
-    - Reads accumulated results
-    - Uses LLM to craft a user-facing message
-    - Terminates the workflow
+    Returns:
+        (response_prompt, None) when the LLM should write the reply
+        (None, state_update) when a fatal error short-circuits the LLM
     """
 
-    print("\n\n===== Response Generator Node =====\n")
+    logger.debug("Response Generator Node started")
 
     
     execution_results = state.get("results", [])
@@ -24,9 +34,9 @@ def response_generator_action(state: AgentState) -> AgentState:
     # 0. If a fatal error exists, respond directly (NO LLM)
     for result in execution_results:
         if result.get("type") == "error" and result.get("fatal") is True:
-            print("[ResponseGenerator] Fatal error detected. Skipping LLM response.")
+            logger.warning("Fatal error detected. Skipping LLM response.")
 
-            return {
+            return None, {
                 "final_output": result.get(
                     "message",
                     "A critical error occurred while processing your request."
@@ -54,10 +64,9 @@ SYSTEM INSTRUCTIONS:
 {UNKNOWN_PROMPT}"""
 
     else:
-        print(f"[ResponseGenerator] Results to summarize: {execution_results}")
-
-        results_summary_json = json.dumps(execution_results, indent=2)
-        print(f"[ResponseGenerator] Results JSON:\n{results_summary_json}")
+        # Compact separators: query rows are column-encoded lists, indenting would put every value on its own line
+        results_summary_json = json.dumps(execution_results, separators=(",", ":"), default=str)
+        logger.debug("Results JSON (%d chars): %s", len(results_summary_json), results_summary_json)
 
         response_prompt = f"""USER INPUT: "{user_input}"
 
@@ -67,20 +76,26 @@ RESULTS OF OPERATIONS:
 SYSTEM INSTRUCTIONS:
 {FINANCIAL_PROMPT}"""
 
-    print("\n[ResponseGenerator] Prompt sent to LLM!!!!\n")
+    logger.debug("Prompt built (%d chars)", len(response_prompt))
+
+    return response_prompt, None
 
-    llm_output_text, llm_error = llm_call(response_prompt)
 
+def response_cache_ttl(state: AgentState):
+    return RESPONSE_CACHE_TTL.get(state.get("current_task", {}).get("type"))
+
+
+def finish_response(llm_output_text, llm_error) -> AgentState:
     # 2. LLM failure fallback
     if llm_error:
-        print(f"[ResponseGenerator] LLM failed: {llm_error}")
+        logger.warning("LLM failed: %s", llm_error)
 
         return {
             "final_output": f"I ran into an issue while generating the response: {llm_error.get('message', 'Unknown error')}.\n.But the operations were processed. Please ask to fetch recent transactions if necessary.",
             "should_continue": False
         }
 
-    print(f"\n[ResponseGenerator] Final Response: {llm_output_text}")
+    logger.info("Final Response: %s", llm_output_text)
 
     # 3. End the workflow
     return {
@@ -89,6 +104,51 @@ SYSTEM INSTRUCTIONS:
     }
 
 
+def token_emitter():
+    """
+    Returns a callback that forwards LLM chunks as custom stream events ({"token": text}).
+    Callers see them with graph.stream(..., stream_mode="custom").
+    """
+    stream_writer = get_stream_writer()
+    return lambda text: stream_writer({"token": text})
+
+
+def response_generator_action(state: AgentState) -> AgentState:
+    """
+    Final response generator node:
+    - Reads accumulated results
+    - Uses LLM to craft a user-facing message
+    - Streams it token by token when state["stream_response"] is set
+    - Terminates the workflow
+    """
+    response_prompt, early_result = build_response_prompt(state)
+    if early_result:
+        return early_result
+
+    if state.get("stream_response"):
+        llm_output_text, llm_error = llm_stream(response_prompt, token_emitter(), cache_ttl=response_cache_ttl(state))
+    else:
+        llm_output_text, llm_error = llm_call(response_prompt, cache_ttl=response_cache_ttl(state))
+
+    return finish_response(llm_output_text, llm_error)
+
+
+async def aresponse_generator_action(state: AgentState) -> AgentState:
+    """
+    Async version of response_generator_action.
+    """
+    response_prompt, early_result = build_response_prompt(state)
+    if early_result:
+        return early_result
+
+    if state.get("stream_response"):
+        llm_output_text, llm_error = await allm_stream(response_prompt, token_emitter(), cache_ttl=response_cache_ttl(state))
+    else:
+        llm_output_text, llm_error = await allm_call(response_prompt, cache_ttl=response_cache_ttl(state))
+
+    return finish_response(llm_output_text, llm_error)
+
+
 # import json
 # from core.state import AgentState
 # from core.llm import llm_call
@@ -1,166 +1,241 @@
+from typing import Dict, Any, List, Optional
 from core.state import AgentState
-import pickle 
-import sqlite3
 import pandas as pd 
 from dotenv import load_dotenv 
-import os 
+from utils.model_registry import get_prediction_model
+from utils.forest_inference import get_compiled_forest
+from utils.category_totals import get_category_totals
+from utils.write_behind import get_pending_transactions
+from core.logger import get_logger
 
 load_dotenv() 
 
+logger = get_logger("PredictionAgent")
+
+# All available categories
+ALL_CATEGORIES = [
+    "groceries", "transport", "eating_out", "entertainment",
+    "utilities", "healthcare", "education", "miscellaneous"
+]
+
+# Category → model spending feature (proper capitalization for model)
+CATEGORY_FEATURE_MAP = {
+    "groceries": "Groceries",
+    "transport": "Transport",
+    "eating_out": "Eating_Out",
+    "entertainment": "Entertainment",
+    "utilities": "Utilities",
+    "healthcare": "Healthcare",
+    "education": "Education",
+    "miscellaneous": "Miscellaneous"
+}
+
+# Category → model prediction target
+PREDICTION_TARGET_MAP = {
+    "groceries": "Potential_Savings_Groceries",
+    "transport": "Potential_Savings_Transport",
+    "eating_out": "Potential_Savings_Eating_Out",
+    "entertainment": "Potential_Savings_Entertainment",
+    "utilities": "Potential_Savings_Utilities",
+    "healthcare": "Potential_Savings_Healthcare",
+    "education": "Potential_Savings_Education",
+    "miscellaneous": "Potential_Savings_Miscellaneous"
+}
+
+# Default values for the non-spending features: the base column set of every scenario
+DEFAULT_FEATURES = {
+    'Income': 20000.0,
+    'Age': 30.0,
+    'Dependents': 1.0,
+    'Rent': 20000.0,
+    'Loan_Repayment': 5000.0,
+    'Insurance': 2000.0,
+    'Desired_Savings_Percentage': 20.0,
+    'Desired_Savings': 10000.0,
+    'Disposable_Income': 33000.0,
+    'Savings_Rate': 20.0,
+    'Occupation_Professional': True,
+    'Occupation_Retired': False,
+    'Occupation_Self Employed': False,
+    'Occupation_Student': False,
+    'Occupation_Unknown': False,
+    'City_Tier_TIER_1': True,
+    'City_Tier_TIER_2': False,
+    'City_Tier_TIER_3': False,
+    'City_Tier_UNKNOWN': False
+}
+
+
+def get_spending_features() -> Dict[str, float]:
+    """
+    Reads category-wise spending (incrementally maintained totals, one row per category)
+    as model features, plus journaled transactions not yet flushed to Supabase.
+    Falls back to zero spending if the totals can't be read.
+    """
+    # Initialize all categories with 0
+    spending_data = {CATEGORY_FEATURE_MAP[cat]: 0.0 for cat in ALL_CATEGORIES}
+
+    try:
+        category_totals = get_category_totals()
+    except Exception as e:
+        logger.warning("Error fetching transaction data: %s", e)
+        return spending_data
+
+    # Fill in actual spending data
+    for category_lower, total_spending in category_totals.items():
+        if category_lower in CATEGORY_FEATURE_MAP:
+            spending_data[CATEGORY_FEATURE_MAP[category_lower]] = total_spending
+
+    for pending in get_pending_transactions():
+        category_lower = pending["category"].lower()
+        if category_lower in CATEGORY_FEATURE_MAP:
+            spending_data[CATEGORY_FEATURE_MAP[category_lower]] += float(pending["amount"])
+
+    logger.debug("Spending data: %s", spending_data)
+    return spending_data
+
+
+def score_feature_rows(model_package: Dict[str, Any], feature_rows: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    """
+    Scores many feature rows with one vectorised predict call.
+
+    Args:
+        model_package: Entry returned by get_prediction_model()
+        feature_rows: Feature dicts keyed by model feature name
+
+    Returns:
+        One {category: predicted_savings} dict per row, in input order
+    """
+    metadata = model_package['metadata']
+    feature_names = metadata['feature_names']
+    target_names = metadata['target_names']
+    compiled_forest = get_compiled_forest(model_package)
+
+    if compiled_forest is not None:
+        # Array-backed forest: feature order precomputed, no DataFrame or sklearn overhead
+        predictions_matrix = compiled_forest.predict(compiled_forest.vectorize_many(feature_rows))
+    else:
+        # Create DataFrame with correct feature order
+        input_df = pd.DataFrame(feature_rows, columns=feature_names)
+        logger.debug("Input features shape: %s", input_df.shape)
+        predictions_matrix = model_package['model'].predict(input_df)
+
+    target_indexes = {
+        cat: target_names.index(target_name)
+        for cat, target_name in PREDICTION_TARGET_MAP.items()
+        if target_name in target_names
+    }
+
+    return [
+        {cat: round(float(predictions_array[idx]), 2) for cat, idx in target_indexes.items()}
+        for predictions_array in predictions_matrix
+    ]
+
+
+def predict_savings_scenarios(
+    scenarios: List[Dict[str, Any]],
+    base_features: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Batched what-if scoring: each scenario is applied on top of one base feature
+    row and all of them are scored in a single predict call.
+
+    Each scenario is a dict with optional keys:
+        "name": label echoed back in the result
+        "set": {feature: value} absolute overrides (e.g. {"Income": 40000.0}, or a full user row)
+        "scale": {feature: factor} multipliers on the base value (e.g. {"Eating_Out": 0.8})
+
+    Args:
+        scenarios: Scenario dicts as described above
+        base_features: Base row; defaults to DEFAULT_FEATURES plus the current spending totals
+
+    Returns:
+        [{"name", "features", "predictions": {category: predicted_savings}}, ...] in input order
+
+    Raises:
+        RuntimeError: If the model can't be loaded
+        ValueError: If a scenario references an unknown feature
+    """
+    model_package = get_prediction_model()
+    known_features = set(model_package['metadata']['feature_names'])
+
+    if base_features is None:
+        base_features = {**DEFAULT_FEATURES, **get_spending_features()}
+
+    feature_rows = []
+    for scenario in scenarios:
+        overrides = scenario.get("set", {})
+        factors = scenario.get("scale", {})
+
+        unknown_features = (set(overrides) | set(factors)) - known_features
+        if unknown_features:
+            raise ValueError(f"Unknown features in scenario {scenario.get('name')}: {sorted(unknown_features)}")
+
+        row = {**base_features, **overrides}
+        for feature, factor in factors.items():
+            row[feature] = float(row.get(feature, 0.0)) * factor
+        feature_rows.append(row)
+
+    if not feature_rows:
+        return []
+
+    logger.info("Scoring %s scenarios in one batch", len(feature_rows))
+    batch_predictions = score_feature_rows(model_package, feature_rows)
+
+    return [
+        {
+            "name": scenario.get("name", f"scenario_{index}"),
+            "features": row,
+            "predictions": predictions
+        }
+        for index, (scenario, row, predictions) in enumerate(zip(scenarios, feature_rows, batch_predictions))
+    ]
+
 
 def prediction_savings_action(state: AgentState) -> AgentState:
     """
     Prediction Agent:
     - Reads categories requested by user
-    - Loads RF model and fetches transaction data from SQLite
+    - Gets the shared RF model from the model registry and reads per-category spending totals
     - Computes ML-based next-month savings predictions
     - Updates memory
     - Appends results for responder
     """
-    print("\n===== Prediction Agent Node =====")
+    logger.debug("Prediction Agent Node started")
     current_task = state.get("current_task", {})
     entities = current_task.get("entities", {})
     categories_requested = entities.get("categories")
     
-    print(f"[Prediction Agent] Current task: {current_task}")
-    
-    # All available categories
-    all_categories = [
-        "groceries", "transport", "eating_out", "entertainment",
-        "utilities", "healthcare", "education", "miscellaneous"
-    ]
+    logger.debug("Current task: %s", current_task)
 
     # Normalize categories list
     if categories_requested == "all":
-        categories = all_categories
+        categories = ALL_CATEGORIES
     else:
-        categories = [c.lower() for c in categories_requested if c.lower() in all_categories]
+        categories = [c.lower() for c in categories_requested if c.lower() in ALL_CATEGORIES]
     
-    print(f"[Prediction Agent] Final category list: {categories}")
+    logger.debug("Final category list: %s", categories)
     
-    # Load the RF model
+    # Get the RF model (loaded once per process, reloaded when the file changes)
     try:
-        with open(os.getenv("PREDICTION_MODEL_PATH"), 'rb') as file:
-            model_package = pickle.load(file)
-            rf_model = model_package['model']
-            metadata = model_package['metadata']
-        print("[Prediction Agent] Model loaded successfully")
+        model_package = get_prediction_model()
+        logger.info("Using model %s", model_package['sha256'][:12])
     except Exception as e:
-        print(f"[Prediction Agent] Error loading model: {e}")
+        logger.warning("Error loading model: %s", e)
         return {
-            "results": state.get("results", []) + [{
+            "results": [{
                 "type": "predict_savings",
                 "error": "Failed to load prediction model"
             }],
             "should_continue": True
         }
     
-    # Fetch category-wise spending from SQLite
-    try:
-        conn = sqlite3.connect('finance.db')
-        cursor = conn.cursor()
-        
-        # Query to get category-wise total spending
-        query = """
-            SELECT 
-                category,
-                SUM(amount) as total_spending
-            FROM transactions
-            GROUP BY category
-        """
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
-        
-        # Create spending dictionary with proper capitalization for model
-        spending_data = {}
-        category_map = {
-            "groceries": "Groceries",
-            "transport": "Transport",
-            "eating_out": "Eating_Out",
-            "entertainment": "Entertainment",
-            "utilities": "Utilities",
-            "healthcare": "Healthcare",
-            "education": "Education",
-            "miscellaneous": "Miscellaneous"
-        }
-        
-        # Initialize all categories with 0
-        for cat in all_categories:
-            spending_data[category_map[cat]] = 0.0
-        
-        # Fill in actual spending data
-        for row in results:
-            category_lower = row[0].lower()
-            if category_lower in category_map:
-                spending_data[category_map[category_lower]] = float(row[1])
-        
-        print(f"[Prediction Agent] Spending data: {spending_data}")
-        
-    except Exception as e:
-        print(f"[Prediction Agent] Error fetching transaction data: {e}")
-        spending_data = {
-            "Groceries": 0.0, "Transport": 0.0, "Eating_Out": 0.0,
-            "Entertainment": 0.0, "Utilities": 0.0, "Healthcare": 0.0,
-            "Education": 0.0, "Miscellaneous": 0.0
-        }
-    
-    # Set default values for other features
-    default_features = {
-        'Income': 20000.0,
-        'Age': 30.0,
-        'Dependents': 1.0,
-        'Rent': 20000.0,
-        'Loan_Repayment': 5000.0,
-        'Insurance': 2000.0,
-        'Desired_Savings_Percentage': 20.0,
-        'Desired_Savings': 10000.0,
-        'Disposable_Income': 33000.0,
-        'Savings_Rate': 20.0,
-        'Occupation_Professional': True,
-        'Occupation_Retired': False,
-        'Occupation_Self Employed': False,
-        'Occupation_Student': False,
-        'Occupation_Unknown': False,
-        'City_Tier_TIER_1': True,
-        'City_Tier_TIER_2': False,
-        'City_Tier_TIER_3': False,
-        'City_Tier_UNKNOWN': False
-    }
-    
     # Merge spending data with defaults
-    input_features = {**default_features, **spending_data}
-    
-    # Create DataFrame with correct feature order
-    feature_names = metadata['feature_names']
-    input_df = pd.DataFrame([input_features], columns=feature_names)
-    
-    print(f"[Prediction Agent] Input features shape: {input_df.shape}")
+    input_features = {**DEFAULT_FEATURES, **get_spending_features()}
     
-    # Make predictions
+    # Make predictions (a batch of one row)
     try:
-        predictions_array = rf_model.predict(input_df)[0]
-        target_names = metadata['target_names']
-        
-        # Map all predictions from model
-        all_predictions = {}
-        prediction_map = {
-            "groceries": "Potential_Savings_Groceries",
-            "transport": "Potential_Savings_Transport",
-            "eating_out": "Potential_Savings_Eating_Out",
-            "entertainment": "Potential_Savings_Entertainment",
-            "utilities": "Potential_Savings_Utilities",
-            "healthcare": "Potential_Savings_Healthcare",
-            "education": "Potential_Savings_Education",
-            "miscellaneous": "Potential_Savings_Miscellaneous"
-        }
-        
-        # Extract ALL predictions from model
-        for cat, target_name in prediction_map.items():
-            if target_name in target_names:
-                idx = target_names.index(target_name)
-                all_predictions[cat] = round(float(predictions_array[idx]), 2)
+        all_predictions = score_feature_rows(model_package, [input_features])[0]
         
         # Filter to only requested categories
         category_predictions = {
@@ -169,11 +244,11 @@ def prediction_savings_action(state: AgentState) -> AgentState:
             if cat in all_predictions
         }
         
-        print(f"[Prediction Agent] All predictions: {all_predictions}")
-        print(f"[Prediction Agent] Filtered predictions for requested categories: {category_predictions}")
+        logger.debug("All predictions: %s", all_predictions)
+        logger.debug("Filtered predictions for requested categories: %s", category_predictions)
         
     except Exception as e:
-        print(f"[Prediction Agent] Error making predictions: {e}")
+        logger.warning("Error making predictions: %s", e)
         category_predictions = {cat: 0.0 for cat in categories}
     
     # Add result for responder
@@ -183,10 +258,9 @@ def prediction_savings_action(state: AgentState) -> AgentState:
         "predictions": category_predictions,
         "type_of_data": "this is prediction done for SAVINGS for NEXT MONTH, not how much user NEED"
     }
-    updated_results = state.get("results", []) + [result_entry]
-    print(f"[Prediction Agent] Result entry: {result_entry}")
+    logger.debug("Result entry: %s", result_entry)
     
     return {
-        "results": updated_results,
+        "results": [result_entry],
         "should_continue": True
-    }
\ No newline at end of file
+    }
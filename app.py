@@ -1,5 +1,6 @@
 import streamlit as st 
 from core.graph import build_graph
+from utils.write_behind import start_flush_worker
 from datetime import datetime 
 from db.supabase_functions import (
     create_new_chat, 
@@ -19,6 +20,9 @@ if 'app' not in st.session_state:
     st.session_state.app = build_graph()
     print("[Streamlit] Agent initialized.")
 
+# Flushes journaled transactions, including any left over from a previous run
+start_flush_worker()
+
 # ==== SESSION STATE INITIALIZATION ====
 if 'current_chat_id' not in st.session_state:
     st.session_state.current_chat_id = None
@@ -36,14 +40,40 @@ if 'agent_state' not in st.session_state:
         "today_date_context": today,
         "tasks": [],
         "tasks_count": 0,
+        "task_cursor": 0,
         "current_task": None,
         "results": [],
         "route_to": None,
         "final_output": "",
-        "should_continue": True
+        "should_continue": True,
+        "stream_response": True
     }
 
 # ==== HELPER FUNCTIONS ====
+def stream_agent_response(state: dict, final_state: dict, thinking_placeholder):
+    """
+    Runs the agent in streaming mode and yields response tokens as they arrive.
+    The finished graph state is stored into final_state for the caller.
+    """
+    streamed_text = ""
+
+    for mode, chunk in st.session_state.app.stream(state, stream_mode=["custom", "values"]):
+        if mode == "values":
+            final_state.update(chunk)
+        elif "token" in chunk:
+            if not streamed_text:
+                thinking_placeholder.empty()
+            streamed_text += chunk["token"]
+            yield chunk["token"]
+
+    thinking_placeholder.empty()
+
+    # Nothing streamed (fatal error path) or the stream broke midway → show the final output
+    final_output = final_state.get("final_output") or "No response generated."
+    if final_output != streamed_text:
+        yield ("\n\n" if streamed_text else "") + final_output
+
+
 def load_chat(chat_id: str):
     """Load a chat from Supabase and update session state"""
     messages = get_chat_messages(chat_id)
@@ -77,11 +107,13 @@ def start_new_chat():
         "today_date_context": today,
         "tasks": [],
         "tasks_count": 0,
+        "task_cursor": 0,
         "current_task": None,
         "results": [],
         "route_to": None,
         "final_output": "",
-        "should_continue": True
+        "should_continue": True,
+        "stream_response": True
     }
 
 
@@ -166,12 +198,14 @@ if prompt := st.chat_input("Type your message..."):
     stm.append({"role": "human", "content": prompt})
     state["short_term_memory"] = stm[-10:]
     
-    # Run agent with spinner
+    # Run agent, streaming the response as it is generated
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            final_state = st.session_state.app.invoke(state)
-            response = final_state.get("final_output", "No response generated.")
-            st.markdown(response)
+        thinking_placeholder = st.empty()
+        thinking_placeholder.markdown("_Thinking..._")
+
+        final_state = {}
+        st.write_stream(stream_agent_response(state, final_state, thinking_placeholder))
+        response = final_state.get("final_output") or "No response generated."
     
     # Update chat history
     st.session_state.messages.append({"role": "assistant", "content": response})
@@ -196,11 +230,13 @@ if prompt := st.chat_input("Type your message..."):
         "today_date_context": state["today_date_context"],
         "tasks": [],
         "tasks_count": 0,
+        "task_cursor": 0,
         "current_task": None,
         "results": [],
         "route_to": None,
         "final_output": "",
-        "should_continue": True
+        "should_continue": True,
+        "stream_response": state.get("stream_response", True)
     }
     
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,216 @@
+import os
+import re
+from typing import Optional, List, Dict, Any
+from dotenv import load_dotenv
+from utils.validation import ALLOWED_CATEGORIES
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("FastPath")
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+
+# Below this the message goes to the Planner LLM
+FAST_PATH_MIN_CONFIDENCE = 0.85
+
+
+# ==== VOCABULARY ====
+GREETING_PATTERN = re.compile(
+    r"^(hi|hii|hello|hey|hey there|hi there|hello there|yo|"
+    r"good (morning|afternoon|evening)|thanks|thank you|thanks a lot|thank you so much)"
+    r"[\s!.,]*$"
+)
+
+# Words that map to a category on their own. Exact category names win over keywords.
+CATEGORY_KEYWORDS = {
+    "groceries": {"groceries", "grocery", "vegetables", "veggies", "fruits", "fruit", "milk", "mangoes", "supermarket"},
+    "transport": {"transport", "uber", "ola", "taxi", "cab", "bus", "train", "metro", "petrol", "fuel", "auto", "parking"},
+    "eating_out": {"eating out", "eating_out", "restaurant", "dinner", "lunch", "breakfast", "pizza", "burger", "cafe", "coffee", "swiggy", "zomato", "takeaway"},
+    "entertainment": {"entertainment", "movie", "movies", "cinema", "netflix", "concert", "games", "spotify"},
+    "utilities": {"utilities", "electricity", "electricity bill", "water bill", "gas bill", "internet", "wifi", "phone bill", "mobile recharge"},
+    "healthcare": {"healthcare", "medicine", "medicines", "doctor", "pharmacy", "hospital", "dentist"},
+    "education": {"education", "books", "course", "tuition", "school fees", "college fees"},
+    "miscellaneous": {"miscellaneous"}
+}
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Phrase → date token understood by resolve_date_expression
+DATE_PHRASES = {
+    "today": "TODAY",
+    "yesterday": "YESTERDAY",
+    "last week": "LAST_WEEK",
+    "this week": "THIS_WEEK",
+    "last month": "LAST_MONTH",
+    "this month": "THIS_MONTH",
+    "last year": "LAST_YEAR",
+    "this year": "THIS_YEAR",
+    **{f"last {day}": f"LAST_{day.upper()}" for day in WEEKDAYS},
+    **{f"this {day}": f"THIS_{day.upper()}" for day in WEEKDAYS},
+}
+
+_DATE_ALTERNATIVES = "|".join(sorted((re.escape(p) for p in DATE_PHRASES), key=len, reverse=True))
+
+EXPENSE_PATTERN = re.compile(
+    r"^(?:i\s+)?(?:spent|spend|paid|pay|add)\s+"
+    r"(?:rs\.?\s*|inr\s*|₹\s*|\$\s*)?(?P<amount>\d+(?:\.\d+)?)\s*(?:rs|rupees|inr|dollars|bucks)?\s+"
+    r"(?:on|for)\s+(?P<description>[a-z][a-z _'-]*?)"
+    r"(?:\s+(?P<date>" + _DATE_ALTERNATIVES + r"|on\s+\d{4}-\d{2}-\d{2}))?"
+    r"[\s!.]*$"
+)
+
+PREDICT_PATTERN = re.compile(
+    r"^(?:please\s+|can you\s+|could you\s+)?(?:predict|forecast|estimate)\s+(?:my\s+)?(?:future\s+)?savings"
+    r"(?:\s+for\s+(?P<categories>[a-z_ ,&]+?))?(?:\s+(?:for\s+)?next month)?[\s!.?]*$"
+)
+
+
+# An assistant question about one of these means a transaction is waiting for the missing piece
+FOLLOW_UP_PATTERN = re.compile(r"\b(amount|how much|date|when|which day|what day|category)\b")
+
+
+def _normalize(user_input: str) -> str:
+    return re.sub(r"\s+", " ", user_input.strip().lower())
+
+
+def _match_category(description: str):
+    """
+    Returns (category, confidence) for a spending description, or (None, 0.0).
+    A description that hits keywords from more than one category is ambiguous.
+    """
+    description = description.strip()
+
+    if description in ALLOWED_CATEGORIES:
+        return description, 1.0
+
+    words = set(description.replace("_", " ").split())
+    matched = set()
+
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if (" " in keyword and keyword in description) or keyword in words:
+                matched.add(category)
+
+    if len(matched) == 1:
+        return matched.pop(), 0.9
+
+    return None, 0.0
+
+
+def _parse_expense(text: str):
+    match = EXPENSE_PATTERN.match(text)
+    if not match:
+        return None, 0.0
+
+    description = match.group("description").strip()
+    category, confidence = _match_category(description)
+    if not category:
+        return None, 0.0
+
+    date_phrase = match.group("date")
+    if date_phrase is None:
+        # No date, or one the rules don't know ("on friday" ends up in the description):
+        # the Planner LLM reads it properly or asks for it
+        return None, 0.0
+
+    if date_phrase.startswith("on ") and date_phrase[3:4].isdigit():
+        date_token = date_phrase[3:]
+    else:
+        date_token = DATE_PHRASES[date_phrase]
+
+    task = {
+        "type": "add_transaction",
+        "entities": {
+            "amount": float(match.group("amount")),
+            "category": category,
+            "description": description,
+            "date_of_transaction": date_token
+        }
+    }
+
+    return [task], confidence
+
+
+def _parse_prediction(text: str):
+    match = PREDICT_PATTERN.match(text)
+    if not match:
+        return None, 0.0
+
+    requested = match.group("categories")
+    if requested is None or requested.strip() in ("all", "all categories", "everything"):
+        return [{"type": "predict_savings", "entities": {"categories": "all"}}], 1.0
+
+    categories = []
+    for part in re.split(r"\s*(?:,|&|\band\b)\s*", requested.strip()):
+        if not part:
+            continue
+        category = part.replace(" ", "_")
+        if category not in ALLOWED_CATEGORIES:
+            return None, 0.0
+        categories.append(category)
+
+    if not categories:
+        return None, 0.0
+
+    return [{"type": "predict_savings", "entities": {"categories": categories}}], 1.0
+
+
+def match_message(user_input: str):
+    """
+    Runs the rule-based parsers on a message, whatever FAST_PATH_ENABLED says.
+
+    Returns:
+        (tasks, confidence), or (None, 0.0) when no rule matches
+    """
+    text = _normalize(user_input or "")
+
+    if GREETING_PATTERN.match(text):
+        return [{"type": "respond_to_user_convo"}], 1.0
+
+    for parser in (_parse_expense, _parse_prediction):
+        tasks, confidence = parser(text)
+        if tasks:
+            return tasks, confidence
+
+    return None, 0.0
+
+
+def awaiting_follow_up(short_term_memory: Optional[List[Dict[str, str]]]) -> bool:
+    """
+    True when the latest assistant message asked for a missing transaction detail,
+    so the new message may complete it and needs the Planner's memory handling.
+    """
+    for message in reversed(short_term_memory or []):
+        if message.get("role") == "assistant":
+            content = (message.get("content") or "").lower()
+            return "?" in content and bool(FOLLOW_UP_PATTERN.search(content))
+    return False
+
+
+def fast_path_plan(user_input: str, short_term_memory: Optional[List[Dict[str, str]]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Deterministic pre-parser for high-frequency messages that don't need the Planner LLM:
+    - greetings / thanks → respond_to_user_convo
+    - single expense with a known date ("spent 250 on groceries yesterday") → add_transaction
+    - "predict savings for all" / "predict my savings for groceries and transport" → predict_savings
+
+    Emits the same task JSON as the planner prompt. Skipped while the assistant is
+    waiting for a follow-up to a partial transaction (see awaiting_follow_up).
+
+    Returns:
+        List of tasks when confident, None when the LLM should plan instead
+    """
+    if not FAST_PATH_ENABLED or not user_input:
+        return None
+
+    if awaiting_follow_up(short_term_memory):
+        logger.debug("Pending follow-up in memory, leaving it to the Planner")
+        return None
+
+    tasks, confidence = match_message(user_input)
+    if tasks and confidence >= FAST_PATH_MIN_CONFIDENCE:
+        logger.info("Matched %s (confidence=%s)", tasks[0]['type'], confidence)
+        return tasks
+
+    return None
@@ -1,22 +1,32 @@
 from langgraph.graph import StateGraph, START, END
 from core.state import AgentState
-from core.planner_agent import planner_agent_node
+from core.tracing import traced_node
+from core.planner_agent import planner_agent_node, aplanner_agent_node
 from core.task_executor import task_executor_node 
-from action.response_generator import response_generator_action 
+from core.parallel_executor import parallel_tasks_node, aparallel_tasks_node
+from action.response_generator import response_generator_action, aresponse_generator_action
 from action.savings_prediction_savings import prediction_savings_action 
 from action.add_transaction import add_transaction_action
-from action.query_transaction import query_transaction_action 
+from action.query_transaction import query_transaction_action, aquery_transaction_action
 
 def build_graph():
+    """
+    Builds the agent graph.
+    LLM-bound nodes carry both a sync and an async implementation, so the compiled
+    graph can run with invoke/stream or with ainvoke/astream. Sync-only nodes are
+    run in a worker thread by LangGraph on the async path.
+    """
     graph = StateGraph(AgentState)
 
-    graph.add_node("Planner", planner_agent_node)
-    graph.add_node("Executor", task_executor_node)
+    # Every node is traced (core/tracing.py); the Planner opens the turn's trace
+    graph.add_node("Planner", traced_node("Planner", planner_agent_node, aplanner_agent_node, starts_turn=True))
+    graph.add_node("Executor", traced_node("Executor", task_executor_node))
 
-    graph.add_node("AddTransaction", add_transaction_action)
-    graph.add_node("QueryTransactions", query_transaction_action)
-    graph.add_node("PredictSavings", prediction_savings_action)
-    graph.add_node("ResponseGenerator", response_generator_action)
+    graph.add_node("AddTransaction", traced_node("AddTransaction", add_transaction_action))
+    graph.add_node("QueryTransactions", traced_node("QueryTransactions", query_transaction_action, aquery_transaction_action))
+    graph.add_node("PredictSavings", traced_node("PredictSavings", prediction_savings_action))
+    graph.add_node("ParallelTasks", traced_node("ParallelTasks", parallel_tasks_node, aparallel_tasks_node))
+    graph.add_node("ResponseGenerator", traced_node("ResponseGenerator", response_generator_action, aresponse_generator_action))
 
     graph.add_edge(START, "Planner")
     graph.add_edge("Planner", "Executor")
@@ -24,6 +34,7 @@ def build_graph():
     graph.add_edge("AddTransaction", "Executor")
     graph.add_edge("QueryTransactions", "Executor")
     graph.add_edge("PredictSavings", "Executor")
+    graph.add_edge("ParallelTasks", "Executor")
     graph.add_edge("ResponseGenerator", END)
 
     graph.add_conditional_edges(
@@ -33,8 +44,9 @@ def build_graph():
             "AddTransaction": "AddTransaction",
             "QueryTransactions": "QueryTransactions",
             "PredictSavings": "PredictSavings",
+            "ParallelTasks": "ParallelTasks",
             "ResponseGenerator": "ResponseGenerator",
         }
     )
 
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
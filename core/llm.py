@@ -1,11 +1,21 @@
 import os
+import re
+import asyncio
 import time
-from itertools import cycle
+import threading
+import weakref
+from collections import deque
 from dotenv import load_dotenv
 from google import genai
+from core.llm_cache import LLM_CACHE_ENABLED, llm_response_cache, make_cache_key
+from core.tracing import record_llm_call, record_llm_attempt, record_llm_wait
+from core.llm_backends import LLM_BACKEND, OFFLINE_BACKENDS, create_client, offline_api_keys
+from core.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger("LLM")
+
 API_KEYS = [
     os.getenv("V_GEMINI_PROJECT_1"),
     os.getenv("V_GEMINI_PROJECT_2"),
@@ -18,84 +28,635 @@ API_KEYS = [
 ]
 API_KEYS = [k for k in API_KEYS if k and k.strip() and k.strip() != "-"]
 
+# Replay / stub backends never reach Gemini; fake keys keep the scheduler in play
+if LLM_BACKEND in OFFLINE_BACKENDS:
+    API_KEYS = offline_api_keys()
+
 MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
 MAX_RETRY_DURATION = 20  # seconds
 
-print(f"[LLM] Loaded {len(API_KEYS)} API keys")
+# Per-key cooldown after a retryable failure (seconds), doubled on each
+# consecutive failure of the same key up to MAX_KEY_COOLDOWN.
+KEY_COOLDOWN_SECONDS = {429: 10, 500: 2, 503: 5, 504: 2}
+MAX_KEY_COOLDOWN = 60
+KEY_ERROR_WINDOW = 60  # seconds of error history kept per key
+
+logger.info("Loaded %s API keys (backend: %s)", len(API_KEYS), LLM_BACKEND)
 
 
 def should_retry_error(code: int) -> bool:
     return code in [429, 500, 503, 504]
 
 
-def llm_call(prompt: str):
+# ==== CLIENT POOL ====
+# One long-lived genai.Client per API key, shared by every thread and
+# Streamlit session in the process, so the HTTP/TLS connection is reused
+# across the Planner, SQL generator and ResponseGenerator hops.
+_client_pool = {}
+_client_pool_stats = {}
+_async_client_pool = weakref.WeakKeyDictionary()
+_client_pool_lock = threading.Lock()
+
+
+def get_client(key_num: int, api_key: str) -> genai.Client:
+    """
+    Returns the pooled client for an API key, creating it on first use.
+    """
+    with _client_pool_lock:
+        client = _client_pool.get(key_num)
+        stats = _client_pool_stats.get(key_num)
+
+        if client is None:
+            client = create_client(api_key)
+            _client_pool[key_num] = client
+            if stats is None:
+                stats = {"created_at": time.time(), "created": 0, "requests": 0, "reused": 0}
+                _client_pool_stats[key_num] = stats
+            stats["created"] += 1
+            logger.debug("Created pooled client for API key #%s", key_num)
+        else:
+            stats["reused"] += 1
+
+        stats["requests"] += 1
+
+    return client
+
+
+def get_async_client(key_num: int, api_key: str):
+    """
+    Returns the pooled async client (client.aio) for an API key on the running event loop.
+    Async connections are bound to the loop that opened them, so the pool is kept per loop.
+    """
+    loop = asyncio.get_running_loop()
+
+    with _client_pool_lock:
+        loop_pool = _async_client_pool.setdefault(loop, {})
+        client = loop_pool.get(key_num)
+        stats = _client_pool_stats.get(key_num)
+
+        if stats is None:
+            stats = {"created_at": time.time(), "created": 0, "requests": 0, "reused": 0}
+            _client_pool_stats[key_num] = stats
+
+        if client is None:
+            client = create_client(api_key)
+            loop_pool[key_num] = client
+            stats["created"] += 1
+            logger.debug("Created pooled async client for API key #%s", key_num)
+        else:
+            stats["reused"] += 1
+
+        stats["requests"] += 1
+
+    return client.aio
+
+
+def get_client_pool_stats() -> dict:
+    """
+    Returns connection reuse stats for the client pool.
+
+    Returns:
+        {
+            "clients": int,
+            "requests": int,
+            "reused": int,
+            "reuse_ratio": float,
+            "per_key": {key_num: {"created_at", "created", "requests", "reused"}}
+        }
+    """
+    with _client_pool_lock:
+        per_key = {key_num: dict(stats) for key_num, stats in _client_pool_stats.items()}
+
+    total_requests = sum(stats["requests"] for stats in per_key.values())
+    total_reused = sum(stats["reused"] for stats in per_key.values())
+
+    return {
+        "clients": len(per_key),
+        "requests": total_requests,
+        "reused": total_reused,
+        "reuse_ratio": (total_reused / total_requests) if total_requests else 0.0,
+        "per_key": per_key
+    }
+
+
+def reset_client(key_num: int) -> None:
+    """
+    Drops the pooled client for a key so the next call builds a fresh one.
+    Used when the underlying connection looks broken. The old client is not
+    closed explicitly because other threads may still be mid-request on it.
+    """
+    with _client_pool_lock:
+        _client_pool.pop(key_num, None)
+        for loop_pool in _async_client_pool.values():
+            loop_pool.pop(key_num, None)
+
+
+# ==== KEY SCHEDULER ====
+# Shared across calls, threads and sessions: every call picks the least-loaded
+# healthy key instead of starting at key #1, and keys that just failed with
+# 429/5xx sit out their cooldown instead of being hammered again.
+_key_states = {
+    key_num: {
+        "in_flight": 0,
+        "successes": 0,
+        "failures": 0,
+        "consecutive_failures": 0,
+        "recent_errors": deque(),
+        "cooldown_until": 0.0,
+        "last_used": 0.0
+    }
+    for key_num in range(1, len(API_KEYS) + 1)
+}
+_key_states_lock = threading.Lock()
+
+
+def _prune_recent_errors(key_state: dict, now: float) -> None:
+    recent_errors = key_state["recent_errors"]
+    while recent_errors and now - recent_errors[0][0] > KEY_ERROR_WINDOW:
+        recent_errors.popleft()
+
+
+def acquire_key():
+    """
+    Picks the least-loaded healthy API key and marks it in flight.
+
+    Returns:
+        (key_num, api_key, 0.0) when a key is available
+        (None, None, wait_seconds) when every key is cooling down
+    """
+    now = time.time()
+
+    with _key_states_lock:
+        healthy_keys = []
+        for key_num, key_state in _key_states.items():
+            _prune_recent_errors(key_state, now)
+            if key_state["cooldown_until"] <= now:
+                healthy_keys.append(key_num)
+
+        if not healthy_keys:
+            earliest = min(key_state["cooldown_until"] for key_state in _key_states.values())
+            return None, None, max(earliest - now, 0.0)
+
+        # Fewest in-flight requests first, then fewest recent errors, then least recently used
+        key_num = min(
+            healthy_keys,
+            key=lambda k: (
+                _key_states[k]["in_flight"],
+                len(_key_states[k]["recent_errors"]),
+                _key_states[k]["last_used"]
+            )
+        )
+
+        key_state = _key_states[key_num]
+        key_state["in_flight"] += 1
+        key_state["last_used"] = now
+
+    return key_num, API_KEYS[key_num - 1], 0.0
+
+
+def release_key(key_num: int, error_code=None, retry_after=None) -> None:
+    """
+    Marks a request on a key as finished and updates its health.
+    A retryable error puts the key into cooldown, honouring retry_after when the API sent one.
+    """
+    now = time.time()
+
+    with _key_states_lock:
+        key_state = _key_states[key_num]
+        key_state["in_flight"] = max(key_state["in_flight"] - 1, 0)
+
+        if error_code is None:
+            key_state["successes"] += 1
+            key_state["consecutive_failures"] = 0
+            return
+
+        key_state["failures"] += 1
+
+        if not should_retry_error(error_code):
+            return
+
+        key_state["consecutive_failures"] += 1
+        key_state["recent_errors"].append((now, error_code))
+        _prune_recent_errors(key_state, now)
+
+        if retry_after is None:
+            base_cooldown = KEY_COOLDOWN_SECONDS.get(error_code, 1)
+            retry_after = min(
+                base_cooldown * (2 ** (key_state["consecutive_failures"] - 1)),
+                MAX_KEY_COOLDOWN
+            )
+
+        key_state["cooldown_until"] = max(key_state["cooldown_until"], now + retry_after)
+
+
+def get_retry_after(error: Exception):
+    """
+    Extracts the server-suggested retry delay (seconds) from a genai error, if any.
+    Looks at the Retry-After header first, then at google.rpc.RetryInfo in the error details.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+
+    if headers:
+        header_value = headers.get("retry-after")
+        try:
+            if header_value is not None:
+                return float(header_value)
+        except (TypeError, ValueError):
+            pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            retry_delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if retry_delay:
+                match = re.match(r"^([0-9.]+)s$", str(retry_delay).strip())
+                if match:
+                    return float(match.group(1))
+
+    return None
+
+
+def get_key_scheduler_stats() -> dict:
+    """
+    Returns a snapshot of every key's health as seen by the scheduler.
+    """
+    now = time.time()
+
+    with _key_states_lock:
+        snapshot = {}
+        for key_num, key_state in _key_states.items():
+            _prune_recent_errors(key_state, now)
+            snapshot[key_num] = {
+                "in_flight": key_state["in_flight"],
+                "successes": key_state["successes"],
+                "failures": key_state["failures"],
+                "recent_errors": len(key_state["recent_errors"]),
+                "cooling_down": key_state["cooldown_until"] > now,
+                "cooldown_remaining": max(key_state["cooldown_until"] - now, 0.0)
+            }
+
+    return snapshot
+
+
+def _no_keys_error() -> dict:
+    return {
+        "type": "error",
+        "source": "llm",
+        "message": " 0 API Keys found. AI service is not configured correctly.",
+        "fatal": True
+    }
+
+
+def _non_retryable_error() -> dict:
+    return {
+        "type": "error",
+        "source": "llm",
+        "message": "The AI engine failed to process your request with unknown non-retryable reason.",
+        "fatal": True
+    }
+
+
+def _stream_interrupted_error() -> dict:
+    return {
+        "type": "error",
+        "source": "llm",
+        "message": "The AI engine stopped responding midway through the answer.",
+        "fatal": True
+    }
+
+
+def _retry_window_exhausted_error(attempt_count: int, error_log: list) -> dict:
+    logger.warning("Max retry duration exceeded. Attempts: %s", attempt_count, extra={"fields": {"errors": error_log}})
+
+    return {
+        "type": "error",
+        "source": "llm",
+        "message": f"All {len(API_KEYS)} API Keys are exhausted within the RETRY WINDOW of {MAX_RETRY_DURATION} seconds. AI engine is temporarily unavailable.",
+        "fatal": True
+    }
+
+
+def _record_attempt_failure(e: Exception, key_num: int, attempt_count: int, error_log: list, attempt_started: float) -> bool:
+    """
+    Releases the key with its failure, logs the attempt and
+    returns True if the call should be retried on another key.
+    """
+    error_code = getattr(e, "code", None)
+    error_message = getattr(e, "message", str(e))
+
+    release_key(key_num, error_code or 0, get_retry_after(e))
+    record_llm_attempt(key_num, attempt_started, error_code=error_code)
+
+    error_log.append({
+        "key_num": key_num,
+        "attempt": attempt_count,
+        "code": error_code,
+        "message": error_message
+    })
+
+    logger.warning("Key #%s failed - Code: %s, Message: %s", key_num, error_code, error_message)
+
+    # No HTTP status → transport-level failure, don't keep reusing that connection
+    if error_code is None:
+        reset_client(key_num)
+
+    return bool(error_code and should_retry_error(error_code))
+
+
+def _wait_for_key(start_time: float, wait_seconds: float):
+    """
+    Returns how long to sleep before the next key frees up,
+    or None if that would overrun the retry window.
+    """
+    remaining = MAX_RETRY_DURATION - (time.time() - start_time)
+    if wait_seconds >= remaining:
+        return None
+
+    logger.info("All keys cooling down. Waiting %.1fs", wait_seconds)
+    record_llm_wait(wait_seconds)
+    return wait_seconds
+
+
+def _cache_lookup(prompt: str, cache_ttl, bypass_cache: bool):
     """
+    Returns (cache_key, cached_text). cache_key is None when this call should not use the cache.
+    """
+    # Record mode: every prompt must reach the model to be recorded
+    if not LLM_CACHE_ENABLED or bypass_cache or not cache_ttl or LLM_BACKEND == "record":
+        record_llm_call(len(prompt), cache_hit=False)
+        return None, None
+
+    cache_key = make_cache_key(MODEL, prompt)
+    cached_text = llm_response_cache.get(cache_key)
+
+    if cached_text is not None:
+        logger.debug("Cache hit")
+
+    record_llm_call(len(prompt), cache_hit=cached_text is not None)
+    return cache_key, cached_text
+
+
+def _cache_store(cache_key, response_text, cache_ttl) -> None:
+    if cache_key and response_text:
+        llm_response_cache.set(cache_key, response_text, cache_ttl)
+
+
+def llm_call(prompt: str, cache_ttl=None, bypass_cache: bool = False):
+    """
+    cache_ttl: seconds to keep the response in the local LLM cache (None → not cached).
+    bypass_cache: skip the cache for this call even if cache_ttl is set.
+
     Returns:
         (response_text, None) on success
         (None, error_entry) on failure
     """
+    cache_key, cached_text = _cache_lookup(prompt, cache_ttl, bypass_cache)
+    if cached_text is not None:
+        return cached_text, None
+
     if not API_KEYS:
-        return None, {
-            "type": "error",
-            "source": "llm",
-            "message": " 0 API Keys found. AI service is not configured correctly.",
-            "fatal": True
-        }
+        return None, _no_keys_error()
 
-    key_cycle = cycle(enumerate(API_KEYS, start=1))
     start_time = time.time()
     attempt_count = 0
     error_log = []
 
     while (time.time() - start_time) < MAX_RETRY_DURATION:
+        key_num, api_key, wait_seconds = acquire_key()
+
+        # Every key is cooling down → wait for the first one to come back
+        if key_num is None:
+            sleep_seconds = _wait_for_key(start_time, wait_seconds)
+            if sleep_seconds is None:
+                break
+            time.sleep(sleep_seconds)
+            continue
+
         attempt_count += 1
-        key_num, api_key = next(key_cycle)
+        attempt_started = time.perf_counter()
 
         try:
-            client = genai.Client(api_key=api_key)
+            client = get_client(key_num, api_key)
             response = client.models.generate_content(
                 model=MODEL,
                 contents=prompt
             )
 
-            print(f"[LLM] Success with API key #{key_num} (attempt {attempt_count})")
+            release_key(key_num)
+            record_llm_attempt(key_num, attempt_started, response_chars=len(response.text or ""))
+            logger.info("Success with API key #%s (attempt %s)", key_num, attempt_count)
+            _cache_store(cache_key, response.text, cache_ttl)
             return response.text, None
 
         except Exception as e:
-            error_code = getattr(e, "code", None)
-            error_message = getattr(e, "message", str(e))
+            if _record_attempt_failure(e, key_num, attempt_count, error_log, attempt_started):
+                continue
+
+            # Non-retryable → stop immediately
+            return None, _non_retryable_error()
+
+    # Retry window exhausted
+    return None, _retry_window_exhausted_error(attempt_count, error_log)
 
-            error_log.append({
-                "key_num": key_num,
-                "attempt": attempt_count,
-                "code": error_code,
-                "message": error_message
-            })
 
-            print(f"[LLM] Key #{key_num} failed - Code: {error_code}, Message: {error_message}")
+async def allm_call(prompt: str, cache_ttl=None, bypass_cache: bool = False):
+    """
+    Async version of llm_call using the pooled clients' aio interface.
+    Same key scheduling, retry window and return contract as llm_call.
 
-            if error_code and should_retry_error(error_code):
-                time.sleep(1)
+    Returns:
+        (response_text, None) on success
+        (None, error_entry) on failure
+    """
+    cache_key, cached_text = _cache_lookup(prompt, cache_ttl, bypass_cache)
+    if cached_text is not None:
+        return cached_text, None
+
+    if not API_KEYS:
+        return None, _no_keys_error()
+
+    start_time = time.time()
+    attempt_count = 0
+    error_log = []
+
+    while (time.time() - start_time) < MAX_RETRY_DURATION:
+        key_num, api_key, wait_seconds = acquire_key()
+
+        # Every key is cooling down → wait for the first one to come back
+        if key_num is None:
+            sleep_seconds = _wait_for_key(start_time, wait_seconds)
+            if sleep_seconds is None:
+                break
+            await asyncio.sleep(sleep_seconds)
+            continue
+
+        attempt_count += 1
+        attempt_started = time.perf_counter()
+
+        try:
+            async_client = get_async_client(key_num, api_key)
+            response = await async_client.models.generate_content(
+                model=MODEL,
+                contents=prompt
+            )
+
+            release_key(key_num)
+            record_llm_attempt(key_num, attempt_started, response_chars=len(response.text or ""))
+            logger.info("Success with API key #%s (attempt %s, async)", key_num, attempt_count)
+            _cache_store(cache_key, response.text, cache_ttl)
+            return response.text, None
+
+        except Exception as e:
+            if _record_attempt_failure(e, key_num, attempt_count, error_log, attempt_started):
                 continue
 
             # Non-retryable → stop immediately
-            return None, {
-                "type": "error",
-                "source": "llm",
-                "message": "The AI engine failed to process your request with unknown non-retryable reason.",
-                "fatal": True
-            }
+            return None, _non_retryable_error()
 
     # Retry window exhausted
-    print(f"[LLM] Max retry duration exceeded. Attempts: {attempt_count}")
-    print(f"[LLM] Error log: {error_log}")
+    return None, _retry_window_exhausted_error(attempt_count, error_log)
 
-    return None, {
-        "type": "error",
-        "source": "llm",
-        "message": f"All {len(API_KEYS)} API Keys are exhausted within the RETRY WINDOW of {MAX_RETRY_DURATION} seconds. AI engine is temporarily unavailable.",
-        "fatal": True
-    }
+
+def llm_stream(prompt: str, on_chunk, cache_ttl=None, bypass_cache: bool = False):
+    """
+    Streaming version of llm_call.
+    Calls on_chunk(text) for every chunk as it arrives and returns the full text at the end.
+    Keys are only rotated before the first chunk is emitted; a failure mid-stream is returned
+    as an error because the caller has already shown part of the answer.
+
+    Returns:
+        (response_text, None) on success
+        (None, error_entry) on failure
+    """
+    cache_key, cached_text = _cache_lookup(prompt, cache_ttl, bypass_cache)
+    if cached_text is not None:
+        on_chunk(cached_text)
+        return cached_text, None
+
+    if not API_KEYS:
+        return None, _no_keys_error()
+
+    start_time = time.time()
+    attempt_count = 0
+    error_log = []
+
+    while (time.time() - start_time) < MAX_RETRY_DURATION:
+        key_num, api_key, wait_seconds = acquire_key()
+
+        # Every key is cooling down → wait for the first one to come back
+        if key_num is None:
+            sleep_seconds = _wait_for_key(start_time, wait_seconds)
+            if sleep_seconds is None:
+                break
+            time.sleep(sleep_seconds)
+            continue
+
+        attempt_count += 1
+        attempt_started = time.perf_counter()
+        text_chunks = []
+
+        try:
+            client = get_client(key_num, api_key)
+            for chunk in client.models.generate_content_stream(
+                model=MODEL,
+                contents=prompt
+            ):
+                if chunk.text:
+                    text_chunks.append(chunk.text)
+                    on_chunk(chunk.text)
+
+            release_key(key_num)
+            record_llm_attempt(key_num, attempt_started, response_chars=sum(len(chunk) for chunk in text_chunks))
+            logger.info("Streamed response with API key #%s (attempt %s, %s chunks)", key_num, attempt_count, len(text_chunks))
+            response_text = "".join(text_chunks)
+            _cache_store(cache_key, response_text, cache_ttl)
+            return response_text, None
+
+        except Exception as e:
+            should_retry = _record_attempt_failure(e, key_num, attempt_count, error_log, attempt_started)
+
+            # Part of the answer is already on screen → can't transparently retry
+            if text_chunks:
+                return None, _stream_interrupted_error()
+
+            if should_retry:
+                continue
+
+            # Non-retryable → stop immediately
+            return None, _non_retryable_error()
+
+    # Retry window exhausted
+    return None, _retry_window_exhausted_error(attempt_count, error_log)
+
+
+async def allm_stream(prompt: str, on_chunk, cache_ttl=None, bypass_cache: bool = False):
+    """
+    Async version of llm_stream.
+
+    Returns:
+        (response_text, None) on success
+        (None, error_entry) on failure
+    """
+    cache_key, cached_text = _cache_lookup(prompt, cache_ttl, bypass_cache)
+    if cached_text is not None:
+        on_chunk(cached_text)
+        return cached_text, None
+
+    if not API_KEYS:
+        return None, _no_keys_error()
+
+    start_time = time.time()
+    attempt_count = 0
+    error_log = []
+
+    while (time.time() - start_time) < MAX_RETRY_DURATION:
+        key_num, api_key, wait_seconds = acquire_key()
+
+        # Every key is cooling down → wait for the first one to come back
+        if key_num is None:
+            sleep_seconds = _wait_for_key(start_time, wait_seconds)
+            if sleep_seconds is None:
+                break
+            await asyncio.sleep(sleep_seconds)
+            continue
+
+        attempt_count += 1
+        attempt_started = time.perf_counter()
+        text_chunks = []
+
+        try:
+            async_client = get_async_client(key_num, api_key)
+            async for chunk in await async_client.models.generate_content_stream(
+                model=MODEL,
+                contents=prompt
+            ):
+                if chunk.text:
+                    text_chunks.append(chunk.text)
+                    on_chunk(chunk.text)
+
+            release_key(key_num)
+            record_llm_attempt(key_num, attempt_started, response_chars=sum(len(chunk) for chunk in text_chunks))
+            logger.info("Streamed response with API key #%s (attempt %s, %s chunks, async)", key_num, attempt_count, len(text_chunks))
+            response_text = "".join(text_chunks)
+            _cache_store(cache_key, response_text, cache_ttl)
+            return response_text, None
+
+        except Exception as e:
+            should_retry = _record_attempt_failure(e, key_num, attempt_count, error_log, attempt_started)
+
+            # Part of the answer is already on screen → can't transparently retry
+            if text_chunks:
+                return None, _stream_interrupted_error()
+
+            if should_retry:
+                continue
+
+            # Non-retryable → stop immediately
+            return None, _non_retryable_error()
+
+    # Retry window exhausted
+    return None, _retry_window_exhausted_error(attempt_count, error_log)
 
 
 # import os
@@ -0,0 +1,423 @@
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import threading
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+from google import genai
+from core.llm_cache import make_cache_key
+from core.fast_path import match_message, CATEGORY_KEYWORDS, DATE_PHRASES, WEEKDAYS
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("LLMBackend")
+
+# "gemini" → live calls, "record" → live calls saved to the recording store,
+# "replay" → answers from the recording store, "stub" → canned answers (no network, no keys)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").strip().lower()
+OFFLINE_BACKENDS = ("replay", "stub")
+
+LLM_RECORDING_PATH = os.getenv("LLM_RECORDING_PATH", "llm_recordings.db")
+# Offline backends run with this many fake keys so key scheduling still applies
+LLM_OFFLINE_KEYS = int(os.getenv("LLM_OFFLINE_KEYS", "2"))
+# Replay: recorded latency is multiplied by this (0 → answer immediately)
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+# Replay: what to do with a prompt that was never recorded ("stub" or "error")
+LLM_REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "stub").strip().lower()
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+# Offline backends: fraction of attempts that fail with a 429, and the retry delay they suggest
+LLM_FAULT_429_RATE = float(os.getenv("LLM_FAULT_429_RATE", "0"))
+LLM_FAULT_RETRY_AFTER = float(os.getenv("LLM_FAULT_RETRY_AFTER", "1"))
+
+STREAM_CHUNK_CHARS = 20
+
+if LLM_BACKEND not in ("gemini", "record") + OFFLINE_BACKENDS:
+    raise RuntimeError(f"Unknown LLM_BACKEND '{LLM_BACKEND}' (expected gemini, record, replay or stub)")
+
+
+class OfflineAPIError(Exception):
+    """
+    Shaped like a genai APIError (code, message, details), so llm_call
+    handles injected / replay failures exactly like real ones.
+    """
+
+    def __init__(self, code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = {"error": {"details": [{"retryDelay": f"{retry_after}s"}]}} if retry_after else None
+
+
+class LLMRecordingStore:
+    """
+    Recorded LLM responses keyed by prompt hash, with the latency of the live call.
+    - Lazily opened SQLite file in WAL mode
+    - Safe to share across threads (one connection behind a lock)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_recordings (
+                    prompt_hash TEXT PRIMARY KEY,
+                    prompt_chars INTEGER NOT NULL,
+                    response_text TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    recorded_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, prompt_hash: str, prompt_chars: int, response_text: str, latency_ms: float) -> None:
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_recordings (prompt_hash, prompt_chars, response_text, latency_ms, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                    (prompt_hash, prompt_chars, response_text, latency_ms, time.time())
+                )
+                conn.commit()
+                self.recorded += 1
+            except sqlite3.Error as e:
+                logger.warning("Recording failed: %s", e)
+
+    def lookup(self, prompt_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT response_text, latency_ms FROM llm_recordings WHERE prompt_hash = ?",
+                (prompt_hash,)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {"response_text": row[0], "latency_ms": row[1]}
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                entries = self._connection().execute("SELECT COUNT(*) FROM llm_recordings").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+
+        return {"entries": entries, "recorded": self.recorded, "hits": self.hits, "misses": self.misses}
+
+
+llm_recording_store = LLMRecordingStore(LLM_RECORDING_PATH)
+
+
+# ==== STUB RESPONSES ====
+QUERY_WORDS = re.compile(r"\b(how much|spent|spending|spend|show|list|total|transactions?|expenses?|average|biggest|largest)\b")
+PREDICT_WORDS = re.compile(r"\b(predict|forecast|savings?|save)\b")
+EXPENSE_WORDS = re.compile(r"(?:\b(?:spent|paid|bought|purchased|add|rs|inr|rupees)\b|₹)")
+QUESTION_START = re.compile(r"^(?:how|what|which|when|where|show|list|give|tell)\b")
+AMOUNT_FIRST = re.compile(r"(?:rs\.?\s*|inr\s*|₹\s*)?(?P<amount>\d+(?:\.\d+)?)\s*(?:rs|rupees|inr)?\s+(?:on|for)\s+(?P<description>[a-z][a-z' ]*)")
+AMOUNT_LAST = re.compile(r"(?P<description>[a-z][a-z' ]*?)\s+for\s+(?:rs\.?\s*|inr\s*|₹\s*)?(?P<amount>\d+(?:\.\d+)?)")
+EXPENSE_FILLER = re.compile(r"^(?:i\s+)?(?:spent|paid|bought|purchased|add|got)\s+|\s+(?:with|at|from)\s+.*$")
+
+
+def _prompt_field(prompt: str, pattern: str) -> str:
+    match = re.search(pattern, prompt, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _stub_date_token(text: str) -> str:
+    for phrase in sorted(DATE_PHRASES, key=len, reverse=True):
+        if re.search(rf"\b{phrase}\b", text):
+            return DATE_PHRASES[phrase]
+
+    match = re.search(r"\bon\s+(\d{4}-\d{2}-\d{2}|" + "|".join(WEEKDAYS) + r")\b", text)
+    if match is None:
+        return "MISSING"
+    return match.group(1) if match.group(1)[0].isdigit() else f"LAST_{match.group(1).upper()}"
+
+
+def _stub_category(description: str) -> str:
+    words = set(description.split())
+    matched = {
+        category for category, keywords in CATEGORY_KEYWORDS.items()
+        if any(keyword in words or (" " in keyword and keyword in description) for keyword in keywords)
+    }
+    return matched.pop() if len(matched) == 1 else "miscellaneous"
+
+
+def stub_expense_tasks(text: str) -> list:
+    """
+    add_transaction tasks for expense phrasings the fast path leaves to the Planner
+    ("bought mangoes for 180 and popcorn for 60 yesterday", "Rs 450 on pizza on saturday").
+    The date applies to every expense in the message, as the Planner prompt does.
+    """
+    if QUESTION_START.search(text) or not EXPENSE_WORDS.search(text):
+        return []
+
+    date_token = _stub_date_token(text)
+    date_words = sorted(DATE_PHRASES, key=len, reverse=True) + [f"on {day}" for day in WEEKDAYS]
+    tasks = []
+
+    for part in re.split(r"\s*(?:,|;|\band\b)\s*", text):
+        match = AMOUNT_FIRST.search(part) or AMOUNT_LAST.search(part)
+        if not match:
+            continue
+
+        description = match.group("description")
+        for phrase in date_words:
+            description = re.sub(rf"\b{phrase}\b", "", description)
+        description = EXPENSE_FILLER.sub("", re.sub(r"\s+", " ", description).strip()).strip()
+        if not description:
+            continue
+
+        tasks.append({
+            "type": "add_transaction",
+            "entities": {
+                "amount": float(match.group("amount")),
+                "category": _stub_category(description),
+                "description": description,
+                "date_of_transaction": date_token
+            }
+        })
+
+    return tasks
+
+
+def stub_planner_response(user_input: str) -> str:
+    """
+    Planner JSON for a message: the fast-path rules first, then keyword guesses.
+    """
+    tasks, _ = match_message(user_input)
+    if not tasks:
+        text = re.sub(r"\s+", " ", user_input.strip().lower())
+        expense_tasks = stub_expense_tasks(text)
+        if expense_tasks:
+            tasks = expense_tasks
+        elif PREDICT_WORDS.search(text):
+            tasks = [{"type": "predict_savings", "entities": {"categories": "all"}}]
+        elif QUERY_WORDS.search(text):
+            tasks = [{"type": "query_transactions", "entities": {"custom_query": user_input}}]
+        else:
+            tasks = [{"type": "respond_to_user_convo"}]
+
+    return json.dumps({"tasks": tasks})
+
+
+def stub_sql_response(natural_language_query: str) -> str:
+    text = natural_language_query.lower()
+
+    if re.search(r"\b(list|show|recent|last \d+|biggest|largest)\b", text):
+        sql = "SELECT date_of_transaction, category, description, amount FROM transactions ORDER BY date_of_transaction DESC LIMIT 20"
+    elif "categor" in text:
+        sql = (
+            "SELECT category, SUM(amount) AS total_spent FROM transactions "
+            "WHERE date_of_transaction >= DATE_TRUNC('month', CURRENT_DATE) GROUP BY category ORDER BY total_spent DESC"
+        )
+    else:
+        sql = (
+            "SELECT SUM(amount) AS total_spent, COUNT(*) AS transaction_count FROM transactions "
+            "WHERE date_of_transaction >= DATE_TRUNC('month', CURRENT_DATE)"
+        )
+
+    return json.dumps({"sql": sql})
+
+
+def stub_response(prompt: str) -> str:
+    """
+    Canned answer for a pipeline prompt, picked by the prompt's layout
+    (planner, SQL generator or responder).
+    """
+    if prompt.startswith("USER_INPUT:"):
+        return stub_planner_response(_prompt_field(prompt, r"^USER_INPUT:(.*?)\nMEMORY CONTEXT:"))
+
+    if prompt.lstrip().startswith("QUERY:"):
+        return stub_sql_response(_prompt_field(prompt, r"QUERY:(.*?)\n\s*SYSTEM INSTRUCTIONS:"))
+
+    if "RESULTS OF OPERATIONS:" in prompt:
+        results_json = _prompt_field(prompt, r"RESULTS OF OPERATIONS:(.*?)\n\s*SYSTEM INSTRUCTIONS:")
+        results_count = results_json.count('"type":')
+        return f"All done - I handled {results_count} operation{'s' if results_count != 1 else ''} for you."
+
+    return "Hi! I can help you track expenses, look up your spending, or predict your savings."
+
+
+# ==== OFFLINE CLIENTS ====
+def _maybe_inject_429() -> None:
+    if LLM_FAULT_429_RATE and random.random() < LLM_FAULT_429_RATE:
+        raise OfflineAPIError(429, "Injected rate limit (LLM_FAULT_429_RATE)", LLM_FAULT_RETRY_AFTER)
+
+
+def _offline_answer(model: str, prompt: str):
+    """
+    Returns (response_text, latency_seconds) for the offline backends.
+
+    Raises:
+        OfflineAPIError: Injected 429, or a replay miss with LLM_REPLAY_MISS=error
+    """
+    _maybe_inject_429()
+
+    if LLM_BACKEND == "replay":
+        recording = llm_recording_store.lookup(make_cache_key(model, prompt))
+        if recording is not None:
+            return recording["response_text"], recording["latency_ms"] * LLM_REPLAY_LATENCY_SCALE / 1000
+
+        if LLM_REPLAY_MISS != "stub":
+            raise OfflineAPIError(404, "No recorded response for this prompt")
+        logger.info("No recording for prompt (%d chars), answering with the stub", len(prompt))
+
+    return stub_response(prompt), LLM_STUB_LATENCY_MS / 1000
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _chunks(text: str):
+    return [_Response(text[i:i + STREAM_CHUNK_CHARS]) for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+
+class _OfflineModels:
+    def generate_content(self, model: str, contents: str):
+        text, latency = _offline_answer(model, contents)
+        time.sleep(latency)
+        return _Response(text)
+
+    def generate_content_stream(self, model: str, contents: str):
+        text, latency = _offline_answer(model, contents)
+        time.sleep(latency)
+        return iter(_chunks(text))
+
+
+class _AsyncOfflineModels:
+    async def generate_content(self, model: str, contents: str):
+        text, latency = _offline_answer(model, contents)
+        await asyncio.sleep(latency)
+        return _Response(text)
+
+    async def generate_content_stream(self, model: str, contents: str):
+        text, latency = _offline_answer(model, contents)
+        await asyncio.sleep(latency)
+
+        async def stream():
+            for chunk in _chunks(text):
+                yield chunk
+
+        return stream()
+
+
+class _Aio:
+    def __init__(self, models):
+        self.models = models
+
+
+class OfflineClient:
+    """
+    Stands in for genai.Client with the replay / stub backends.
+    """
+
+    def __init__(self):
+        self.models = _OfflineModels()
+        self.aio = _Aio(_AsyncOfflineModels())
+
+
+# ==== RECORDING CLIENT ====
+def _record(model: str, prompt: str, response_text: str, started: float) -> None:
+    if response_text:
+        llm_recording_store.record(make_cache_key(model, prompt), len(prompt), response_text, (time.perf_counter() - started) * 1000)
+
+
+class _RecordingModels:
+    def __init__(self, models):
+        self._models = models
+
+    def generate_content(self, model: str, contents: str):
+        started = time.perf_counter()
+        response = self._models.generate_content(model=model, contents=contents)
+        _record(model, contents, response.text, started)
+        return response
+
+    def generate_content_stream(self, model: str, contents: str):
+        started = time.perf_counter()
+        text_chunks = []
+        for chunk in self._models.generate_content_stream(model=model, contents=contents):
+            if chunk.text:
+                text_chunks.append(chunk.text)
+            yield chunk
+        _record(model, contents, "".join(text_chunks), started)
+
+
+class _AsyncRecordingModels:
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model: str, contents: str):
+        started = time.perf_counter()
+        response = await self._models.generate_content(model=model, contents=contents)
+        _record(model, contents, response.text, started)
+        return response
+
+    async def generate_content_stream(self, model: str, contents: str):
+        started = time.perf_counter()
+        upstream = await self._models.generate_content_stream(model=model, contents=contents)
+
+        async def stream():
+            text_chunks = []
+            async for chunk in upstream:
+                if chunk.text:
+                    text_chunks.append(chunk.text)
+                yield chunk
+            _record(model, contents, "".join(text_chunks), started)
+
+        return stream()
+
+
+class RecordingClient:
+    """
+    genai.Client wrapper that saves every successful response (and its latency)
+    to the recording store, for later replay.
+    """
+
+    def __init__(self, client: genai.Client):
+        self.models = _RecordingModels(client.models)
+        self.aio = _Aio(_AsyncRecordingModels(client.aio.models))
+
+
+def create_client(api_key: str):
+    """
+    Builds the client for one API key according to LLM_BACKEND.
+    """
+    if LLM_BACKEND in OFFLINE_BACKENDS:
+        return OfflineClient()
+
+    client = genai.Client(api_key=api_key)
+    if LLM_BACKEND == "record":
+        return RecordingClient(client)
+    return client
+
+
+def offline_api_keys():
+    return [f"offline-{key_num}" for key_num in range(1, LLM_OFFLINE_KEYS + 1)]
+
+
+def get_llm_backend_stats() -> dict:
+    stats = {"backend": LLM_BACKEND}
+    if LLM_BACKEND in ("record", "replay"):
+        stats["recordings"] = llm_recording_store.stats()
+    return stats
@@ -0,0 +1,155 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("Cache")
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+
+
+class SQLiteTTLCache:
+    """
+    Small persistent key/value cache in a local SQLite file.
+    - Every entry has its own expiry (TTL given at write time)
+    - Size bounded: least recently used entries are evicted past max_entries
+    - Safe to share across threads (one connection behind a lock)
+    - Never raises: storage problems are logged and treated as a miss
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table} (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, cache_key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE cache_key = ?",
+                    (cache_key,)
+                ).fetchone()
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                value, expires_at = row
+
+                if expires_at <= now:
+                    conn.execute(f"DELETE FROM {self.table} WHERE cache_key = ?", (cache_key,))
+                    conn.commit()
+                    self.misses += 1
+                    return None
+
+                conn.execute(
+                    f"UPDATE {self.table} SET last_access = ? WHERE cache_key = ?",
+                    (now, cache_key)
+                )
+                conn.commit()
+                self.hits += 1
+                return value
+
+            except sqlite3.Error as e:
+                logger.warning("Read from %s failed: %s", self.table, e)
+                self.misses += 1
+                return None
+
+    def set(self, cache_key: str, value: str, ttl: float) -> None:
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (cache_key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (cache_key, value, now + ttl, now)
+                )
+
+                entry_count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+                if entry_count > self.max_entries:
+                    # Drop expired entries first, then the least recently used ones
+                    expired = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount
+                    excess = entry_count - expired - self.max_entries
+                    if excess > 0:
+                        conn.execute(
+                            f"""DELETE FROM {self.table} WHERE cache_key IN (
+                                SELECT cache_key FROM {self.table} ORDER BY last_access ASC LIMIT ?
+                            )""",
+                            (excess,)
+                        )
+
+                conn.commit()
+
+            except sqlite3.Error as e:
+                logger.warning("Write to %s failed: %s", self.table, e)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                self._connection().execute(f"DELETE FROM {self.table}")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Clearing %s failed: %s", self.table, e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                entries = self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries
+            }
+
+
+llm_response_cache = SQLiteTTLCache(LLM_CACHE_PATH, "llm_responses", LLM_CACHE_MAX_ENTRIES)
+
+
+def make_cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def get_llm_cache_stats() -> dict:
+    return {"enabled": LLM_CACHE_ENABLED, **llm_response_cache.stats()}
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import random
+import reprlib
+import logging
+from dotenv import load_dotenv
+from core.tracing import current_trace_id
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+# "text" → "[Tag] message" lines like before, "json" → one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+# Upper bound on a formatted log message; longer ones are cut
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "2000"))
+# Fraction of DEBUG records kept (applied before any formatting)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+ROOT_LOGGER_NAME = "ledgerai"
+
+# Bounded repr for containers passed as log args: cost stays flat however big the state / results are
+_arg_repr = reprlib.Repr()
+_arg_repr.maxlevel = 3
+_arg_repr.maxdict = 10
+_arg_repr.maxlist = 10
+_arg_repr.maxstring = 200
+_arg_repr.maxother = 200
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+class _SamplingFilter(logging.Filter):
+    """
+    Drops records before they are formatted:
+    - DEBUG records are kept with probability LOG_DEBUG_SAMPLE_RATE
+    - any record logged with extra={"sample_rate": r} is kept with probability r
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None and record.levelno == logging.DEBUG:
+            rate = LOG_DEBUG_SAMPLE_RATE
+        return rate is None or rate >= 1 or random.random() < rate
+
+
+class _BoundedFormatter(logging.Formatter):
+    """
+    Formats args with a bounded repr, truncates the message and renders
+    structured fields (extra={"fields": {...}}) as text or JSON.
+    """
+
+    def _message(self, record: logging.LogRecord) -> str:
+        if record.args:
+            args = record.args if isinstance(record.args, tuple) else (record.args,)
+            bounded = tuple(
+                _truncate(arg, _arg_repr.maxother * 5) if isinstance(arg, str)
+                else _arg_repr.repr(arg) if isinstance(arg, (dict, list, tuple, set))
+                else arg
+                for arg in args
+            )
+            message = str(record.msg) % bounded
+        else:
+            message = str(record.msg)
+        return _truncate(message, LOG_MAX_CHARS)
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = self._message(record)
+        fields = getattr(record, "fields", None) or {}
+        tag = record.name[len(ROOT_LOGGER_NAME) + 1:] or ROOT_LOGGER_NAME
+        trace_id = current_trace_id()
+
+        if LOG_FORMAT == "json":
+            entry = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": tag,
+                "msg": message,
+                **fields
+            }
+            if trace_id:
+                entry["trace_id"] = trace_id
+            if record.exc_info:
+                entry["exc"] = _truncate(self.formatException(record.exc_info), LOG_MAX_CHARS)
+            return json.dumps(entry, default=str)
+
+        line = f"[{tag}] {message}"
+        if record.levelno >= logging.WARNING:
+            line = f"{record.levelname}: {line}"
+        if fields:
+            line += " " + " ".join(f"{key}={_arg_repr.repr(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + _truncate(self.formatException(record.exc_info), LOG_MAX_CHARS)
+        return line
+
+
+def _configure_root() -> logging.Logger:
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.addFilter(_SamplingFilter())
+        handler.setFormatter(_BoundedFormatter())
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.propagate = False
+    return root
+
+
+_configure_root()
+
+
+def get_logger(tag: str) -> logging.Logger:
+    """
+    Logger for one component, e.g. get_logger("Planner").
+    Use %-style args so nothing is formatted unless the record is emitted:
+        logger.debug("Incoming state: %s", state)
+        logger.info("Query returned %d rows", len(rows), extra={"fields": {"source": "replica"}})
+        logger.info("Cache hit", extra={"sample_rate": 0.1})
+    """
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{tag}")
@@ -0,0 +1,133 @@
+import os
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from core.state import AgentState
+from action.query_transaction import query_transaction_action, aquery_transaction_action
+from action.savings_prediction_savings import prediction_savings_action
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("ParallelTasks")
+
+# At least one worker: 0 or a negative value would break the pool and the batching in task_executor
+MAX_PARALLEL_TASKS = max(1, int(os.getenv("MAX_PARALLEL_TASKS", "8")))
+
+# Task types with no side effects on the transaction store. Only these are fanned out;
+# add_transaction stays serial so later queries in the same turn see the new rows.
+PARALLEL_SAFE_TASK_TYPES = {"query_transactions", "predict_savings"}
+
+SYNC_TASK_HANDLERS = {
+    "query_transactions": query_transaction_action,
+    "predict_savings": prediction_savings_action,
+}
+
+# Shared across sessions so a fan-out doesn't pay thread start-up each turn
+_task_pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_TASKS, thread_name_prefix="parallel-task")
+
+
+def _task_state(state: AgentState, task) -> AgentState:
+    return {**state, "current_task": task}
+
+
+def _branch_failed(task, e: Exception) -> AgentState:
+    """
+    One branch raising must not take the turn (and its siblings' results) down with it:
+    the failure becomes a non-fatal error result for that task.
+    """
+    logger.warning("Parallel %s task failed: %s", task.get("type"), e)
+
+    error_entry = {
+        "type": "error",
+        "source": task.get("type"),
+        "message": "This part of your request could not be completed.",
+        "details": [str(e)],
+        "fatal": False
+    }
+
+    return {"results": [error_entry]}
+
+
+def _branch_result(task, future) -> AgentState:
+    try:
+        return future.result()
+    except Exception as e:
+        return _branch_failed(task, e)
+
+
+def _merge_results(branch_updates) -> AgentState:
+    merged_results = [
+        entry
+        for update in branch_updates
+        for entry in update.get("results", [])
+    ]
+
+    logger.debug("Merged %s result entries in planner order", len(merged_results))
+
+    return {
+        "results": merged_results,
+        "parallel_tasks": [],
+        "should_continue": True
+    }
+
+
+def parallel_tasks_node(state: AgentState) -> AgentState:
+    """
+    Runs a batch of independent tasks concurrently on a shared thread pool
+    and merges their results back in planner order.
+    """
+
+    logger.debug("Parallel Tasks Node started")
+
+    batch = state.get("parallel_tasks", [])
+    logger.info("Running %s tasks concurrently: %s", len(batch), [t.get('type') for t in batch])
+
+    futures = [
+        # copy_context → each worker sees the graph's run config (stream writer, callbacks)
+        _task_pool.submit(
+            contextvars.copy_context().run,
+            SYNC_TASK_HANDLERS[task["type"]],
+            _task_state(state, task)
+        )
+        for task in batch
+    ]
+
+    return _merge_results([
+        _branch_result(task, future)
+        for task, future in zip(batch, futures)
+    ])
+
+
+async def aparallel_tasks_node(state: AgentState) -> AgentState:
+    """
+    Async version of parallel_tasks_node: query tasks are awaited together,
+    sync-only handlers run in worker threads.
+    """
+
+    logger.debug("Parallel Tasks Node started")
+
+    batch = state.get("parallel_tasks", [])
+    logger.info("Running %s tasks concurrently: %s", len(batch), [t.get('type') for t in batch])
+
+    async_task_handlers = {
+        "query_transactions": aquery_transaction_action,
+        "predict_savings": lambda task_state: asyncio.to_thread(prediction_savings_action, task_state),
+    }
+
+    branch_updates = await asyncio.gather(*[
+        async_task_handlers[task["type"]](_task_state(state, task))
+        for task in batch
+    ], return_exceptions=True)
+
+    merged_updates = []
+    for task, update in zip(batch, branch_updates):
+        if isinstance(update, Exception):
+            update = _branch_failed(task, update)
+        elif isinstance(update, BaseException):
+            # Cancellation / interpreter exit are not task failures
+            raise update
+        merged_updates.append(update)
+
+    return _merge_results(merged_updates)
@@ -1,36 +1,44 @@
 import json
 from core.state import AgentState
 from prompts.planner import PLANNER_NODE_PROMPT
-from core.llm import llm_call
+from core.llm import llm_call, allm_call
+from core.fast_path import fast_path_plan
+from core.logger import get_logger
 
+logger = get_logger("Planner")
 
-def planner_agent_node(state: AgentState) -> AgentState:
+# Same input + same memory → same plan (date tokens are resolved later, at execution)
+PLANNER_CACHE_TTL = 60 * 60  # seconds
+
+
+def build_planner_prompt(state: AgentState) -> str:
     user_input = state.get("user_input", "")
     short_term_memory = state.get("short_term_memory", [])
 
-    print("\n\n===== Planner Agent Node =====\n")
-    print(f"[Planner] User Input: {user_input}")
-    print(f"[Planner] Short-Term Memory: {short_term_memory}\n")
+    logger.debug("User Input: %s", user_input)
+    logger.debug("Short-Term Memory: %s", short_term_memory)
 
     planner_prompt = f"""USER_INPUT: {user_input}
 MEMORY CONTEXT: {json.dumps(short_term_memory)}
 SYSTEM INSTRUCTIONS: {PLANNER_NODE_PROMPT}"""
 
-    print(f"[Planner] Prompt sent to LLM!!!!!")
+    logger.debug("Prompt built (%d chars)", len(planner_prompt))
+
+    return planner_prompt
 
-    # 🔹 UPDATED: unpack llm_call result
-    llm_output_text, llm_error = llm_call(planner_prompt)
 
+def parse_planner_output(state: AgentState, llm_output_text, llm_error) -> AgentState:
     # 🔹 LLM failure → propagate (fatal)
     if llm_error:
         return {
-            "results": state.get("results", []) + [llm_error],
+            "results": [llm_error],
             "tasks": [],
             "tasks_count": 0,
+            "task_cursor": 0,
             "should_continue": False
         }
 
-    print(f"[Planner] Raw LLM Output: {llm_output_text}")
+    logger.debug("Raw LLM Output: %s", llm_output_text)
 
     # 🔹 JSON parsing is the ONLY try/except in planner
     try:
@@ -46,7 +54,7 @@ SYSTEM INSTRUCTIONS: {PLANNER_NODE_PROMPT}"""
         planned_tasks = parsed_output.get("tasks", [])
 
     except Exception as e:
-        print(f"[Planner] JSON parsing failed: {e}")
+        logger.warning("JSON parsing failed: %s", e)
 
         error_entry = {
             "type": "error",
@@ -56,12 +64,17 @@ SYSTEM INSTRUCTIONS: {PLANNER_NODE_PROMPT}"""
         }
 
         return {
-            "results": state.get("results", []) + [error_entry],
+            "results": [error_entry],
             "tasks": [],
             "tasks_count": 0,
+            "task_cursor": 0,
             "should_continue": False
         }
 
+    return finalize_plan(state, planned_tasks)
+
+
+def finalize_plan(state: AgentState, planned_tasks) -> AgentState:
     # 🔹 Filter mixed intent responses (unchanged logic)
     operational_types = {"add_transaction", "query_transactions", "predict_savings"}
     response_types = {"respond_to_user_convo", "respond_to_user_unknown"}
@@ -70,19 +83,59 @@ SYSTEM INSTRUCTIONS: {PLANNER_NODE_PROMPT}"""
     response_tasks = [t for t in planned_tasks if t.get("type") in response_types]
 
     if operational_tasks and response_tasks:
-        print("[Planner] Found both operational and response tasks. Keeping ONLY operational tasks.")
+        logger.info("Found both operational and response tasks. Keeping ONLY operational tasks.")
         planned_tasks = operational_tasks
 
-    print(f"[Planner] Final Planned Tasks: {planned_tasks}")
-    print(f"[Planner] Incoming State: {state}")
+    logger.debug("Final Planned Tasks: %s", planned_tasks)
+    logger.debug("Incoming State: %s", state)
 
     return {
         "tasks": planned_tasks,
         "tasks_count": len(planned_tasks),
+        "task_cursor": 0,
         "should_continue": True
     }
 
 
+def try_fast_path(state: AgentState):
+    """
+    Returns the planner state update when the rule-based fast path is confident, else None.
+    """
+    logger.debug("Planner Agent Node started")
+
+    fast_tasks = fast_path_plan(state.get("user_input", ""), state.get("short_term_memory", []))
+    if fast_tasks is None:
+        return None
+
+    logger.info("Planned by fast path, skipping LLM")
+    return finalize_plan(state, fast_tasks)
+
+
+def planner_agent_node(state: AgentState) -> AgentState:
+    fast_plan = try_fast_path(state)
+    if fast_plan is not None:
+        return fast_plan
+
+    planner_prompt = build_planner_prompt(state)
+
+    # 🔹 UPDATED: unpack llm_call result
+    llm_output_text, llm_error = llm_call(planner_prompt, cache_ttl=PLANNER_CACHE_TTL)
+
+    return parse_planner_output(state, llm_output_text, llm_error)
+
+
+async def aplanner_agent_node(state: AgentState) -> AgentState:
+    fast_plan = try_fast_path(state)
+    if fast_plan is not None:
+        return fast_plan
+
+    planner_prompt = build_planner_prompt(state)
+
+    llm_output_text, llm_error = await allm_call(planner_prompt, cache_ttl=PLANNER_CACHE_TTL)
+
+    return parse_planner_output(state, llm_output_text, llm_error)
+
+
 
 # import json
 # from core.state import AgentState
@@ -1,4 +1,5 @@
-from typing import TypedDict, List, Dict, Optional, Any
+import operator
+from typing import TypedDict, List, Dict, Optional, Any, Annotated
 
 class AgentState(TypedDict, total=False):
     user_name: str
@@ -6,10 +7,17 @@ class AgentState(TypedDict, total=False):
     long_term_memory: List[Dict[str, str]]
     short_term_memory: List[Dict[str, str]]
     today_date_context: str
+    # Written once by the Planner; the Executor only advances task_cursor
     tasks: List[Dict[str, Any]]
+    task_cursor: int
     tasks_count: Optional[int]
     current_task: Dict[str, Any]
-    results: List[Dict[str, Any]]
+    parallel_tasks: List[Dict[str, Any]]
+    # Append-only: nodes return just their new entries
+    results: Annotated[List[Dict[str, Any]], operator.add]
     route_to: Optional[str]
     final_output: Optional[str]
     should_continue: bool
+    stream_response: bool
+    # Set by the Planner's trace span, shared by every node span of the turn
+    trace_id: str
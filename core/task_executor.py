@@ -1,56 +1,89 @@
 from core.state import AgentState
+from core.parallel_executor import PARALLEL_SAFE_TASK_TYPES, MAX_PARALLEL_TASKS
+from core.logger import get_logger
+
+logger = get_logger("Executor")
 
 def task_executor_node(state: AgentState) -> AgentState:
     """
     Deterministic workflow controller.
-    - Reads planned tasks from state["tasks"]
-    - Ensures a final response task exists
-    - Pops the next task to execute
+    - Reads planned tasks from state["tasks"] starting at state["task_cursor"]
+    - Falls through to a final respond_to_user task once the plan is exhausted
+    - Picks the next task to execute, or the next run of independent
+      tasks (queries / predictions) to fan out in parallel
     - Chooses the correct handler via state["route_to"]
+
+    The planned task list is never mutated; only the cursor moves forward.
     """
 
-    print("\n\n===== Task Executor Node =====\n")
+    logger.debug("Task Executor Node started")
 
     # 🔹 NEW: stop immediately if a fatal error already exists
     for result in state.get("results", []):
         if result.get("type") == "error" and result.get("fatal") is True:
-            print("[Executor] Fatal error detected. Routing directly to ResponseGenerator.")
+            logger.warning("Fatal error detected. Routing directly to ResponseGenerator.")
 
             return {
                 "route_to": "ResponseGenerator",
                 "should_continue": True
             }
 
-    pending_tasks = state.get("tasks", [])
+    planned_tasks = state.get("tasks", [])
+    task_cursor = state.get("task_cursor", 0)
     total_task_count = state.get("tasks_count", 0)
+    pending_tasks = planned_tasks[task_cursor:]
 
-    print(f"[Executor] Loaded pending tasks: {pending_tasks}")
+    logger.debug("Loaded pending tasks: %s", pending_tasks)
 
     # Special case: only one task and it is already a response task
-    if total_task_count == 1:
+    if total_task_count == 1 and pending_tasks:
         single_task = pending_tasks[0]
 
         if single_task["type"] in ["respond_to_user_convo", "respond_to_user_unknown"]:
-            print(f"[Executor] Direct routing to ResponseGenerator for task type: {single_task['type']}")
-            print(f"[Executor] Task: {single_task}")
+            logger.debug("Direct routing to ResponseGenerator for task type: %s", single_task['type'])
+            logger.debug("Task: %s", single_task)
 
             return {
                 "route_to": "ResponseGenerator",
                 "current_task": single_task,
-                "tasks": [],
+                "task_cursor": task_cursor + 1,
                 "should_continue": True
             }
 
-    # Always ensure a final responder task exists at the end
-    if pending_tasks and pending_tasks[-1].get("type") != "respond_to_user":
-        pending_tasks.append({"type": "respond_to_user", "entities": {}})
-        print("[Executor] Appended final respond_to_user task.")
-
-    # Pop the next task to execute
-    next_task_to_execute = pending_tasks.pop(0)
-
-    print(f"[Executor] Next task to execute: {next_task_to_execute}")
-    print(f"[Executor] Remaining task queue: {pending_tasks}")
+    # Always finish with a final responder task
+    if not pending_tasks:
+        logger.info("Plan exhausted. Routing to final respond_to_user task.")
+
+        return {
+            "route_to": "ResponseGenerator",
+            "current_task": {"type": "respond_to_user", "entities": {}},
+            "should_continue": True
+        }
+
+    # Fan out a run of consecutive independent tasks (add_transaction acts as a barrier)
+    parallel_batch = []
+    for task in pending_tasks:
+        if task.get("type") not in PARALLEL_SAFE_TASK_TYPES or len(parallel_batch) == MAX_PARALLEL_TASKS:
+            break
+        parallel_batch.append(task)
+
+    if len(parallel_batch) > 1:
+        logger.info("Fanning out %s independent tasks", len(parallel_batch))
+        logger.debug("Parallel batch: %s", parallel_batch)
+        logger.debug("Remaining task queue: %s", pending_tasks[len(parallel_batch):])
+
+        return {
+            "task_cursor": task_cursor + len(parallel_batch),
+            "parallel_tasks": parallel_batch,
+            "route_to": "ParallelTasks",
+            "should_continue": True
+        }
+
+    # Take the next task to execute
+    next_task_to_execute = pending_tasks[0]
+
+    logger.debug("Next task to execute: %s", next_task_to_execute)
+    logger.debug("Remaining task queue: %s", pending_tasks[1:])
 
     # Decide routing based on task type
     task_type = next_task_to_execute.get("type")
@@ -66,10 +99,10 @@ def task_executor_node(state: AgentState) -> AgentState:
 
     target_node = routing_table.get(task_type, "ResponseGenerator")
 
-    print(f"[Executor] Routing to node: {target_node}")
+    logger.info("Routing to node: %s", target_node)
 
     return {
-        "tasks": pending_tasks,
+        "task_cursor": task_cursor + 1,
         "current_task": next_task_to_execute,
         "route_to": target_node,
         "should_continue": True
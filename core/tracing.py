@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableLambda
+
+load_dotenv()
+
+# Opt-in: spans are built for every node run while it's on
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+TRACE_PATH = os.getenv("TRACE_PATH", "traces.jsonl")
+# Fraction of turns whose spans are written to TRACE_PATH; span listeners still see every span
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# Spans are buffered and appended in one write once this many are waiting or the interval has passed
+TRACE_BUFFER_SPANS = int(os.getenv("TRACE_BUFFER_SPANS", "100"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "5"))
+# Past this size TRACE_PATH is moved to TRACE_PATH.1 (replacing the previous one)
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# core.logger imports this module for trace ids, so the logger is looked up by name here
+logger = logging.getLogger("ledgerai.Trace")
+
+# Span of the node currently running; copied into worker threads along with the rest of the context
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("current_span", default=None)
+
+
+class TraceStore:
+    """
+    Append-only JSONL file of finished spans, one line per node run.
+    - Lines are buffered and appended in batches (TRACE_BUFFER_SPANS / TRACE_FLUSH_INTERVAL),
+      and flushed at exit
+    - The file is rotated to <path>.1 once it would grow past max_bytes
+    - Safe to share across threads (buffer behind a lock)
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.spans_written = 0
+        self.rotations = 0
+
+    def write(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span, separators=(",", ":"), default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= TRACE_BUFFER_SPANS or time.monotonic() - self._last_flush >= TRACE_FLUSH_INTERVAL:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        data = "\n".join(self._buffer) + "\n"
+        count = len(self._buffer)
+        # Dropped even if the write fails, so a broken path can't grow the buffer forever
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+            self.rotations += 1
+
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            trace_file.write(data)
+        self.spans_written += count
+
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+
+trace_store = TraceStore(TRACE_PATH, TRACE_MAX_BYTES)
+
+
+def _flush_at_exit() -> None:
+    try:
+        trace_store.flush()
+    except OSError as e:
+        logger.warning("Writing spans failed: %s", e)
+
+
+atexit.register(_flush_at_exit)
+
+# Called with every finished span (e.g. the load-test harness aggregating node latencies)
+_span_listeners = []
+
+
+def add_span_listener(listener) -> None:
+    _span_listeners.append(listener)
+
+
+def remove_span_listener(listener) -> None:
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _new_span(trace_id: str, node: str) -> Dict[str, Any]:
+    return {
+        "trace_id": trace_id,
+        "span_id": uuid.uuid4().hex[:16],
+        "node": node,
+        "started_at": time.time(),
+        "llm_calls": [],
+        "llm_attempts": [],
+        "llm_wait_ms": 0.0,
+        "db_calls": [],
+        "cache_lookups": []
+    }
+
+
+def _sampled(trace_id: str) -> bool:
+    # Decided per trace id, so a turn's spans are kept or dropped together
+    if TRACE_SAMPLE_RATE >= 1:
+        return True
+    return int(trace_id[:8], 16) < TRACE_SAMPLE_RATE * 0x100000000
+
+
+def _result_size(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Size of a node's results from counts already in them, without serializing the rows.
+    """
+    rows = 0
+    for entry in results:
+        if not isinstance(entry, dict):
+            continue
+        data = entry.get("data_fetched_from_database")
+        if "row_count" in entry:
+            rows += entry["row_count"] or 0
+        elif isinstance(data, list):
+            rows += len(data)
+    return {"result_entries": len(results), "result_rows": rows}
+
+
+def _finish_span(span: Dict[str, Any], started: float, update, error: Optional[Exception]) -> None:
+    span["ended_at"] = time.time()
+    span["duration_ms"] = _ms(time.perf_counter() - started)
+    span["llm_ms"] = round(sum(attempt["duration_ms"] for attempt in span["llm_attempts"]), 2)
+    span["db_ms"] = round(sum(call["duration_ms"] for call in span["db_calls"]), 2)
+
+    if error is not None:
+        span["status"] = "error"
+        span["error"] = f"{type(error).__name__}: {error}"
+    else:
+        span["status"] = "ok"
+        span.update(_result_size((update or {}).get("results") or []))
+
+    if _sampled(span["trace_id"]):
+        try:
+            trace_store.write(span)
+        except OSError as e:
+            # Tracing must never break a turn
+            logger.warning("Writing spans failed: %s", e)
+
+    for listener in list(_span_listeners):
+        try:
+            listener(span)
+        except Exception as e:
+            logger.warning("Span listener failed: %s", e)
+
+
+def traced_node(name: str, func, afunc=None, starts_turn: bool = False) -> RunnableLambda:
+    """
+    Wraps a graph node so every run is recorded as a span: start/end time,
+    LLM calls and attempts (key used, latency, errors), DB round trips,
+    local cache lookups, prompt size and result size (entries / rows).
+    Does nothing unless TRACE_ENABLED.
+
+    starts_turn: the node opens a new trace (first node of the graph); the trace id
+    is put in the state so the following nodes of the same turn share it.
+
+    Returns:
+        RunnableLambda with the same sync / async support as the wrapped node
+    """
+
+    def _open(state):
+        if starts_turn or not state.get("trace_id"):
+            trace_id = uuid.uuid4().hex
+        else:
+            trace_id = state["trace_id"]
+        return trace_id, _new_span(trace_id, name)
+
+    def _close(state, trace_id, update):
+        if update is not None and state.get("trace_id") != trace_id:
+            update = {**update, "trace_id": trace_id}
+        return update
+
+    def run(state):
+        if not TRACE_ENABLED:
+            return func(state)
+
+        trace_id, span = _open(state)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            update = func(state)
+        except Exception as e:
+            _finish_span(span, started, None, e)
+            raise
+        finally:
+            _current_span.reset(token)
+
+        _finish_span(span, started, update, None)
+        return _close(state, trace_id, update)
+
+    if afunc is None:
+        return RunnableLambda(run, name=name)
+
+    async def arun(state):
+        if not TRACE_ENABLED:
+            return await afunc(state)
+
+        trace_id, span = _open(state)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            update = await afunc(state)
+        except Exception as e:
+            _finish_span(span, started, None, e)
+            raise
+        finally:
+            _current_span.reset(token)
+
+        _finish_span(span, started, update, None)
+        return _close(state, trace_id, update)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span["trace_id"] if span is not None else None
+
+
+def record_llm_call(prompt_chars: int, cache_hit: bool) -> None:
+    span = _current_span.get()
+    if span is not None:
+        span["llm_calls"].append({"prompt_chars": prompt_chars, "cache_hit": cache_hit})
+
+
+def record_llm_attempt(key_num: int, attempt_started: float, response_chars: Optional[int] = None, error_code=None) -> None:
+    """
+    attempt_started: time.perf_counter() taken right before the request was sent.
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+
+    attempt = {"key_num": key_num, "duration_ms": _ms(time.perf_counter() - attempt_started)}
+    if response_chars is not None:
+        attempt["response_chars"] = response_chars
+    else:
+        attempt["error_code"] = error_code
+    span["llm_attempts"].append(attempt)
+
+
+def record_llm_wait(seconds: float) -> None:
+    """
+    Time spent sleeping because every key was cooling down.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span["llm_wait_ms"] = round(span["llm_wait_ms"] + seconds * 1000, 2)
+
+
+@contextmanager
+def trace_db_call(kind: str):
+    """
+    Times one DB round trip in the current span.
+    The yielded dict can be annotated, e.g. call["rows"] = len(rows).
+    """
+    call = {"kind": kind}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call["error"] = True
+        raise
+    finally:
+        call["duration_ms"] = _ms(time.perf_counter() - started)
+        span = _current_span.get()
+        if span is not None:
+            span["db_calls"].append(call)
+
+
+@contextmanager
+def trace_cache_lookup(cache: str):
+    """
+    Times one local cache lookup in the current span, apart from the DB calls
+    so hits don't count as round trips. Set lookup["hit"] on the yielded dict.
+    """
+    lookup = {"cache": cache, "hit": False}
+    started = time.perf_counter()
+    try:
+        yield lookup
+    finally:
+        lookup["duration_ms"] = _ms(time.perf_counter() - started)
+        span = _current_span.get()
+        if span is not None:
+            span["cache_lookups"].append(lookup)
+
+
+def get_trace_stats() -> dict:
+    return {
+        "enabled": TRACE_ENABLED,
+        "path": TRACE_PATH,
+        "sample_rate": TRACE_SAMPLE_RATE,
+        "spans_written": trace_store.spans_written,
+        "spans_buffered": trace_store.buffered(),
+        "rotations": trace_store.rotations
+    }
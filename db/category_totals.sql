@@ -0,0 +1,24 @@
+-- Per-category spending totals, maintained by insert_transactions_with_aggregates
+-- (db/transaction_aggregates.sql) and read by the savings prediction node.
+
+CREATE TABLE IF NOT EXISTS category_spending_totals (
+    category TEXT PRIMARY KEY,
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Earlier per-call increment, superseded by insert_transactions_with_aggregates
+DROP FUNCTION IF EXISTS increment_category_total(TEXT, NUMERIC, BIGINT);
+
+-- Full recompute from the transactions table (initial backfill / repair after drift)
+CREATE OR REPLACE FUNCTION rebuild_category_totals()
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DELETE FROM category_spending_totals;
+    INSERT INTO category_spending_totals (category, total_amount, transaction_count, updated_at)
+    SELECT LOWER(category), SUM(amount), COUNT(*), NOW()
+    FROM transactions
+    GROUP BY LOWER(category);
+$$;
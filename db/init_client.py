@@ -1,15 +1,39 @@
 import os
+import threading
 from dotenv import load_dotenv
-from supabase import create_client
+from core.logger import get_logger
 
 # Load environment variables once
 load_dotenv()
 
+logger = get_logger("Supabase")
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise RuntimeError("SUPABASE_URL or SUPABASE_KEY not found in environment variables")
+_supabase_client = None
+_client_lock = threading.Lock()
+
+
+def get_supabase_client():
+    """
+    Returns the shared Supabase client, created on first use so the app can
+    start (e.g. on the SQLite storage backend) without Supabase credentials.
+
+    Raises:
+        RuntimeError: If SUPABASE_URL or SUPABASE_KEY is not set
+    """
+    global _supabase_client
+
+    with _client_lock:
+        if _supabase_client is None:
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                raise RuntimeError("SUPABASE_URL or SUPABASE_KEY not found in environment variables")
+
+            # Imported here so SQLite-only deployments don't need the supabase package
+            from supabase import create_client
+
+            logger.info("Initializing Supabase client...")
+            _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-print("[Supabase] Initializing Supabase client...")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase_client
@@ -0,0 +1,452 @@
+import os
+import uuid
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from db.init_client import get_supabase_client
+from utils.pg_to_sqlite import translate_pg_to_sqlite, register_pg_functions
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("Storage")
+
+# "supabase" (default) or "sqlite" for single-node deployments and offline benchmarks
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").strip().lower()
+SQLITE_STORAGE_PATH = os.getenv("SQLITE_STORAGE_PATH", "ledger.db")
+# Seconds a writer waits for another connection's write lock before failing
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+
+TRANSACTION_INSERT_COLUMNS = ["amount", "category", "description", "date_of_transaction", "idempotency_key"]
+
+# Mirrors the Supabase tables (db/*.sql) plus the chat tables
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    date_of_transaction TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    idempotency_key TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date_of_transaction);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date_of_transaction);
+
+CREATE TABLE IF NOT EXISTS category_spending_totals (
+    category TEXT PRIMARY KEY,
+    total_amount REAL NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS category_daily_rollups (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total_amount REAL NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category)
+);
+
+CREATE TABLE IF NOT EXISTS category_monthly_rollups (
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total_amount REAL NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category)
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_chats_updated_at ON chats (updated_at);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL REFERENCES chats (chat_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_created ON chat_messages (chat_id, created_at);
+"""
+
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+
+class SupabaseStorage:
+    """
+    Storage on the Supabase project (tables and RPCs in db/*.sql).
+    Methods raise the client's exceptions; callers turn them into RuntimeErrors.
+    """
+
+    name = "supabase"
+
+    def __init__(self):
+        self._aggregate_inserts = None  # None until checked
+        self._aggregate_inserts_lock = threading.Lock()
+
+    # ==== TRANSACTIONS ====
+    def supports_aggregate_inserts(self) -> bool:
+        """
+        Whether db/transaction_aggregates.sql is applied, checked once per process with an
+        empty call. Until it is, inserts go straight to the table and the category totals /
+        rollups only catch up through rebuild_category_totals / rebuild_transaction_rollups.
+        """
+        if self._aggregate_inserts is not None:
+            return self._aggregate_inserts
+
+        with self._aggregate_inserts_lock:
+            if self._aggregate_inserts is None:
+                try:
+                    get_supabase_client().rpc("insert_transactions_with_aggregates", {
+                        "p_rows": [],
+                        "p_skip_duplicates": False
+                    }).execute()
+                    self._aggregate_inserts = True
+                except Exception as e:
+                    logger.warning(
+                        "insert_transactions_with_aggregates unavailable, inserting without aggregate upkeep "
+                        "(apply db/transaction_aggregates.sql, then rebuild the totals and rollups): %s", e
+                    )
+                    self._aggregate_inserts = False
+
+        return self._aggregate_inserts
+
+    # With db/transaction_aggregates.sql both inserts also update the category totals
+    # and rollups in the same database transaction
+    def insert_transactions(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.supports_aggregate_inserts():
+            return get_supabase_client().table("transactions").insert(rows).execute().data or []
+
+        return get_supabase_client().rpc("insert_transactions_with_aggregates", {
+            "p_rows": rows,
+            "p_skip_duplicates": False
+        }).execute().data or []
+
+    def insert_transactions_ignoring_duplicates(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Inserts rows whose idempotency_key isn't stored yet; returns only the newly inserted rows.
+        """
+        if not self.supports_aggregate_inserts():
+            return get_supabase_client().table("transactions")\
+                .upsert(rows, on_conflict="idempotency_key", ignore_duplicates=True)\
+                .execute().data or []
+
+        return get_supabase_client().rpc("insert_transactions_with_aggregates", {
+            "p_rows": rows,
+            "p_skip_duplicates": True
+        }).execute().data or []
+
+    def supports_idempotent_inserts(self) -> bool:
+        """
+        Checks for the idempotency_key column from db/write_behind.sql: through an empty
+        idempotent insert when the aggregate RPC is applied, with a column read otherwise.
+        """
+        try:
+            if self.supports_aggregate_inserts():
+                self.insert_transactions_ignoring_duplicates([])
+            else:
+                get_supabase_client().table("transactions").select("idempotency_key").limit(1).execute()
+        except Exception as e:
+            logger.warning("Idempotent inserts unavailable: %s", e)
+            return False
+        return True
+
+    def get_transactions_by_idempotency_keys(self, keys: List[str]) -> List[Dict[str, Any]]:
+        return get_supabase_client().table("transactions")\
+            .select("*")\
+            .in_("idempotency_key", keys)\
+            .execute().data or []
+
+    def get_transactions_after(self, after_id: int, limit: int, columns: List[str]) -> List[Dict[str, Any]]:
+        return get_supabase_client().table("transactions")\
+            .select(", ".join(columns))\
+            .gt("transaction_id", after_id)\
+            .order("transaction_id")\
+            .limit(limit)\
+            .execute().data or []
+
+    def execute_sql(self, query: str) -> List[Dict[str, Any]]:
+        return get_supabase_client().rpc("execute_sql", {"query": query}).execute().data or []
+
+    # ==== AGGREGATES ====
+    def rebuild_category_totals(self) -> None:
+        get_supabase_client().rpc("rebuild_category_totals", {}).execute()
+
+    def get_category_totals(self) -> List[Dict[str, Any]]:
+        return get_supabase_client().table("category_spending_totals")\
+            .select("category, total_amount")\
+            .execute().data or []
+
+    def rebuild_transaction_rollups(self) -> None:
+        get_supabase_client().rpc("rebuild_transaction_rollups", {}).execute()
+
+    # ==== CHATS ====
+    def create_chat(self, title: str) -> Optional[Dict[str, Any]]:
+        data = get_supabase_client().table("chats").insert({"title": title}).execute().data
+        return data[0] if data else None
+
+    def update_chat_title(self, chat_id: str, title: str) -> None:
+        get_supabase_client().table("chats").update({"title": title}).eq("chat_id", chat_id).execute()
+
+    def add_message(self, chat_id: str, role: str, content: str) -> None:
+        get_supabase_client().table("chat_messages").insert({
+            "chat_id": chat_id,
+            "role": role,
+            "content": content
+        }).execute()
+
+    def get_chat_messages(self, chat_id: str) -> List[Dict[str, Any]]:
+        return get_supabase_client().table("chat_messages")\
+            .select("*")\
+            .eq("chat_id", chat_id)\
+            .order("created_at", desc=False)\
+            .execute().data or []
+
+    def get_all_chats(self) -> List[Dict[str, Any]]:
+        return get_supabase_client().table("chats")\
+            .select("*")\
+            .order("updated_at", desc=True)\
+            .execute().data or []
+
+    def delete_chat(self, chat_id: str) -> None:
+        get_supabase_client().table("chats").delete().eq("chat_id", chat_id).execute()
+
+
+class SQLiteStorage:
+    """
+    Local single-file storage with the same operations as SupabaseStorage.
+    - WAL mode: readers never block the writer or each other
+    - One persistent connection per thread, opened lazily
+    - execute_sql runs the generated PostgreSQL through utils/pg_to_sqlite, read-only
+    - Inserts update the aggregates in the same transaction, like db/transaction_aggregates.sql
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            register_pg_functions(conn)
+
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SQLITE_SCHEMA)
+                    self._schema_ready = True
+
+            self._local.conn = conn
+        return conn
+
+    # ==== TRANSACTIONS ====
+    def _insert_transactions(self, rows: List[Dict[str, Any]], ignore_duplicates: bool) -> List[Dict[str, Any]]:
+        conn = self._connection()
+        verb = "INSERT OR IGNORE" if ignore_duplicates else "INSERT"
+        inserted_ids = []
+
+        # Rows and aggregates commit together or not at all
+        with conn:
+            for row in rows:
+                cursor = conn.execute(
+                    f"{verb} INTO transactions ({', '.join(TRANSACTION_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(TRANSACTION_INSERT_COLUMNS))})",
+                    tuple(row.get(column) for column in TRANSACTION_INSERT_COLUMNS)
+                )
+                if cursor.rowcount:
+                    inserted_ids.append(cursor.lastrowid)
+
+            if not inserted_ids:
+                return []
+
+            placeholders = ", ".join("?" * len(inserted_ids))
+            inserted = [dict(row) for row in conn.execute(
+                f"SELECT * FROM transactions WHERE transaction_id IN ({placeholders}) ORDER BY transaction_id",
+                inserted_ids
+            ).fetchall()]
+
+            self._add_to_aggregates(conn, inserted)
+
+        return inserted
+
+    def insert_transactions(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self._insert_transactions(rows, ignore_duplicates=False)
+
+    def insert_transactions_ignoring_duplicates(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Inserts rows whose idempotency_key isn't stored yet; returns only the newly inserted rows.
+        """
+        return self._insert_transactions(rows, ignore_duplicates=True)
+
+    def supports_idempotent_inserts(self) -> bool:
+        # The local schema always has the idempotency_key column and index
+        return True
+
+    def get_transactions_by_idempotency_keys(self, keys: List[str]) -> List[Dict[str, Any]]:
+        if not keys:
+            return []
+        rows = self._connection().execute(
+            f"SELECT * FROM transactions WHERE idempotency_key IN ({', '.join('?' * len(keys))})",
+            keys
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_transactions_after(self, after_id: int, limit: int, columns: List[str]) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT {', '.join(columns)} FROM transactions WHERE transaction_id > ? ORDER BY transaction_id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def execute_sql(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Same contract as the execute_sql RPC: runs a validated PostgreSQL SELECT, returns row dicts.
+
+        Raises:
+            ValueError / sqlite3.Error: If the query can't be translated or executed
+        """
+        sqlite_sql = translate_pg_to_sqlite(query)
+        conn = self._connection()
+
+        # query_only: validation already blocks writes, this is defence in depth
+        conn.execute("PRAGMA query_only = ON")
+        try:
+            rows = conn.execute(sqlite_sql).fetchall()
+        finally:
+            conn.execute("PRAGMA query_only = OFF")
+
+        return [dict(row) for row in rows]
+
+    # ==== AGGREGATES ====
+    def _add_to_aggregates(self, conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+        # Runs inside the caller's insert transaction
+        totals = defaultdict(lambda: [0.0, 0])
+        daily = defaultdict(lambda: [0.0, 0])
+        monthly = defaultdict(lambda: [0.0, 0])
+        for row in rows:
+            day = str(row["date_of_transaction"])[:10]
+            category = row["category"].lower()
+            for bucket in (totals[category], daily[(day, category)], monthly[(day[:8] + "01", category)]):
+                bucket[0] += row["amount"]
+                bucket[1] += 1
+
+        conn.executemany(
+            f"""
+            INSERT INTO category_spending_totals (category, total_amount, transaction_count, updated_at)
+            VALUES (?, ?, ?, {NOW_SQL})
+            ON CONFLICT (category) DO UPDATE
+            SET total_amount = total_amount + excluded.total_amount,
+                transaction_count = transaction_count + excluded.transaction_count,
+                updated_at = excluded.updated_at
+            """,
+            [(category, total, count) for category, (total, count) in totals.items()]
+        )
+
+        for table, date_column, buckets in (
+            ("category_daily_rollups", "day", daily),
+            ("category_monthly_rollups", "month", monthly)
+        ):
+            conn.executemany(
+                f"""
+                INSERT INTO {table} ({date_column}, category, total_amount, transaction_count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT ({date_column}, category) DO UPDATE
+                SET total_amount = total_amount + excluded.total_amount,
+                    transaction_count = transaction_count + excluded.transaction_count
+                """,
+                [(key[0], key[1], total, count) for key, (total, count) in buckets.items()]
+            )
+
+    def rebuild_category_totals(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM category_spending_totals")
+            conn.execute(f"""
+                INSERT INTO category_spending_totals (category, total_amount, transaction_count, updated_at)
+                SELECT LOWER(category), SUM(amount), COUNT(*), {NOW_SQL}
+                FROM transactions
+                GROUP BY LOWER(category)
+            """)
+
+    def get_category_totals(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute("SELECT category, total_amount FROM category_spending_totals").fetchall()
+        return [dict(row) for row in rows]
+
+    def rebuild_transaction_rollups(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM category_daily_rollups")
+            conn.execute("""
+                INSERT INTO category_daily_rollups (day, category, total_amount, transaction_count)
+                SELECT date_of_transaction, LOWER(category), SUM(amount), COUNT(*)
+                FROM transactions
+                GROUP BY date_of_transaction, LOWER(category)
+            """)
+            conn.execute("DELETE FROM category_monthly_rollups")
+            conn.execute("""
+                INSERT INTO category_monthly_rollups (month, category, total_amount, transaction_count)
+                SELECT SUBSTR(date_of_transaction, 1, 8) || '01', LOWER(category), SUM(amount), COUNT(*)
+                FROM transactions
+                GROUP BY SUBSTR(date_of_transaction, 1, 8) || '01', LOWER(category)
+            """)
+
+    # ==== CHATS ====
+    def create_chat(self, title: str) -> Optional[Dict[str, Any]]:
+        chat_id = str(uuid.uuid4())
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO chats (chat_id, title) VALUES (?, ?)", (chat_id, title))
+        return dict(conn.execute("SELECT * FROM chats WHERE chat_id = ?", (chat_id,)).fetchone())
+
+    def update_chat_title(self, chat_id: str, title: str) -> None:
+        with self._connection() as conn:
+            conn.execute(f"UPDATE chats SET title = ?, updated_at = {NOW_SQL} WHERE chat_id = ?", (title, chat_id))
+
+    def add_message(self, chat_id: str, role: str, content: str) -> None:
+        with self._connection() as conn:
+            conn.execute("INSERT INTO chat_messages (chat_id, role, content) VALUES (?, ?, ?)", (chat_id, role, content))
+            # Keeps get_all_chats ordered by latest activity
+            conn.execute(f"UPDATE chats SET updated_at = {NOW_SQL} WHERE chat_id = ?", (chat_id,))
+
+    def get_chat_messages(self, chat_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT * FROM chat_messages WHERE chat_id = ? ORDER BY created_at, message_id",
+            (chat_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_all_chats(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute("SELECT * FROM chats ORDER BY updated_at DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_chat(self, chat_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM chats WHERE chat_id = ?", (chat_id,))
+
+
+def create_storage(backend: str):
+    """
+    Raises:
+        RuntimeError: If the backend name is unknown
+    """
+    if backend == "supabase":
+        return SupabaseStorage()
+    if backend == "sqlite":
+        logger.info("Using SQLite storage at %s", SQLITE_STORAGE_PATH)
+        return SQLiteStorage(SQLITE_STORAGE_PATH)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND '{backend}' (expected supabase or sqlite)")
+
+
+storage = create_storage(STORAGE_BACKEND)
@@ -1,5 +1,8 @@
 from typing import List, Dict, Optional
-from db.init_client import supabase
+from db.storage import storage
+from core.logger import get_logger
+
+logger = get_logger("Supabase")
 
 
 def create_new_chat(title: str = "New Chat!") -> Optional[str]:
@@ -8,17 +11,15 @@ def create_new_chat(title: str = "New Chat!") -> Optional[str]:
     Returns chat_id if successful, None otherwise.
     """
     try:
-        response = supabase.table("chats").insert({
-            "title": title
-        }).execute()
-        print("Supabase response:", response)
-        if response.data:
-            chat_id = response.data[0]["chat_id"]
-            print(f"[Supabase] Created new chat: {chat_id}")
+        chat = storage.create_chat(title)
+        logger.debug("Created chat row: %s", chat)
+        if chat:
+            chat_id = chat["chat_id"]
+            logger.info("Created new chat: %s", chat_id)
             return chat_id
         return None
     except Exception as e:
-        print(f"[Supabase] Error creating chat: {e}")
+        logger.warning("Error creating chat: %s", e)
         return None
 
 
@@ -27,13 +28,11 @@ def update_chat_title(chat_id: str, title: str) -> bool:
     Update the title of an existing chat.
     """
     try:
-        supabase.table("chats").update({
-            "title": title,
-        }).eq("chat_id", chat_id).execute()
-        print(f"[Supabase] Updated chat title: {chat_id}")
+        storage.update_chat_title(chat_id, title)
+        logger.info("Updated chat title: %s", chat_id)
         return True
     except Exception as e:
-        print(f"[Supabase] Error updating chat title: {e}")
+        logger.warning("Error updating chat title: %s", e)
         return False
 
 
@@ -43,11 +42,7 @@ def add_message(chat_id: str, role: str, content: str) -> bool:
     role should be 'user' or 'assistant'
     """
     try:
-        supabase.table("chat_messages").insert({
-            "chat_id": chat_id,
-            "role": role,
-            "content": content
-        }).execute()
+        storage.add_message(chat_id, role, content)
         
         # # Update the chat's updated_at timestamp
         # supabase.table("chats").update({
@@ -56,7 +51,7 @@ def add_message(chat_id: str, role: str, content: str) -> bool:
         
         return True
     except Exception as e:
-        print(f"[Supabase] Error adding message: {e}")
+        logger.warning("Error adding message: %s", e)
         return False
 
 
@@ -66,15 +61,9 @@ def get_chat_messages(chat_id: str) -> List[Dict]:
     Returns list of messages sorted by created_at.
     """
     try:
-        response = supabase.table("chat_messages")\
-            .select("*")\
-            .eq("chat_id", chat_id)\
-            .order("created_at", desc=False)\
-            .execute()
-        
-        return response.data if response.data else []
+        return storage.get_chat_messages(chat_id)
     except Exception as e:
-        print(f"[Supabase] Error fetching messages: {e}")
+        logger.warning("Error fetching messages: %s", e)
         return []
 
 
@@ -83,14 +72,9 @@ def get_all_chats() -> List[Dict]:
     Get all chats, sorted by most recently updated.
     """
     try:
-        response = supabase.table("chats")\
-            .select("*")\
-            .order("updated_at", desc=True)\
-            .execute()
-        
-        return response.data if response.data else []
+        return storage.get_all_chats()
     except Exception as e:
-        print(f"[Supabase] Error fetching chats: {e}")
+        logger.warning("Error fetching chats: %s", e)
         return []
 
 
@@ -99,11 +83,11 @@ def delete_chat(chat_id: str) -> bool:
     Delete a chat and all its messages (CASCADE).
     """
     try:
-        supabase.table("chats").delete().eq("chat_id", chat_id).execute()
-        print(f"[Supabase] Deleted chat: {chat_id}")
+        storage.delete_chat(chat_id)
+        logger.info("Deleted chat: %s", chat_id)
         return True
     except Exception as e:
-        print(f"[Supabase] Error deleting chat: {e}")
+        logger.warning("Error deleting chat: %s", e)
         return False
 
 
@@ -0,0 +1,53 @@
+-- Atomic insert for the transactions table: the rows, the category totals
+-- (db/category_totals.sql) and the daily / monthly rollups (db/transaction_rollups.sql)
+-- are written in one database transaction, so the aggregates can't drift from the
+-- base table on a partial failure. Called by every insert path in utils/insert_data.py;
+-- until it is applied, inserts go straight to the table and the aggregates only catch
+-- up through rebuild_category_totals() / rebuild_transaction_rollups().
+-- Apply after category_totals.sql and transaction_rollups.sql.
+
+-- p_rows = [{"amount", "category", "description", "date_of_transaction", "idempotency_key"?}, ...]
+-- p_skip_duplicates: rows whose idempotency_key is already stored are skipped (needs db/write_behind.sql)
+-- Returns only the newly inserted rows; only those are added to the aggregates.
+CREATE OR REPLACE FUNCTION insert_transactions_with_aggregates(p_rows JSONB, p_skip_duplicates BOOLEAN DEFAULT FALSE)
+RETURNS SETOF transactions
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_inserted JSONB;
+BEGIN
+    IF p_skip_duplicates THEN
+        WITH inserted AS (
+            INSERT INTO transactions (amount, category, description, date_of_transaction, idempotency_key)
+            SELECT amount, category, description, date_of_transaction, idempotency_key
+            FROM jsonb_to_recordset(p_rows)
+                AS r(amount NUMERIC, category TEXT, description TEXT, date_of_transaction DATE, idempotency_key TEXT)
+            ON CONFLICT (idempotency_key) DO NOTHING
+            RETURNING *
+        )
+        SELECT COALESCE(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) INTO v_inserted FROM inserted;
+    ELSE
+        WITH inserted AS (
+            INSERT INTO transactions (amount, category, description, date_of_transaction)
+            SELECT amount, category, description, date_of_transaction
+            FROM jsonb_to_recordset(p_rows)
+                AS r(amount NUMERIC, category TEXT, description TEXT, date_of_transaction DATE)
+            RETURNING *
+        )
+        SELECT COALESCE(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) INTO v_inserted FROM inserted;
+    END IF;
+
+    INSERT INTO category_spending_totals (category, total_amount, transaction_count, updated_at)
+    SELECT LOWER(category), SUM(amount), COUNT(*), NOW()
+    FROM jsonb_to_recordset(v_inserted) AS r(category TEXT, amount NUMERIC)
+    GROUP BY LOWER(category)
+    ON CONFLICT (category) DO UPDATE
+    SET total_amount = category_spending_totals.total_amount + EXCLUDED.total_amount,
+        transaction_count = category_spending_totals.transaction_count + EXCLUDED.transaction_count,
+        updated_at = NOW();
+
+    PERFORM apply_transaction_rollups(v_inserted);
+
+    RETURN QUERY SELECT * FROM jsonb_populate_recordset(NULL::transactions, v_inserted);
+END;
+$$;
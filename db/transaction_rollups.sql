@@ -0,0 +1,59 @@
+-- Per-day and per-month spending rollups by category, maintained by
+-- insert_transactions_with_aggregates (db/transaction_aggregates.sql) and read by
+-- the query router (utils/rollup_router.py).
+
+CREATE TABLE IF NOT EXISTS category_daily_rollups (
+    day DATE NOT NULL,
+    category TEXT NOT NULL,
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category)
+);
+
+CREATE TABLE IF NOT EXISTS category_monthly_rollups (
+    month DATE NOT NULL,  -- first day of the month
+    category TEXT NOT NULL,
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category)
+);
+
+-- Applies a batch of inserted transactions: p_rows = [{"date_of_transaction", "category", "amount"}, ...]
+CREATE OR REPLACE FUNCTION apply_transaction_rollups(p_rows JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO category_daily_rollups (day, category, total_amount, transaction_count)
+    SELECT date_of_transaction, LOWER(category), SUM(amount), COUNT(*)
+    FROM jsonb_to_recordset(p_rows) AS r(date_of_transaction DATE, category TEXT, amount NUMERIC)
+    GROUP BY date_of_transaction, LOWER(category)
+    ON CONFLICT (day, category) DO UPDATE
+    SET total_amount = category_daily_rollups.total_amount + EXCLUDED.total_amount,
+        transaction_count = category_daily_rollups.transaction_count + EXCLUDED.transaction_count;
+
+    INSERT INTO category_monthly_rollups (month, category, total_amount, transaction_count)
+    SELECT DATE_TRUNC('month', date_of_transaction)::date, LOWER(category), SUM(amount), COUNT(*)
+    FROM jsonb_to_recordset(p_rows) AS r(date_of_transaction DATE, category TEXT, amount NUMERIC)
+    GROUP BY DATE_TRUNC('month', date_of_transaction)::date, LOWER(category)
+    ON CONFLICT (month, category) DO UPDATE
+    SET total_amount = category_monthly_rollups.total_amount + EXCLUDED.total_amount,
+        transaction_count = category_monthly_rollups.transaction_count + EXCLUDED.transaction_count;
+$$;
+
+-- One-time backfill (and repair after drift) from the transactions table
+CREATE OR REPLACE FUNCTION rebuild_transaction_rollups()
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DELETE FROM category_daily_rollups;
+    INSERT INTO category_daily_rollups (day, category, total_amount, transaction_count)
+    SELECT date_of_transaction, LOWER(category), SUM(amount), COUNT(*)
+    FROM transactions
+    GROUP BY date_of_transaction, LOWER(category);
+
+    DELETE FROM category_monthly_rollups;
+    INSERT INTO category_monthly_rollups (month, category, total_amount, transaction_count)
+    SELECT DATE_TRUNC('month', date_of_transaction)::date, LOWER(category), SUM(amount), COUNT(*)
+    FROM transactions
+    GROUP BY DATE_TRUNC('month', date_of_transaction)::date, LOWER(category);
+$$;
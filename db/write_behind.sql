@@ -0,0 +1,7 @@
+-- Idempotency keys for the write-behind insert queue (utils/write_behind.py).
+-- A journal entry that is flushed twice (retry after a lost response) is inserted only once.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency_key
+    ON transactions (idempotency_key);
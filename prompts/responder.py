@@ -52,6 +52,10 @@ You will receive a 'results' list containing:
 - Prediction outputs (forecasted savings)
 - Error messages (if operations failed)
 
+Query results with several rows are column-encoded: "data_fetched_from_database": {"columns": [...], "rows": [[...], ...]}.
+Their "summary" holds the exact row count and per-column min/max (and sum for numbers) over ALL rows.
+If "truncated" is true, only the first rows are listed: use the summary for totals and mention that only some items are shown.
+
 YOUR JOB:
 Transform this structured data into ONE clear, conversational response that directly answers the user's request.
 
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+# Tests run offline: stubbed LLM, local SQLite storage and scratch files for every
+# cache / journal, set before any project module reads its config at import
+_DATA_DIR = tempfile.mkdtemp(prefix="ledgerai_tests_")
+
+os.environ.update({
+    "LLM_BACKEND": "stub",
+    "LLM_OFFLINE_KEYS": "2",
+    "STORAGE_BACKEND": "sqlite",
+    "SQLITE_STORAGE_PATH": os.path.join(_DATA_DIR, "ledger.db"),
+    "LLM_CACHE_PATH": os.path.join(_DATA_DIR, "llm_cache.db"),
+    "WRITE_BEHIND_JOURNAL_PATH": os.path.join(_DATA_DIR, "write_behind.db"),
+    "LOCAL_REPLICA_PATH": os.path.join(_DATA_DIR, "transactions_replica.db"),
+    "TRACE_PATH": os.path.join(_DATA_DIR, "traces.jsonl"),
+    "TRACE_ENABLED": "false",
+    "LOCAL_REPLICA_ENABLED": "false",
+    "QUERY_RESULT_CACHE_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
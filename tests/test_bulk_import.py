@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from db.storage import storage
+from utils.bulk_import import import_transactions_csv
+from utils.validation import validate_insert_batch
+
+
+def _stored(description):
+    return storage.execute_sql(
+        f"SELECT amount, category, date_of_transaction FROM transactions WHERE description = '{description}'"
+    )
+
+
+def test_negative_debits_are_imported_as_expenses():
+    csv_file = io.StringIO(
+        "Date,Narration,Debit,Category\n"
+        "03/09/2026,bulk-neg-rent,\"-12,500.00\",utilities\n"
+        "04/09/2026,bulk-neg-milk,60,groceries\n"
+    )
+
+    report = import_transactions_csv(csv_file, date_format="%d/%m/%Y")
+
+    assert report["inserted"] == 2 and report["rejected"] == 0
+    assert _stored("bulk-neg-rent") == [{"amount": 12500.0, "category": "utilities", "date_of_transaction": "2026-09-03"}]
+
+
+def test_negative_amounts_can_still_be_rejected():
+    csv_file = io.StringIO("date,description,amount,category\n2026-09-03,bulk-neg-strict,-40,groceries\n")
+
+    report = import_transactions_csv(csv_file, absolute_amounts=False)
+
+    assert report["inserted"] == 0
+    assert report["errors"] == [{"line": 2, "errors": ["Amount must be greater than zero."]}]
+
+
+def test_malformed_rows_are_rejected_with_their_line_numbers():
+    csv_file = io.StringIO(
+        "date,description,amount,category\n"
+        "2026-09-03,bulk-ok,250,groceries\n"
+        "2026-09-03,bulk-bad-amount,twelve,groceries\n"
+        "2026-09-03,bulk-zero,0,groceries\n"
+        "2026-09-03,bulk-no-category,80,\n"
+        "2026-09-03,bulk-bad-category,80,rent\n"
+        ",bulk-no-date,80,transport\n"
+        "someday,bulk-bad-date,80,transport\n"
+    )
+
+    report = import_transactions_csv(csv_file, batch_size=3)
+
+    assert report["rows_read"] == 7 and report["batches"] == 3
+    assert report["inserted"] == 1 and report["rejected"] == 6 and report["failed"] == 0
+    assert report["errors"] == [
+        {"line": 3, "errors": ["Amount must be numeric."]},
+        {"line": 4, "errors": ["Amount must be greater than zero."]},
+        {"line": 5, "errors": ["Category is missing."]},
+        {"line": 6, "errors": ["Category 'rent' is not allowed."]},
+        {"line": 7, "errors": ["Date of transaction is missing."]},
+        {"line": 8, "errors": ["Unrecognized date: someday"]},
+    ]
+    assert _stored("bulk-bad-amount") == []
+
+
+@pytest.mark.parametrize("absolute_amounts, expected_amount", [(False, None), (True, 25.0)])
+def test_validate_insert_batch_negative_amounts(absolute_amounts, expected_amount):
+    result = validate_insert_batch(
+        [{"amount": "-25", "category": "Groceries", "date_of_transaction": "2026-09-03"}],
+        absolute_amounts=absolute_amounts
+    )
+
+    amounts = [row["amount"] for row in result["clean_rows"]]
+    assert amounts == ([expected_amount] if expected_amount else [])
+    assert len(result["rejected"]) == (0 if expected_amount else 1)
@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+
+import utils.execute_sql_query as execute_sql_query
+from utils.execute_sql_query import iter_select_query, export_select_query
+from utils.insert_data import insert_transactions_batch
+
+SQL = "SELECT transaction_id, amount FROM transactions WHERE description = 'paging-test'"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_storage():
+    insert_transactions_batch([
+        {"amount": float(amount), "category": "transport", "description": "paging-test", "date_of_transaction": "2026-10-02"}
+        for amount in range(1, 26)
+    ])
+
+
+@pytest.fixture
+def warnings(monkeypatch):
+    messages = []
+    monkeypatch.setattr(execute_sql_query.logger, "warning", lambda message, *args: messages.append(message % args))
+    return messages
+
+
+def test_keyset_pages_cover_every_row_once(warnings):
+    pages = list(iter_select_query(SQL, page_size=10, keyset_column="transaction_id"))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sorted(row["amount"] for page in pages for row in page) == [float(a) for a in range(1, 26)]
+    assert warnings == []
+
+
+def test_offset_paging_warns_once(warnings):
+    pages = list(iter_select_query(SQL + " ORDER BY transaction_id", page_size=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert len(warnings) == 1 and "OFFSET" in warnings[0]
+
+
+def test_single_page_offset_query_does_not_warn(warnings):
+    assert len(next(iter_select_query(SQL, page_size=100))) == 25
+    assert warnings == []
+
+
+def test_export_pages_by_keyset(tmp_path, warnings):
+    path = tmp_path / "export.csv"
+
+    result = export_select_query(SQL, str(path), page_size=10)
+
+    assert result == {"path": str(path), "rows": 25, "pages": 3}
+    with open(path, newline="", encoding="utf-8") as file:
+        assert len(list(csv.DictReader(file))) == 25
+    assert warnings == []
+
+
+def test_export_requires_a_keyset_column(tmp_path):
+    with pytest.raises(ValueError):
+        export_select_query(SQL, str(tmp_path / "export.csv"), keyset_column=None)
@@ -0,0 +1,66 @@
+import pytest
+
+from core.fast_path import fast_path_plan
+
+
+def _expense(amount, category, description, date_token):
+    return [{
+        "type": "add_transaction",
+        "entities": {
+            "amount": amount,
+            "category": category,
+            "description": description,
+            "date_of_transaction": date_token
+        }
+    }]
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("spent 250 on groceries yesterday", _expense(250.0, "groceries", "groceries", "YESTERDAY")),
+    ("I paid Rs 120 for uber today", _expense(120.0, "transport", "uber", "TODAY")),
+    ("spent 40.5 on coffee last friday", _expense(40.5, "eating_out", "coffee", "LAST_FRIDAY")),
+    ("add 900 for electricity bill on 2026-10-01", _expense(900.0, "utilities", "electricity bill", "2026-10-01")),
+    ("Hi!", [{"type": "respond_to_user_convo"}]),
+    ("thank you", [{"type": "respond_to_user_convo"}]),
+    ("predict savings for all", [{"type": "predict_savings", "entities": {"categories": "all"}}]),
+    ("predict my savings for groceries and eating out",
+     [{"type": "predict_savings", "entities": {"categories": ["groceries", "eating_out"]}}]),
+])
+def test_handled_messages(message, expected):
+    assert fast_path_plan(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    # No date, or one the rules can't resolve: the Planner asks for / reads it
+    "spent 250 on groceries",
+    "spent 300 on movies on friday",
+    # Unknown or ambiguous category
+    "spent 500 on gifts yesterday",
+    "spent 200 on coffee and uber yesterday",
+    # Several tasks, queries and unknown prediction categories
+    "spent 250 on groceries yesterday and 100 on uber today",
+    "how much did I spend on groceries last month?",
+    "predict savings for rent",
+    "hi, how much did I spend today?",
+    "",
+])
+def test_declined_messages(message):
+    assert fast_path_plan(message) is None
+
+
+def test_declines_while_a_follow_up_is_pending():
+    memory = [
+        {"role": "user", "content": "spent 250 on groceries"},
+        {"role": "assistant", "content": "When did you make this purchase?"},
+    ]
+
+    assert fast_path_plan("spent 250 on groceries yesterday", memory) is None
+
+
+def test_handles_messages_after_a_plain_reply():
+    memory = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "Hello! I can track your expenses."},
+    ]
+
+    assert fast_path_plan("spent 250 on groceries yesterday", memory) == _expense(250.0, "groceries", "groceries", "YESTERDAY")
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+from sklearn.linear_model import LinearRegression
+
+from utils.forest_inference import compile_forest
+
+FEATURE_NAMES = ["month", "prev_month_spend", "avg_3_month_spend", "category_code"]
+
+
+def _training_data(n_outputs=1):
+    rng = np.random.default_rng(42)
+    X = np.column_stack([
+        rng.integers(1, 13, 400),
+        rng.uniform(0, 20_000, 400),
+        rng.uniform(0, 20_000, 400),
+        rng.integers(0, 8, 400),
+    ]).astype(np.float64)
+    y = X[:, 1] * 0.6 + X[:, 2] * 0.3 + rng.normal(0, 500, 400)
+    if n_outputs > 1:
+        y = np.column_stack([y, X[:, 2] - X[:, 1]])
+    return X, y
+
+
+@pytest.mark.parametrize("model_class", [RandomForestRegressor, ExtraTreesRegressor])
+@pytest.mark.parametrize("n_outputs", [1, 2])
+def test_compiled_forest_matches_sklearn_predict_exactly(model_class, n_outputs):
+    X, y = _training_data(n_outputs)
+    model = model_class(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+    forest = compile_forest(model, FEATURE_NAMES)
+    assert forest is not None
+
+    rows = np.vstack([X[:50], np.random.default_rng(7).normal(size=(50, 4)) * 10_000])
+
+    np.testing.assert_array_equal(forest.predict(rows), model.predict(rows))
+
+
+def test_missing_features_match_sklearn_nan_handling():
+    X, y = _training_data()
+    X[::7, 2] = np.nan
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+
+    forest = compile_forest(model, FEATURE_NAMES)
+    rows = forest.vectorize_many([
+        {"month": 3, "prev_month_spend": 4_000, "category_code": 2},
+        {"month": 11, "prev_month_spend": 12_500, "avg_3_month_spend": 9_000, "category_code": 5},
+    ])
+
+    np.testing.assert_array_equal(forest.predict(rows), model.predict(rows))
+
+
+def test_non_forest_models_are_not_compiled():
+    X, y = _training_data()
+
+    assert compile_forest(LinearRegression().fit(X, y), FEATURE_NAMES) is None
+
+
+def test_feature_count_mismatch_is_not_compiled():
+    X, y = _training_data()
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+
+    assert compile_forest(model, FEATURE_NAMES[:3]) is None
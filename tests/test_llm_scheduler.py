@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+import core.llm as llm
+from core.llm_backends import OfflineAPIError
+
+
+@pytest.fixture(autouse=True)
+def fresh_key_states():
+    for key_state in llm._key_states.values():
+        key_state.update({
+            "in_flight": 0,
+            "successes": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "cooldown_until": 0.0,
+            "last_used": 0.0
+        })
+        key_state["recent_errors"].clear()
+
+
+def test_acquire_spreads_requests_over_keys():
+    first, _, _ = llm.acquire_key()
+    second, _, _ = llm.acquire_key()
+
+    assert {first, second} == {1, 2}
+    assert llm.get_key_scheduler_stats()[first]["in_flight"] == 1
+
+
+def test_release_success_frees_the_key():
+    key_num, api_key, wait = llm.acquire_key()
+    assert api_key == llm.API_KEYS[key_num - 1] and wait == 0.0
+
+    llm.release_key(key_num)
+
+    stats = llm.get_key_scheduler_stats()[key_num]
+    assert stats["in_flight"] == 0
+    assert stats["successes"] == 1
+    assert not stats["cooling_down"]
+
+
+def test_retryable_error_cools_the_key_down():
+    key_num, _, _ = llm.acquire_key()
+    llm.release_key(key_num, error_code=429)
+
+    stats = llm.get_key_scheduler_stats()[key_num]
+    assert stats["cooling_down"]
+    assert stats["cooldown_remaining"] == pytest.approx(llm.KEY_COOLDOWN_SECONDS[429], abs=1)
+
+    # The other key is picked while this one sits out its cooldown
+    for _ in range(3):
+        other, _, _ = llm.acquire_key()
+        assert other != key_num
+        llm.release_key(other)
+
+
+def test_consecutive_failures_double_the_cooldown_up_to_the_cap():
+    key_num = 1
+    cooldowns = []
+    for _ in range(6):
+        llm._key_states[key_num]["cooldown_until"] = 0.0
+        llm.release_key(key_num, error_code=503)
+        cooldowns.append(round(llm.get_key_scheduler_stats()[key_num]["cooldown_remaining"]))
+
+    assert cooldowns[:4] == [5, 10, 20, 40]
+    assert max(cooldowns) == llm.MAX_KEY_COOLDOWN
+
+
+def test_success_resets_the_backoff():
+    llm.release_key(1, error_code=503)
+    llm.release_key(1)
+    llm._key_states[1]["cooldown_until"] = 0.0
+    llm.release_key(1, error_code=503)
+
+    assert round(llm.get_key_scheduler_stats()[1]["cooldown_remaining"]) == llm.KEY_COOLDOWN_SECONDS[503]
+
+
+def test_retry_after_from_the_api_wins():
+    llm.release_key(1, error_code=429, retry_after=2.5)
+
+    assert llm.get_key_scheduler_stats()[1]["cooldown_remaining"] == pytest.approx(2.5, abs=0.2)
+
+
+def test_non_retryable_error_does_not_cool_down():
+    llm.release_key(1, error_code=400)
+
+    stats = llm.get_key_scheduler_stats()[1]
+    assert stats["failures"] == 1
+    assert not stats["cooling_down"]
+
+
+def test_all_keys_cooling_down_reports_the_wait():
+    now = time.time()
+    llm._key_states[1]["cooldown_until"] = now + 3
+    llm._key_states[2]["cooldown_until"] = now + 8
+
+    key_num, api_key, wait = llm.acquire_key()
+
+    assert key_num is None and api_key is None
+    assert wait == pytest.approx(3, abs=0.2)
+
+
+def test_get_retry_after_reads_retry_info():
+    assert llm.get_retry_after(OfflineAPIError(429, "quota", retry_after=7)) == 7.0
+    assert llm.get_retry_after(OfflineAPIError(500, "boom")) is None
@@ -0,0 +1,117 @@
+import os
+import tempfile
+
+import pytest
+
+import utils.local_replica as local_replica
+from utils.local_replica import TransactionReplica
+
+
+class UpstreamTransactions:
+    """
+    Stands in for the Supabase transactions table: rows keyed by transaction_id,
+    read the way storage.get_transactions_after pages them.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = []
+        self.fail = False
+
+    def add(self, transaction_id, amount=10.0, category="groceries"):
+        self.rows[transaction_id] = {
+            "transaction_id": transaction_id,
+            "amount": amount,
+            "category": category,
+            "description": f"row {transaction_id}",
+            "date_of_transaction": "2026-10-01",
+            "created_at": "2026-10-01T10:00:00"
+        }
+
+    def get_transactions_after(self, after_id, limit, columns):
+        if self.fail:
+            raise ConnectionError("upstream unavailable")
+        self.reads.append(after_id)
+        ids = sorted(i for i in self.rows if i > after_id)[:limit]
+        return [{column: self.rows[i][column] for column in columns} for i in ids]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = UpstreamTransactions()
+    monkeypatch.setattr(local_replica, "storage", upstream)
+    monkeypatch.setattr(local_replica, "LOCAL_REPLICA_SYNC_PAGE_SIZE", 2)
+    monkeypatch.setattr(local_replica, "LOCAL_REPLICA_SYNC_OVERLAP", 3)
+    return upstream
+
+
+@pytest.fixture
+def replica():
+    return TransactionReplica(os.path.join(tempfile.mkdtemp(prefix="replica_test_"), "replica.db"))
+
+
+def _replica_ids(replica):
+    return [row["transaction_id"] for row in replica.execute("SELECT transaction_id FROM transactions ORDER BY 1")]
+
+
+def test_first_sync_pages_through_everything(upstream, replica):
+    for transaction_id in range(1, 6):
+        upstream.add(transaction_id)
+
+    assert replica.sync() == 5
+    assert _replica_ids(replica) == [1, 2, 3, 4, 5]
+    assert upstream.reads == [0, 2, 4]
+    assert replica.watermark() == 5
+
+
+def test_sync_rereads_the_overlap_to_catch_late_commits(upstream, replica):
+    for transaction_id in (1, 2, 3, 5, 6):
+        upstream.add(transaction_id)
+    replica.sync()
+
+    # id 4 was handed out first but committed after 5 and 6 had been synced
+    upstream.add(4)
+    upstream.add(7)
+    upstream.reads.clear()
+
+    replica.sync()
+
+    assert upstream.reads[0] == 6 - 3
+    assert _replica_ids(replica) == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_overlap_rows_are_not_duplicated(upstream, replica):
+    for transaction_id in range(1, 5):
+        upstream.add(transaction_id, amount=25.0)
+
+    replica.sync()
+    replica.sync()
+
+    assert replica.execute("SELECT COUNT(*) AS n, SUM(amount) AS total FROM transactions") == [{"n": 4, "total": 100.0}]
+
+
+def test_failed_sync_keeps_the_replica_stale(upstream, replica):
+    upstream.add(1)
+    upstream.fail = True
+
+    with pytest.raises(RuntimeError):
+        replica.sync()
+
+    assert replica._stale
+    upstream.fail = False
+    replica.ensure_fresh()
+    assert not replica._stale
+    assert _replica_ids(replica) == [1]
+
+
+def test_replica_runs_translated_postgres(upstream, replica):
+    upstream.add(1, amount=40.0, category="eating_out")
+    upstream.add(2, amount=60.0, category="groceries")
+    replica.sync()
+
+    rows = replica.execute(
+        "SELECT category, SUM(amount)::numeric AS total FROM transactions "
+        "WHERE category ILIKE 'eating%' AND date_of_transaction >= DATE '2026-10-01' GROUP BY category"
+    )
+
+    assert rows == [{"category": "eating_out", "total": 40.0}]
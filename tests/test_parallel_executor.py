@@ -0,0 +1,51 @@
+import asyncio
+
+import core.parallel_executor as parallel_executor
+
+
+def _ok(task_state):
+    task = task_state["current_task"]
+    return {"results": [{"type": "query_result", "task": task["entities"]["name"]}], "should_continue": True}
+
+
+def _boom(task_state):
+    raise RuntimeError("backend exploded")
+
+
+async def _aok(task_state):
+    return _ok(task_state)
+
+
+BATCH = [
+    {"type": "query_transactions", "entities": {"name": "first"}},
+    {"type": "predict_savings", "entities": {"name": "second"}},
+    {"type": "query_transactions", "entities": {"name": "third"}},
+]
+
+
+def _assert_failed_branch_kept_siblings(update):
+    first, second, third = update["results"]
+
+    assert first == {"type": "query_result", "task": "first"}
+    assert second["type"] == "error"
+    assert second["source"] == "predict_savings"
+    assert second["details"] == ["backend exploded"]
+    assert second["fatal"] is False
+    assert third == {"type": "query_result", "task": "third"}
+    assert update["parallel_tasks"] == []
+
+
+def test_failing_branch_becomes_its_own_error_result(monkeypatch):
+    monkeypatch.setitem(parallel_executor.SYNC_TASK_HANDLERS, "query_transactions", _ok)
+    monkeypatch.setitem(parallel_executor.SYNC_TASK_HANDLERS, "predict_savings", _boom)
+
+    _assert_failed_branch_kept_siblings(parallel_executor.parallel_tasks_node({"parallel_tasks": BATCH}))
+
+
+def test_async_failing_branch_becomes_its_own_error_result(monkeypatch):
+    monkeypatch.setattr(parallel_executor, "aquery_transaction_action", _aok)
+    monkeypatch.setattr(parallel_executor, "prediction_savings_action", _boom)
+
+    update = asyncio.run(parallel_executor.aparallel_tasks_node({"parallel_tasks": BATCH}))
+
+    _assert_failed_branch_kept_siblings(update)
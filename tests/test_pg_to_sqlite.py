@@ -0,0 +1,81 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from utils.pg_to_sqlite import translate_pg_to_sqlite, register_pg_functions
+
+NOW = datetime(2026, 10, 18, 12, 30, 0)
+
+
+@pytest.mark.parametrize("pg_sql, sqlite_sql", [
+    (
+        "SELECT * FROM transactions WHERE date_of_transaction >= CURRENT_DATE - INTERVAL '7 days'",
+        "SELECT * FROM transactions WHERE date_of_transaction >= PG_DATE_ADD('2026-10-18', '-7 days')",
+    ),
+    (
+        "SELECT * FROM transactions WHERE date_of_transaction >= DATE '2026-01-01' AND created_at < NOW()",
+        "SELECT * FROM transactions WHERE date_of_transaction >= '2026-01-01' AND created_at < '2026-10-18 12:30:00'",
+    ),
+    (
+        "SELECT EXTRACT(MONTH FROM date_of_transaction::date) AS month, SUM(amount)::numeric(10,2) FROM transactions GROUP BY 1",
+        "SELECT DATE_PART('month', DATE(date_of_transaction)) AS month, SUM(amount) FROM transactions GROUP BY 1",
+    ),
+    (
+        "SELECT * FROM transactions WHERE date_of_transaction > '2026-10-01'::date - INTERVAL '1 month'",
+        "SELECT * FROM transactions WHERE date_of_transaction > PG_DATE_ADD(DATE('2026-10-01'), '-1 month')",
+    ),
+    (
+        "SELECT STRING_AGG(description, ', ') FROM transactions WHERE description ILIKE '%uber%'",
+        "SELECT GROUP_CONCAT(description, ', ') FROM transactions WHERE description LIKE '%uber%'",
+    ),
+])
+def test_translates_postgres_syntax(pg_sql, sqlite_sql):
+    assert translate_pg_to_sqlite(pg_sql, NOW) == sqlite_sql
+
+
+@pytest.mark.parametrize("pg_sql", [
+    "SELECT * FROM transactions WHERE description = 'ILIKE ::text NOW() CURRENT_DATE'",
+    "SELECT * FROM transactions WHERE description LIKE '%- INTERVAL ''1 day''%'",
+    "SELECT * FROM transactions WHERE description = 'DATE ''2026-01-01'' EXTRACT(year FROM x)'",
+    "SELECT SUM(amount) AS \"spent::now() ILIKE\" FROM transactions",
+])
+def test_quoted_text_is_left_alone(pg_sql):
+    assert translate_pg_to_sqlite(pg_sql, NOW) == pg_sql
+
+
+def test_quoted_text_survives_next_to_rewrites():
+    pg_sql = (
+        "SELECT * FROM transactions WHERE description ILIKE '%now()::date%' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '1 month'"
+    )
+
+    assert translate_pg_to_sqlite(pg_sql, NOW) == (
+        "SELECT * FROM transactions WHERE description LIKE '%now()::date%' "
+        "AND date_of_transaction >= PG_DATE_ADD('2026-10-18', '-1 month')"
+    )
+
+
+def test_unterminated_string_is_rejected():
+    with pytest.raises(ValueError):
+        translate_pg_to_sqlite("SELECT * FROM transactions WHERE description = 'oops", NOW)
+
+
+def test_translated_query_runs_on_sqlite():
+    conn = sqlite3.connect(":memory:")
+    register_pg_functions(conn)
+    conn.execute("CREATE TABLE transactions (amount REAL, description TEXT, date_of_transaction TEXT)")
+    conn.executemany("INSERT INTO transactions VALUES (?, ?, ?)", [
+        (100.0, "refund ILIKE::text", "2026-10-10"),
+        (50.0, "coffee", "2026-10-17"),
+        (75.0, "coffee", "2026-08-01"),
+    ])
+
+    sqlite_sql = translate_pg_to_sqlite(
+        "SELECT DATE_TRUNC('month', date_of_transaction) AS month, SUM(amount) AS total FROM transactions "
+        "WHERE date_of_transaction >= CURRENT_DATE - INTERVAL '1 month' OR description = 'refund ILIKE::text' "
+        "GROUP BY 1 ORDER BY 1",
+        NOW
+    )
+
+    assert conn.execute(sqlite_sql).fetchall() == [("2026-10-01", 150.0)]
@@ -0,0 +1,88 @@
+import pytest
+
+import utils.result_shaping as result_shaping
+from utils.execute_sql_query import execute_select_query
+from utils.insert_data import insert_transactions_batch
+from utils.result_shaping import apply_row_limit, shape_query_result
+
+AMOUNTS = [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0]
+SQL = (
+    "SELECT date_of_transaction, amount, description FROM transactions "
+    "WHERE description LIKE 'shape-%' ORDER BY amount"
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_storage():
+    insert_transactions_batch([
+        {
+            "amount": amount,
+            "category": "groceries",
+            "description": f"shape-{index}",
+            "date_of_transaction": f"2026-09-{index + 1:02d}"
+        }
+        for index, amount in enumerate(AMOUNTS)
+    ])
+
+
+@pytest.mark.parametrize("sql, limited", [
+    ("SELECT * FROM transactions", "SELECT * FROM transactions LIMIT 6"),
+    ("SELECT * FROM transactions LIMIT 100", "SELECT * FROM transactions LIMIT 6"),
+    ("SELECT * FROM transactions LIMIT 100 OFFSET 20", "SELECT * FROM transactions LIMIT 6 OFFSET 20"),
+    ("SELECT * FROM transactions LIMIT 3", "SELECT * FROM transactions LIMIT 3"),
+    ("SELECT * FROM transactions LIMIT 5", "SELECT * FROM transactions LIMIT 5"),
+])
+def test_apply_row_limit_fetches_one_extra_row(sql, limited):
+    assert apply_row_limit(sql, max_rows=5) == limited
+
+
+def test_truncated_result_gets_exact_summary_from_the_database():
+    rows = execute_select_query(apply_row_limit(SQL, max_rows=5))
+    assert len(rows) == 6
+
+    shaped = shape_query_result(SQL, rows, max_rows=5)
+
+    assert shaped["truncated"] is True
+    assert shaped["rows_shown"] == 5
+    assert shaped["data_fetched_from_database"]["columns"] == ["date_of_transaction", "amount", "description"]
+    assert [row[1] for row in shaped["data_fetched_from_database"]["rows"]] == AMOUNTS[:5]
+    assert shaped["row_count"] == 7
+    assert shaped["summary"]["columns"] == {
+        "date_of_transaction": {"min": "2026-09-01", "max": "2026-09-07"},
+        "amount": {"min": 10.0, "max": 70.0, "sum": 280.0},
+    }
+    assert "covers_first_rows_only" not in shaped["summary"]
+
+
+def test_result_within_the_cap_is_summarized_locally(monkeypatch):
+    def no_follow_up(sql):
+        raise AssertionError("no summary query expected")
+
+    monkeypatch.setattr(result_shaping, "execute_select_query", no_follow_up)
+    rows = execute_select_query(apply_row_limit(SQL, max_rows=7))
+
+    shaped = shape_query_result(SQL, rows, max_rows=7)
+
+    assert shaped["truncated"] is False
+    assert shaped["row_count"] == 7
+    assert shaped["summary"]["columns"]["amount"]["sum"] == 280.0
+
+
+def test_failed_follow_up_falls_back_to_shown_rows(monkeypatch):
+    def failing_follow_up(sql):
+        raise RuntimeError("Failed to execute query: timeout")
+
+    rows = execute_select_query(apply_row_limit(SQL, max_rows=5))
+    monkeypatch.setattr(result_shaping, "execute_select_query", failing_follow_up)
+
+    shaped = shape_query_result(SQL, rows, max_rows=5)
+
+    assert shaped["truncated"] is True
+    assert shaped["row_count"] == 5
+    assert shaped["summary"]["covers_first_rows_only"] is True
+    assert shaped["summary"]["columns"]["amount"]["sum"] == 150.0
+
+
+@pytest.mark.parametrize("rows", [[], [{"total": 280.0}]])
+def test_small_results_pass_through(rows):
+    assert shape_query_result(SQL, rows) == {"data_fetched_from_database": rows}
@@ -0,0 +1,62 @@
+import pytest
+
+from db.storage import storage
+from utils.insert_data import insert_transactions_batch
+from utils.rollup_router import route_to_rollups
+
+TRANSACTIONS = [
+    {"amount": 250.0, "category": "groceries", "date_of_transaction": "2026-09-03", "description": "vegetables"},
+    {"amount": 120.0, "category": "transport", "date_of_transaction": "2026-09-03", "description": "uber"},
+    {"amount": 80.0, "category": "groceries", "date_of_transaction": "2026-09-17", "description": "milk"},
+    {"amount": 40.0, "category": "eating_out", "date_of_transaction": "2026-10-01", "description": "coffee"},
+    {"amount": 300.0, "category": "groceries", "date_of_transaction": "2026-10-01", "description": "supermarket"},
+    {"amount": 60.0, "category": "transport", "date_of_transaction": "2026-10-12", "description": "metro"},
+]
+
+# Aggregates are aliased here: SQLite names bare ones after their text, Postgres "sum" / "count" / "avg"
+ROUTABLE_QUERIES = [
+    "SELECT date_of_transaction, SUM(amount) AS total FROM transactions GROUP BY date_of_transaction ORDER BY date_of_transaction",
+    "SELECT date_of_transaction, category, SUM(amount) AS total FROM transactions GROUP BY date_of_transaction, category ORDER BY date_of_transaction, category",
+    "SELECT category, COUNT(*) AS transaction_count, AVG(amount) AS average FROM transactions GROUP BY category ORDER BY category",
+    "SELECT category, SUM(amount) AS total_spent FROM transactions WHERE date_of_transaction >= '2026-10-01' GROUP BY category ORDER BY category",
+    "SELECT SUM(amount) AS total_spent, COUNT(*) AS transaction_count FROM transactions WHERE category = 'groceries'",
+    "SELECT DATE_TRUNC('month', date_of_transaction) AS date_of_transaction, SUM(amount) AS total FROM transactions GROUP BY DATE_TRUNC('month', date_of_transaction) ORDER BY 1",
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_storage():
+    insert_transactions_batch(TRANSACTIONS)
+
+
+@pytest.mark.parametrize("sql", ROUTABLE_QUERIES)
+def test_routed_query_returns_same_rows_and_keys(sql):
+    routed_sql = route_to_rollups(sql)
+    assert routed_sql is not None
+    assert "transactions" not in routed_sql
+
+    expected = storage.execute_sql(sql)
+    routed = storage.execute_sql(routed_sql)
+
+    assert [list(row) for row in routed] == [list(row) for row in expected]
+    assert routed == expected
+
+
+def test_bare_columns_keep_their_postgres_names():
+    routed_sql = route_to_rollups(
+        "SELECT date_of_transaction, SUM(amount), COUNT(*), AVG(amount) FROM transactions GROUP BY date_of_transaction"
+    )
+    assert "day AS date_of_transaction" in routed_sql
+    assert "SUM(total_amount) AS sum" in routed_sql
+    assert "COALESCE(SUM(transaction_count), 0) AS count" in routed_sql
+    assert "(SUM(total_amount) / NULLIF(SUM(transaction_count), 0)) AS avg" in routed_sql
+    assert "GROUP BY day" in routed_sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT date_of_transaction, amount FROM transactions ORDER BY date_of_transaction",
+    "SELECT description, SUM(amount) FROM transactions GROUP BY description",
+    "SELECT COUNT(DISTINCT category) FROM transactions",
+])
+def test_unroutable_queries_stay_on_transactions(sql):
+    assert route_to_rollups(sql) is None
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from utils.sql_translation_cache import (
+    normalize_query,
+    _templatize_sql,
+    _cache_key,
+    lookup_sql_translation,
+    store_sql_translation,
+    sql_translation_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    sql_translation_cache.clear()
+    yield
+    sql_translation_cache.clear()
+
+
+def test_normalize_query_turns_numbers_and_categories_into_slots():
+    template, slots = normalize_query("How much did I spend on Eating Out in the last 7 days?")
+
+    assert template == "how much did i spend on <cat0> in the last <num0> days"
+    assert slots == {"cat0": "eating_out", "num0": "7"}
+
+
+def test_templatize_sql_replaces_numbers_and_categories():
+    sql = (
+        "SELECT SUM(amount) FROM transactions WHERE category = 'groceries' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '30 days'"
+    )
+
+    assert _templatize_sql(sql, {"cat0": "groceries", "num0": "30"}) == (
+        "SELECT SUM(amount) FROM transactions WHERE category = '__SLOT_CAT0__' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '__SLOT_NUM0__ days'"
+    )
+
+
+def test_templatize_sql_replaces_every_part_of_a_date():
+    sql = "SELECT * FROM transactions WHERE date_of_transaction >= '2026-09-15'"
+    _, slots = normalize_query("transactions since 2026-09-15")
+
+    assert slots == {"num0": "2026", "num1": "09", "num2": "15"}
+    assert _templatize_sql(sql, slots) == (
+        "SELECT * FROM transactions WHERE date_of_transaction >= '__SLOT_NUM0__-__SLOT_NUM1__-__SLOT_NUM2__'"
+    )
+
+
+@pytest.mark.parametrize("sql, slots", [
+    # Category the SQL doesn't mention as a literal
+    ("SELECT SUM(amount) FROM transactions", {"cat0": "groceries"}),
+    # Short number that also appears for another reason
+    ("SELECT * FROM transactions WHERE amount > 5 ORDER BY amount DESC LIMIT 5", {"num0": "5"}),
+    # Two slots with the same value can't be told apart
+    ("SELECT * FROM transactions WHERE amount BETWEEN 10 AND 10", {"num0": "10", "num1": "10"}),
+    # Number only present inside a bigger one
+    ("SELECT * FROM transactions WHERE amount > 100", {"num0": "10"}),
+])
+def test_templatize_sql_refuses_ambiguous_slots(sql, slots):
+    assert _templatize_sql(sql, slots) is None
+
+
+def test_cached_translation_is_refilled_with_new_values():
+    store_sql_translation(
+        "spent on groceries in the last 30 days",
+        "SELECT SUM(amount) FROM transactions WHERE category = 'groceries' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '30 days'"
+    )
+
+    assert lookup_sql_translation("Spent on transport in the last 14 days?") == (
+        "SELECT SUM(amount) FROM transactions WHERE category = 'transport' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '14 days'"
+    )
+
+
+def test_cached_date_is_refilled_with_new_values():
+    store_sql_translation(
+        "transactions since 2026-09-15",
+        "SELECT * FROM transactions WHERE date_of_transaction >= '2026-09-15'"
+    )
+
+    assert lookup_sql_translation("transactions since 2025-01-31") == (
+        "SELECT * FROM transactions WHERE date_of_transaction >= '2025-01-31'"
+    )
+
+
+def test_different_query_shape_misses():
+    store_sql_translation(
+        "spent on groceries in the last 30 days",
+        "SELECT SUM(amount) FROM transactions WHERE category = 'groceries' "
+        "AND date_of_transaction >= CURRENT_DATE - INTERVAL '30 days'"
+    )
+
+    assert lookup_sql_translation("spent on groceries in the last 30 weeks") is None
+
+
+def test_cache_hit_failing_revalidation_is_a_miss():
+    template, _ = normalize_query("show groceries")
+    sql_translation_cache.set(
+        _cache_key(template),
+        json.dumps({"sql_template": "DELETE FROM transactions WHERE category = '__SLOT_CAT0__'", "slots": ["cat0"]}),
+        60
+    )
+
+    assert lookup_sql_translation("show transport") is None
+
+
+def test_cache_hit_with_other_slots_is_a_miss():
+    template, _ = normalize_query("show groceries")
+    sql_translation_cache.set(
+        _cache_key(template),
+        json.dumps({"sql_template": "SELECT * FROM transactions", "slots": ["cat0", "num0"]}),
+        60
+    )
+
+    assert lookup_sql_translation("show transport") is None
@@ -0,0 +1,86 @@
+import core.tracing as tracing
+from core.tracing import traced_node, trace_db_call, trace_cache_lookup
+
+
+def _collect_spans(monkeypatch):
+    spans = []
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    monkeypatch.setattr(tracing, "_span_listeners", [spans.append])
+    return spans
+
+
+def test_cache_lookups_are_not_db_calls(monkeypatch):
+    spans = _collect_spans(monkeypatch)
+
+    def node(state):
+        with trace_cache_lookup("query_result") as lookup:
+            lookup["hit"] = True
+        with trace_db_call("execute_sql") as call:
+            call["rows"] = 3
+        return {"results": []}
+
+    traced_node("QueryTransactions", node).invoke({})
+
+    span, = spans
+    assert [call["kind"] for call in span["db_calls"]] == ["execute_sql"]
+    assert [(lookup["cache"], lookup["hit"]) for lookup in span["cache_lookups"]] == [("query_result", True)]
+    assert span["db_ms"] == span["db_calls"][0]["duration_ms"]
+
+
+def test_result_size_comes_from_counts_already_there():
+    results = [
+        {"type": "query_result", "data_fetched_from_database": [{"total": 1}, {"total": 2}]},
+        {"type": "query_result", "data_fetched_from_database": {"columns": ["a"], "rows": [[1]] * 5}, "row_count": 40},
+        {"type": "add_transaction", "transaction_id": 7},
+    ]
+
+    assert tracing._result_size(results) == {"result_entries": 3, "result_rows": 42}
+
+
+def test_spans_are_buffered_then_appended(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_BUFFER_SPANS", 3)
+    monkeypatch.setattr(tracing, "TRACE_FLUSH_INTERVAL", 3600)
+    store = tracing.TraceStore(str(tmp_path / "traces.jsonl"), max_bytes=10_000)
+
+    store.write({"span": 1})
+    store.write({"span": 2})
+    assert not (tmp_path / "traces.jsonl").exists()
+    assert store.buffered() == 2
+
+    store.write({"span": 3})
+    assert (tmp_path / "traces.jsonl").read_text().splitlines() == ['{"span":1}', '{"span":2}', '{"span":3}']
+    assert store.spans_written == 3 and store.buffered() == 0
+
+
+def test_trace_file_is_rotated_past_max_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_BUFFER_SPANS", 1)
+    path = tmp_path / "traces.jsonl"
+    store = tracing.TraceStore(str(path), max_bytes=40)
+
+    for span in range(5):
+        store.write({"span": span, "pad": "x" * 5})
+
+    assert store.rotations >= 1
+    assert path.stat().st_size <= 40
+    assert (tmp_path / "traces.jsonl.1").exists()
+
+
+def test_sampling_keeps_or_drops_whole_traces(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.25)
+
+    assert tracing._sampled("00000000" + "0" * 24)
+    assert not tracing._sampled("ffffffff" + "0" * 24)
+
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    assert tracing._sampled("ffffffff" + "0" * 24)
+
+
+def test_unsampled_spans_still_reach_listeners(monkeypatch):
+    spans = _collect_spans(monkeypatch)
+    written = []
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(tracing.trace_store, "write", written.append)
+
+    traced_node("ResponseGenerator", lambda state: {"results": []}).invoke({})
+
+    assert len(spans) == 1 and written == []
@@ -0,0 +1,95 @@
+import pytest
+
+import utils.write_behind as write_behind
+from utils.write_behind import transaction_journal, flush_pending_transactions
+
+
+@pytest.fixture(autouse=True)
+def empty_journal():
+    conn = transaction_journal._connection()
+    conn.execute("DELETE FROM pending_transactions")
+    conn.commit()
+
+
+def _journal(*descriptions):
+    return [
+        transaction_journal.append({
+            "amount": 10.0,
+            "category": "groceries",
+            "description": description,
+            "date_of_transaction": "2026-10-01"
+        })["idempotency_key"]
+        for description in descriptions
+    ]
+
+
+def _make_due_again():
+    conn = transaction_journal._connection()
+    conn.execute("UPDATE pending_transactions SET next_attempt_at = 0")
+    conn.commit()
+
+
+def _flushed_descriptions():
+    return {row["description"] for row in write_behind.storage.execute_sql(
+        "SELECT description FROM transactions WHERE description LIKE 'wb-%'"
+    )}
+
+
+def _insert_rejecting(bad_description, real_insert):
+    def insert(entries):
+        if any(entry["description"] == bad_description for entry in entries):
+            raise RuntimeError("Batch insert into database failed: violates check constraint")
+        return real_insert(entries)
+    return insert
+
+
+def test_bad_row_is_isolated_and_dead_lettered(monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(write_behind, "insert_transactions_idempotent",
+                        _insert_rejecting("wb-bad", write_behind.insert_transactions_idempotent))
+    _journal("wb-first", "wb-bad", "wb-third", "wb-fourth")
+
+    assert flush_pending_transactions() == {"flushed": 3, "failed": 1, "dead_lettered": 0}
+    assert _flushed_descriptions() == {"wb-first", "wb-third", "wb-fourth"}
+    assert [entry["description"] for entry in transaction_journal.pending()] == ["wb-bad"]
+
+    _make_due_again()
+    _journal("wb-later")
+
+    assert flush_pending_transactions() == {"flushed": 1, "failed": 0, "dead_lettered": 1}
+    assert "wb-later" in _flushed_descriptions()
+    assert transaction_journal.pending() == []
+    assert transaction_journal.stats()["dead_lettered"] == 1
+
+
+def test_outage_backs_off_without_dead_lettering(monkeypatch):
+    def unreachable(entries):
+        raise RuntimeError("Batch insert into database failed: connection refused")
+
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(write_behind, "insert_transactions_idempotent", unreachable)
+    monkeypatch.setattr(write_behind.storage, "supports_idempotent_inserts", lambda: False)
+    _journal("wb-outage-1", "wb-outage-2")
+
+    for _ in range(3):
+        assert flush_pending_transactions() == {"flushed": 0, "failed": 2, "dead_lettered": 0}
+        _make_due_again()
+
+    assert len(transaction_journal.pending()) == 2
+    assert transaction_journal.stats()["dead_lettered"] == 0
+
+
+def test_journal_errors_do_not_escape_the_flush(monkeypatch):
+    def broken_journal(*args, **kwargs):
+        raise write_behind.sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(transaction_journal, "mark_flushed", broken_journal)
+    _journal("wb-journal-error")
+
+    assert flush_pending_transactions() == {"flushed": 0, "failed": 0, "dead_lettered": 0}
+    # Committed upstream, still journaled: the next flush skips it as a duplicate
+    assert "wb-journal-error" in _flushed_descriptions()
+
+    monkeypatch.undo()
+    assert flush_pending_transactions()["flushed"] == 1
+    assert transaction_journal.pending() == []
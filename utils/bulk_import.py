@@ -0,0 +1,174 @@
+import os
+import csv
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator, Union, TextIO
+from dotenv import load_dotenv
+import pandas as pd
+from utils.validation import validate_insert_batch
+from utils.date_resolver import resolve_date_expression
+from utils.insert_data import insert_transactions_batch
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("BulkImport")
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+# Only a sample of rejected rows is kept so the report stays small for huge files
+BULK_IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("BULK_IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+# Common bank-export headers → transaction fields
+DEFAULT_COLUMN_ALIASES = {
+    "amount": "amount",
+    "debit": "amount",
+    "withdrawal": "amount",
+    "category": "category",
+    "date": "date_of_transaction",
+    "date_of_transaction": "date_of_transaction",
+    "transaction_date": "date_of_transaction",
+    "description": "description",
+    "narration": "description",
+    "details": "description",
+}
+
+
+def _map_row(raw_row: Dict[str, Any], column_map: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Renames a CSV row to transaction fields. Empty cells are left out so the
+    validator reports them as missing; thousands separators are dropped from amounts.
+    """
+    row = {}
+    for header, value in raw_row.items():
+        field = column_map.get((header or "").strip().lower())
+        if field is None or field in row or value is None:
+            continue
+        value = value.strip()
+        if not value:
+            continue
+        if field == "amount":
+            value = value.replace(",", "")
+        row[field] = value
+    return row
+
+
+def _iter_batches(reader: Iterator[Dict[str, Any]], column_map: Dict[str, str], batch_size: int):
+    """
+    Yields (first_line_number, rows) batches; at most one batch is held in memory.
+    """
+    batch, first_line = [], 2  # line 1 is the header
+    for line_number, raw_row in enumerate(reader, start=2):
+        if not batch:
+            first_line = line_number
+        batch.append(_map_row(raw_row, column_map))
+        if len(batch) >= batch_size:
+            yield first_line, batch
+            batch = []
+    if batch:
+        yield first_line, batch
+
+
+def resolve_batch_dates(rows: List[Dict[str, Any]], date_format: Optional[str] = None) -> List[Optional[str]]:
+    """
+    Resolves the date column of a validated batch to ISO dates.
+    Dates matching date_format (default YYYY-MM-DD) are parsed as one column;
+    anything else goes through resolve_date_expression.
+
+    Returns:
+        ISO date per row, or None where the date could not be resolved
+    """
+    raw_dates = pd.Series([row["date_of_transaction"] for row in rows], dtype=object)
+    parsed = pd.to_datetime(raw_dates, format=date_format or "%Y-%m-%d", errors="coerce")
+
+    resolved = []
+    for raw_date, parsed_date in zip(raw_dates, parsed):
+        if not pd.isna(parsed_date):
+            resolved.append(parsed_date.date().isoformat())
+            continue
+        try:
+            resolved.append(resolve_date_expression(raw_date))
+        except ValueError:
+            resolved.append(None)
+
+    return resolved
+
+
+def import_transactions_csv(
+    source: Union[str, TextIO],
+    column_map: Optional[Dict[str, str]] = None,
+    date_format: Optional[str] = None,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    absolute_amounts: bool = True
+) -> Dict[str, Any]:
+    """
+    Bulk statement import: streams a CSV / bank export, validates it in columnar
+    batches, resolves dates and inserts each batch with one Supabase call.
+
+    Args:
+        source: File path or an open text file
+        column_map: Extra {csv header (lowercase): field} mappings on top of DEFAULT_COLUMN_ALIASES
+        date_format: strptime format of the file's dates (e.g. "%d/%m/%Y"); ISO by default
+        batch_size: Rows per validation batch and per insert call
+        absolute_amounts: Import negative amounts (debits in many bank exports) as positive expenses;
+            with False they are rejected like zero amounts
+
+    Returns:
+        {
+            "rows_read": int,
+            "inserted": int,
+            "rejected": int,
+            "failed": int,          # valid rows whose batch insert failed
+            "batches": int,
+            "errors": List[Dict]    # {"line": int, "errors": List[str]}, capped sample
+        }
+    """
+    column_map = {**DEFAULT_COLUMN_ALIASES, **(column_map or {})}
+    report = {"rows_read": 0, "inserted": 0, "rejected": 0, "failed": 0, "batches": 0, "errors": []}
+
+    def reject(line, errors):
+        report["rejected"] += 1
+        if len(report["errors"]) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line, "errors": errors})
+
+    close_file = isinstance(source, str)
+    file = open(source, newline="", encoding="utf-8-sig") if close_file else source
+    start_time = datetime.now()
+
+    try:
+        reader = csv.DictReader(file)
+        for first_line, rows in _iter_batches(reader, column_map, batch_size):
+            report["rows_read"] += len(rows)
+            report["batches"] += 1
+
+            validation_result = validate_insert_batch(rows, absolute_amounts=absolute_amounts)
+            for rejected_row in validation_result["rejected"]:
+                reject(first_line + rejected_row["index"], rejected_row["errors"])
+
+            clean_rows = validation_result["clean_rows"]
+            resolved_dates = resolve_batch_dates(clean_rows, date_format) if clean_rows else []
+
+            insert_rows = []
+            for index, row, resolved_date in zip(validation_result["clean_indexes"], clean_rows, resolved_dates):
+                if resolved_date is None:
+                    reject(first_line + index, [f"Unrecognized date: {row['date_of_transaction']}"])
+                    continue
+                insert_rows.append({**row, "date_of_transaction": resolved_date})
+
+            try:
+                insert_result = insert_transactions_batch(insert_rows)
+                report["inserted"] += len(insert_result["transaction_ids"])
+            except RuntimeError as e:
+                logger.warning("Batch starting at line %s failed: %s", first_line, e)
+                report["failed"] += len(insert_rows)
+                if len(report["errors"]) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": first_line, "errors": [f"Batch insert failed: {e}"]})
+    finally:
+        if close_file:
+            file.close()
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    logger.info(
+        "%s rows in %s batches (%.1fs): %s inserted, %s rejected, %s failed",
+        report['rows_read'], report['batches'], elapsed, report['inserted'], report['rejected'], report['failed']
+    )
+
+    return report
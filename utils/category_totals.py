@@ -0,0 +1,68 @@
+from typing import Dict
+from db.storage import storage
+from core.tracing import trace_db_call
+from utils.validation import ALLOWED_CATEGORIES
+from core.logger import get_logger
+
+logger = get_logger("CategoryTotals")
+
+# Tables and RPCs are defined in db/category_totals.sql and db/transaction_rollups.sql.
+# Inserts keep them up to date in the same transaction (db/transaction_aggregates.sql).
+CATEGORY_TOTALS_TABLE = "category_spending_totals"
+
+
+def rebuild_category_totals() -> None:
+    """
+    Recomputes every category total from the transactions table.
+    Used for the initial backfill and to repair totals after manual edits.
+
+    Raises:
+        RuntimeError: If the rebuild RPC fails
+    """
+    logger.info("Rebuilding category totals from transactions")
+
+    try:
+        storage.rebuild_category_totals()
+    except Exception as e:
+        raise RuntimeError(f"Failed to rebuild category totals: {e}")
+
+
+def get_category_totals() -> Dict[str, float]:
+    """
+    Reads the maintained per-category spending totals, one row per category.
+
+    Returns:
+        {category: total_amount} for every allowed category (0.0 when no spending)
+
+    Raises:
+        RuntimeError: If the totals can't be read
+    """
+    try:
+        with trace_db_call("get_category_totals"):
+            rows = storage.get_category_totals()
+    except Exception as e:
+        raise RuntimeError(f"Failed to read category totals: {e}")
+
+    totals = {category: 0.0 for category in ALLOWED_CATEGORIES}
+    for row in rows:
+        category = (row.get("category") or "").lower()
+        if category in totals:
+            totals[category] = float(row.get("total_amount") or 0.0)
+
+    return totals
+
+
+def rebuild_transaction_rollups() -> None:
+    """
+    One-time backfill of the daily and monthly rollups from the transactions table
+    (also repairs them after manual edits).
+
+    Raises:
+        RuntimeError: If the rebuild RPC fails
+    """
+    logger.info("Rebuilding transaction rollups from transactions")
+
+    try:
+        storage.rebuild_transaction_rollups()
+    except Exception as e:
+        raise RuntimeError(f"Failed to rebuild transaction rollups: {e}")
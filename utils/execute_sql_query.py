@@ -1,9 +1,27 @@
-from typing import Dict, Any, List
-from db.init_client import supabase
+import os
+import csv
+import json
+import sqlite3
+from typing import Dict, Any, List, Iterator, Optional
+from dotenv import load_dotenv
+from db.storage import storage
+from core.tracing import trace_db_call, trace_cache_lookup
+from utils.local_replica import LOCAL_REPLICA_ENABLED, execute_on_replica, transaction_replica
+from utils.query_result_cache import lookup_query_result, store_query_result
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("DB")
+
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "1000"))
 
 def execute_select_query(sql_query: str) -> List[Dict[str, Any]]:
     """
-    Executes a SQL SELECT query on Supabase.
+    Executes a SQL SELECT query on the local replica when enabled,
+    otherwise (or if the replica can't answer it) on the storage backend
+    (Supabase's execute_sql RPC, or the local SQLite database).
+    Results are cached until the next transaction write (or the day changes).
     
     Args:
         sql_query: A SQL SELECT query string
@@ -14,18 +32,154 @@ def execute_select_query(sql_query: str) -> List[Dict[str, Any]]:
     Raises:
         RuntimeError: If query execution fails
     """
-    print(f"[DB] Executing SQL query: {sql_query}")
+    logger.debug("Executing SQL query: %s", sql_query)
+    
+    with trace_cache_lookup("query_result") as cache_lookup:
+        cached_rows, cache_key = lookup_query_result(sql_query)
+        cache_lookup["hit"] = cached_rows is not None
+    if cached_rows is not None:
+        return cached_rows
+    
+    if LOCAL_REPLICA_ENABLED:
+        try:
+            with trace_db_call("replica_query") as db_call:
+                rows = execute_on_replica(sql_query)
+                db_call["rows"] = len(rows)
+            store_query_result(cache_key, rows)
+            return rows
+        except RuntimeError as e:
+            logger.warning("%s, falling back to Supabase", e)
     
     try:
-        # Use the RPC (Remote Procedure Call) method to execute raw SQL
-        result = supabase.rpc('execute_sql', {'query': sql_query}).execute()
-        
-        if not result.data:
-            return []
+        with trace_db_call("execute_sql") as db_call:
+            rows = storage.execute_sql(sql_query)
+            db_call["rows"] = len(rows)
             
-        print(f"[DB] Query returned {len(result.data)} rows")
-        return result.data
+        logger.info("Query returned %s rows", len(rows))
+        store_query_result(cache_key, rows)
+        return rows
         
     except Exception as e:
-        print(f"[DB] Query execution failed: {e}")
-        raise RuntimeError(f"Failed to execute query: {e}")
\ No newline at end of file
+        logger.warning("Query execution failed: %s", e)
+        raise RuntimeError(f"Failed to execute query: {e}")
+
+
+def _sql_literal(value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _page_sql(sql_query: str, page_size: int, keyset_column: Optional[str], last_key, offset: int) -> str:
+    if keyset_column:
+        column = '"' + keyset_column.replace('"', '""') + '"'
+        where = "" if last_key is None else f" WHERE {column} > {_sql_literal(last_key)}"
+        return f"SELECT * FROM ({sql_query}) AS page{where} ORDER BY {column} LIMIT {page_size}"
+    return f"SELECT * FROM ({sql_query}) AS page LIMIT {page_size} OFFSET {offset}"
+
+
+def iter_select_query(
+    sql_query: str,
+    page_size: int = QUERY_PAGE_SIZE,
+    keyset_column: Optional[str] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Executes a SQL SELECT query and yields its rows page by page, so memory stays
+    bounded by one page and callers can stop early (previews, running aggregates).
+
+    On the local replica the rows are streamed from one cursor. On Supabase each page
+    is a separate RPC call:
+    - keyset_column (e.g. "transaction_id"): WHERE key > last ORDER BY key pages,
+      stable under concurrent inserts; rows come back ordered by that column
+    - otherwise LIMIT/OFFSET pages over the query, which must ORDER BY a unique key
+      for the pages to be consistent; every page rescans the rows before it, so this
+      is quadratic in the result size and logs a warning once a second page is needed
+
+    Raises:
+        RuntimeError: If a page can't be fetched
+    """
+    logger.debug("Streaming SQL query in pages of %s: %s", page_size, sql_query)
+
+    if LOCAL_REPLICA_ENABLED:
+        pages_yielded = 0
+        try:
+            transaction_replica.ensure_fresh()
+            for page in transaction_replica.iter_pages(sql_query, page_size):
+                pages_yielded += 1
+                yield page
+            return
+        except (RuntimeError, ValueError, sqlite3.Error) as e:
+            # Only safe to fall back before any page was handed out
+            if pages_yielded:
+                raise RuntimeError(f"Failed to stream query from replica: {e}")
+            logger.warning("Replica could not stream query (%s), falling back to Supabase", e)
+
+    last_key, offset = None, 0
+
+    while True:
+        page_sql = _page_sql(sql_query, page_size, keyset_column, last_key, offset)
+
+        try:
+            rows = storage.execute_sql(page_sql)
+        except Exception as e:
+            logger.warning("Page query failed: %s", e)
+            raise RuntimeError(f"Failed to execute query: {e}")
+
+        if rows:
+            yield rows
+
+        if len(rows) < page_size:
+            return
+
+        offset += len(rows)
+        if keyset_column:
+            last_key = rows[-1][keyset_column]
+        elif offset == len(rows):
+            logger.warning("Paging with OFFSET, each page rescans the earlier rows; pass keyset_column for large results")
+
+
+def export_select_query(
+    sql_query: str,
+    path: str,
+    file_format: str = "csv",
+    page_size: int = QUERY_PAGE_SIZE,
+    keyset_column: str = "transaction_id"
+) -> Dict[str, Any]:
+    """
+    Streams a SELECT query's rows straight to a CSV or JSON Lines file, one page at a time.
+    Exports are large by nature, so pages are always keyset-paged: the query must
+    select keyset_column (a unique column), and rows are written in its order.
+
+    Returns:
+        {"path": str, "rows": int, "pages": int}
+
+    Raises:
+        RuntimeError: If a page can't be fetched
+        ValueError: If the format isn't "csv" or "jsonl", or keyset_column is empty
+    """
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported export format: {file_format}")
+    if not keyset_column:
+        raise ValueError("Exports need a keyset_column to page by")
+
+    row_count, page_count = 0, 0
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = None
+
+        for page in iter_select_query(sql_query, page_size, keyset_column):
+            page_count += 1
+            row_count += len(page)
+
+            if file_format == "jsonl":
+                file.writelines(json.dumps(row, default=str) + "\n" for row in page)
+                continue
+
+            if writer is None:
+                writer = csv.DictWriter(file, fieldnames=list(page[0].keys()), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerows(page)
+
+    logger.info("Exported %s rows in %s pages to %s", row_count, page_count, path)
+
+    return {"path": path, "rows": row_count, "pages": page_count}
@@ -0,0 +1,178 @@
+import warnings
+import threading
+from typing import Dict, Any, List, Optional
+import numpy as np
+from core.logger import get_logger
+
+logger = get_logger("ForestInference")
+
+
+class CompiledForest:
+    """
+    A fitted sklearn tree ensemble (RandomForestRegressor / ExtraTreesRegressor)
+    flattened into NumPy node arrays for fast direct evaluation.
+
+    All trees share one set of arrays (feature, threshold, children, values);
+    each tree's nodes are offset so a node id is global. Evaluation walks every
+    (row, tree) pair down in lock-step, one level per step, so the cost is
+    ~max_depth vectorized gathers regardless of the number of rows.
+
+    Outputs match sklearn's predict(): inputs are compared as float32 like the
+    Cython tree code, NaNs follow missing_go_to_left, and tree outputs are summed
+    in estimator order before dividing by the number of trees.
+    """
+
+    def __init__(self, model, feature_names: List[str]):
+        estimators = model.estimators_
+        trees = [estimator.tree_ for estimator in estimators]
+
+        node_counts = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+        features, thresholds, lefts, rights, missing_left, values = [], [], [], [], [], []
+
+        for tree, offset in zip(trees, offsets):
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            is_leaf = left == -1
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+
+            # Leaves point to themselves so extra lock-step iterations are no-ops
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+            missing_left.append(
+                np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool)
+            )
+            values.append(tree.value[:, :, 0].astype(np.float64))
+
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.children_left = np.concatenate(lefts)
+        self.children_right = np.concatenate(rights)
+        self.missing_go_to_left = np.concatenate(missing_left)
+        self.value = np.concatenate(values)
+        self.roots = offsets
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        self.n_trees = len(trees)
+        self.n_outputs = self.value.shape[1]
+        self.feature_names = list(feature_names)
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+
+    def vectorize(self, features: Dict[str, Any]) -> np.ndarray:
+        """
+        Builds a (1, n_features) row in the model's feature order.
+        Missing features become NaN, like DataFrame(columns=feature_names) would.
+        """
+        row = np.full((1, len(self.feature_names)), np.nan, dtype=np.float64)
+        for name, value in features.items():
+            index = self.feature_index.get(name)
+            if index is not None:
+                row[0, index] = float(value)
+        return row
+
+    def vectorize_many(self, feature_rows: List[Dict[str, Any]]) -> np.ndarray:
+        return np.vstack([self.vectorize(features) for features in feature_rows])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Scores a (n_samples, n_features) matrix.
+
+        Returns:
+            (n_samples, n_outputs) array, or (n_samples,) for single-output models
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_trees)).copy()
+        row_ids = np.arange(n_samples)[:, None]
+
+        for _ in range(self.max_depth):
+            x = X[row_ids, self.feature[nodes]]
+            go_left = np.where(
+                np.isnan(x),
+                self.missing_go_to_left[nodes],
+                x <= self.threshold[nodes]
+            )
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+
+        leaf_values = self.value[nodes]  # (n_samples, n_trees, n_outputs)
+
+        # Same accumulation order as sklearn: tree by tree, then divide
+        prediction = np.zeros((n_samples, self.n_outputs), dtype=np.float64)
+        for tree_index in range(self.n_trees):
+            prediction += leaf_values[:, tree_index, :]
+        prediction /= self.n_trees
+
+        if self.n_outputs == 1:
+            return prediction[:, 0]
+        return prediction
+
+
+def compile_forest(model, feature_names: List[str]) -> Optional[CompiledForest]:
+    """
+    Compiles a fitted tree ensemble, or returns None when the model isn't one
+    (e.g. a Pipeline) or when the compiled outputs don't reproduce sklearn's.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not all(hasattr(estimator, "tree_") for estimator in estimators):
+        return None
+
+    if getattr(model, "n_features_in_", len(feature_names)) != len(feature_names):
+        return None
+
+    if type(model).__name__ not in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return None
+
+    forest = CompiledForest(model, feature_names)
+
+    # Self-check on probe rows before trusting the compiled path
+    probe_rng = np.random.default_rng(0)
+    probe = probe_rng.normal(size=(16, len(feature_names))) * 10_000
+    probe[0] = 0.0
+    with warnings.catch_warnings():
+        # Fitted on a DataFrame → sklearn warns about the bare array
+        warnings.simplefilter("ignore", UserWarning)
+        expected = model.predict(probe)
+    actual = forest.predict(probe)
+
+    # Exact in the sequential case; tolerance only absorbs sklearn's n_jobs>1 summation order
+    if not np.allclose(actual, expected, rtol=1e-12, atol=1e-9):
+        logger.warning("Compiled forest does not match sklearn, using sklearn predict")
+        return None
+
+    logger.info("Compiled %s trees (%s nodes, depth %s)", forest.n_trees, len(forest.feature), forest.max_depth)
+    return forest
+
+
+_compiled_lock = threading.Lock()
+_compiled = (None, None)  # (model sha256, CompiledForest or None), swapped as one reference
+
+
+def get_compiled_forest(model_package: Dict[str, Any]) -> Optional[CompiledForest]:
+    """
+    Returns the compiled forest for a model registry entry, compiling it once per model version.
+    """
+    global _compiled
+
+    sha256 = model_package.get("sha256")
+
+    compiled_sha256, forest = _compiled
+    if compiled_sha256 == sha256:
+        return forest
+
+    with _compiled_lock:
+        compiled_sha256, forest = _compiled
+        if compiled_sha256 == sha256:
+            return forest
+
+        try:
+            forest = compile_forest(model_package["model"], model_package["metadata"]["feature_names"])
+        except Exception as e:
+            logger.warning("Compilation failed, using sklearn predict: %s", e)
+            forest = None
+
+        _compiled = (sha256, forest)
+        return forest
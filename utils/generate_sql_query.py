@@ -1,12 +1,18 @@
 import json
 from prompts.sql_query_generator import GENERATE_SQL_QUERY_TOOL_PROMPT
-from core.llm import llm_call
+from core.llm import llm_call, allm_call
+from core.logger import get_logger
 
+logger = get_logger("SQLGen")
 
-def generate_sql_query(natural_language_query: str):
-    print(f"[SQLGen] User query: {natural_language_query}")
+# Generated SQL only uses CURRENT_DATE-relative filters, so it stays valid across days
+SQL_CACHE_TTL = 24 * 60 * 60  # seconds
+
+
+def build_sql_prompt(natural_language_query: str) -> str:
+    logger.debug("User query: %s", natural_language_query)
 
-    prompt = f"""
+    return f"""
 QUERY:
 {natural_language_query}
 
@@ -14,12 +20,12 @@ SYSTEM INSTRUCTIONS:
 {GENERATE_SQL_QUERY_TOOL_PROMPT}
 """
 
-    llm_output_text, llm_error = llm_call(prompt)
 
+def parse_sql_output(llm_output_text, llm_error):
     if llm_error:
         return None, llm_error
 
-    print(f"[SQLGen] Raw LLM Output:\n{llm_output_text}")
+    logger.debug("Raw LLM Output: %s", llm_output_text)
 
     try:
         cleaned_json = (
@@ -49,6 +55,22 @@ SYSTEM INSTRUCTIONS:
         return None, error_entry
 
 
+def generate_sql_query(natural_language_query: str):
+    prompt = build_sql_prompt(natural_language_query)
+
+    llm_output_text, llm_error = llm_call(prompt, cache_ttl=SQL_CACHE_TTL)
+
+    return parse_sql_output(llm_output_text, llm_error)
+
+
+async def agenerate_sql_query(natural_language_query: str):
+    prompt = build_sql_prompt(natural_language_query)
+
+    llm_output_text, llm_error = await allm_call(prompt, cache_ttl=SQL_CACHE_TTL)
+
+    return parse_sql_output(llm_output_text, llm_error)
+
+
 # import json
 # from prompts.sql_query_generator import GENERATE_SQL_QUERY_TOOL_PROMPT
 # from core.llm import llm_call
@@ -1,8 +1,14 @@
-from typing import Dict, Any 
-from db.init_client import supabase
+from typing import Dict, Any, List
+from db.storage import storage
+from core.tracing import trace_db_call
+from utils.local_replica import mark_replica_stale
+from utils.query_result_cache import bump_data_version
+from core.logger import get_logger
+
+logger = get_logger("DB")
 
 def insert_transaction(expense: Dict[str, Any]) -> Dict[str, int]:
-    print(f"[DB] Inserting transaction: {expense}")
+    logger.debug("Inserting transaction: %s", expense)
 
     data = {
         "amount": expense["amount"],
@@ -11,17 +17,139 @@ def insert_transaction(expense: Dict[str, Any]) -> Dict[str, int]:
         "description": expense.get("description"),
     }
 
-    result = supabase.table("transactions").insert(data).execute()
+    try:
+        with trace_db_call("insert_transaction"):
+            inserted_rows = storage.insert_transactions([data])
+    finally:
+        _after_write()
 
-    if not result.data:
-        raise RuntimeError("Insert into Supabase database failed")
+    if not inserted_rows:
+        raise RuntimeError("Insert into database failed")
 
-    inserted_row = result.data[0]
+    inserted_row = inserted_rows[0]
 
     transaction_id = inserted_row.get("id") or inserted_row.get("transaction_id")
     if not transaction_id:
         raise RuntimeError("Insert succeeded but no transaction ID returned")
 
-    print(f"[DB] Inserted transaction_id = {transaction_id}")
+    logger.info("Inserted transaction_id = %s", transaction_id)
 
     return {"transaction_id": transaction_id}
+
+
+def insert_transactions_batch(expenses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Inserts many already validated transactions with a single storage call.
+
+    Returns:
+        {"transaction_ids": List[int]}
+
+    Raises:
+        RuntimeError: If the batch insert fails
+    """
+    if not expenses:
+        return {"transaction_ids": []}
+
+    logger.info("Inserting batch of %s transactions", len(expenses))
+
+    data = [
+        {
+            "amount": expense["amount"],
+            "category": expense["category"],
+            "date_of_transaction": expense["date_of_transaction"],
+            "description": expense.get("description"),
+        }
+        for expense in expenses
+    ]
+
+    try:
+        with trace_db_call("insert_transactions_batch") as db_call:
+            db_call["rows"] = len(data)
+            inserted_rows = storage.insert_transactions(data)
+    except Exception as e:
+        raise RuntimeError(f"Batch insert into database failed: {e}")
+    finally:
+        _after_write()
+
+    if len(inserted_rows) != len(data):
+        raise RuntimeError("Batch insert into database failed")
+
+    transaction_ids = [row.get("id") or row.get("transaction_id") for row in inserted_rows]
+
+    logger.info("Inserted %s transactions", len(transaction_ids))
+
+    return {"transaction_ids": transaction_ids}
+
+
+def insert_transactions_idempotent(expenses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Inserts transactions that each carry an "idempotency_key", with a single storage call.
+    Keys that were already inserted (e.g. a retried flush) are skipped and not
+    counted again in the category totals. Needs db/write_behind.sql.
+
+    Returns:
+        {"transaction_ids": {idempotency_key: transaction_id}} for every given key
+
+    Raises:
+        RuntimeError: If the insert fails
+    """
+    if not expenses:
+        return {"transaction_ids": {}}
+
+    logger.info("Inserting batch of %s transactions (idempotent)", len(expenses))
+
+    data = [
+        {
+            "amount": expense["amount"],
+            "category": expense["category"],
+            "date_of_transaction": expense["date_of_transaction"],
+            "description": expense.get("description"),
+            "idempotency_key": expense["idempotency_key"],
+        }
+        for expense in expenses
+    ]
+
+    try:
+        with trace_db_call("insert_transactions_idempotent") as db_call:
+            db_call["rows"] = len(data)
+            inserted_rows = storage.insert_transactions_ignoring_duplicates(data)
+    except Exception as e:
+        raise RuntimeError(f"Batch insert into database failed: {e}")
+    finally:
+        _after_write()
+
+    # Only newly inserted rows come back; duplicates were already stored and counted
+    transaction_ids = {
+        row["idempotency_key"]: row.get("id") or row.get("transaction_id")
+        for row in inserted_rows
+    }
+
+    already_inserted = [row["idempotency_key"] for row in data if row["idempotency_key"] not in transaction_ids]
+    if already_inserted:
+        logger.info("%s transactions were already inserted", len(already_inserted))
+        try:
+            with trace_db_call("lookup_idempotency_keys"):
+                existing_rows = storage.get_transactions_by_idempotency_keys(already_inserted)
+        except Exception as e:
+            raise RuntimeError(f"Failed to look up already inserted transactions: {e}")
+
+        for row in existing_rows:
+            transaction_ids[row["idempotency_key"]] = row.get("id") or row.get("transaction_id")
+
+    missing = [key for key in already_inserted if key not in transaction_ids]
+    if missing:
+        raise RuntimeError(f"Insert returned no transaction ID for {len(missing)} transactions")
+
+    logger.info("Inserted %s transactions", len(data) - len(already_inserted))
+
+    return {"transaction_ids": transaction_ids}
+
+
+def _after_write() -> None:
+    # Cached query results and the local replica no longer reflect the table.
+    # Runs after the insert returns (the aggregates are committed with it) so no pre-write
+    # answer is cached under the new version. Also runs when the call fails: a lost response
+    # may still have committed.
+    bump_data_version()
+    mark_replica_stale()
+
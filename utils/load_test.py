@@ -0,0 +1,539 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+# The harness runs offline unless told otherwise: stubbed LLM, SQLite storage and its own
+# cache / journal / trace files, so a run never spends quota or touches real data.
+# Anything set in the environment wins (e.g. LLM_BACKEND=replay, LLM_STUB_LATENCY_MS=300).
+# These must be in place before the project modules below read their config.
+LOAD_TEST_DIR = os.getenv("LOAD_TEST_DIR", "load_test_data")
+
+OFFLINE_DEFAULTS = {
+    "LLM_BACKEND": "stub",
+    "STORAGE_BACKEND": "sqlite",
+    "SQLITE_STORAGE_PATH": os.path.join(LOAD_TEST_DIR, "ledger.db"),
+    "LLM_CACHE_PATH": os.path.join(LOAD_TEST_DIR, "llm_cache.db"),
+    "WRITE_BEHIND_JOURNAL_PATH": os.path.join(LOAD_TEST_DIR, "write_behind.db"),
+    "TRACE_PATH": os.path.join(LOAD_TEST_DIR, "traces.jsonl"),
+    # Per-node latencies come from the spans
+    "TRACE_ENABLED": "true",
+    "LOG_LEVEL": "WARNING",
+}
+
+for _name, _value in OFFLINE_DEFAULTS.items():
+    os.environ.setdefault(_name, _value)
+
+from core.graph import build_graph
+from core.tracing import TRACE_ENABLED, add_span_listener, remove_span_listener
+from utils.write_behind import start_flush_worker
+from core.logger import get_logger
+
+logger = get_logger("LoadTest")
+
+TURN_TYPES = ("add", "query", "predict", "convo")
+DEFAULT_MIX = {"add": 4, "query": 3, "predict": 1, "convo": 2}
+
+# Action nodes a turn of each type may run; convo turns go straight to the ResponseGenerator.
+# add_transaction is never fanned out, queries and predictions can be (ParallelTasks).
+ACTION_NODES = {"AddTransaction", "QueryTransactions", "PredictSavings", "ParallelTasks"}
+EXPECTED_NODES = {
+    "add": {"AddTransaction"},
+    "query": {"QueryTransactions", "ParallelTasks"},
+    "predict": {"PredictSavings", "ParallelTasks"},
+    "convo": set()
+}
+
+# ==== CORPUS ====
+# Mix of fast-path messages and ones the Planner has to handle
+DEFAULT_CORPUS = [
+    {"type": "add", "text": "spent 250 on groceries yesterday"},
+    {"type": "add", "text": "I spent 120 on uber today"},
+    {"type": "add", "text": "paid 40 for coffee today"},
+    {"type": "add", "text": "spent 899 on electricity bill last month"},
+    {"type": "add", "text": "add 300 for movies last friday"},
+    {"type": "add", "text": "paid 1500 for doctor this week"},
+    {"type": "add", "text": "bought mangoes for 180 and popcorn for 60 yesterday"},
+    {"type": "add", "text": "Rs 450 on pizza with friends on saturday"},
+    {"type": "query", "text": "how much did I spend this month"},
+    {"type": "query", "text": "how much did I spend by category this month"},
+    {"type": "query", "text": "list my recent transactions"},
+    {"type": "query", "text": "show my biggest expenses"},
+    {"type": "query", "text": "what was my total spending on groceries last month"},
+    {"type": "query", "text": "average transport spending per week"},
+    {"type": "predict", "text": "predict my savings for all"},
+    {"type": "predict", "text": "predict savings for groceries and transport"},
+    {"type": "predict", "text": "can you forecast how much I'll save next month"},
+    {"type": "convo", "text": "hi"},
+    {"type": "convo", "text": "thanks a lot"},
+    {"type": "convo", "text": "good morning"},
+    {"type": "convo", "text": "what can you do for me?"},
+    {"type": "convo", "text": "who won the world cup"},
+]
+
+
+def load_corpus(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Reads utterances grouped by turn type. A corpus file is JSONL with
+    {"type": "add|query|predict|convo", "text": "..."} per line.
+
+    Returns:
+        {turn_type: [utterance, ...]}
+
+    Raises:
+        ValueError: If a line has an unknown turn type or no text
+    """
+    entries = DEFAULT_CORPUS
+    if path:
+        with open(path, encoding="utf-8") as corpus_file:
+            entries = [json.loads(line) for line in corpus_file if line.strip()]
+
+    corpus = {turn_type: [] for turn_type in TURN_TYPES}
+    for entry in entries:
+        if entry.get("type") not in corpus or not entry.get("text"):
+            raise ValueError(f"Bad corpus entry: {entry}")
+        corpus[entry["type"]].append(entry["text"])
+
+    return corpus
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    "add=4,query=3,predict=1,convo=2" → weights per turn type.
+
+    Raises:
+        ValueError: If a turn type is unknown or a weight isn't a number
+    """
+    weights = {}
+    for part in mix.split(","):
+        turn_type, _, weight = part.partition("=")
+        turn_type = turn_type.strip()
+        if turn_type not in TURN_TYPES:
+            raise ValueError(f"Unknown turn type '{turn_type}' in mix")
+        weights[turn_type] = float(weight)
+    return weights
+
+
+def build_workload(corpus: Dict[str, List[str]], mix: Dict[str, float], turns: int, seed: int) -> List[Dict[str, str]]:
+    """
+    Draws `turns` utterances: turn type by mix weight, then an utterance of that type.
+    Types without utterances in the corpus are skipped.
+    """
+    rng = random.Random(seed)
+    types = [turn_type for turn_type in TURN_TYPES if mix.get(turn_type, 0) > 0 and corpus[turn_type]]
+    if not types:
+        raise ValueError("The mix selects no turn type that has utterances in the corpus")
+
+    weights = [mix[turn_type] for turn_type in types]
+    workload = []
+    for _ in range(turns):
+        turn_type = rng.choices(types, weights)[0]
+        workload.append({"type": turn_type, "text": rng.choice(corpus[turn_type])})
+
+    return workload
+
+
+# ==== TURNS ====
+def _new_state(user_input: str) -> Dict[str, Any]:
+    # Same shape as a fresh chat in app.py, without streaming
+    return {
+        "user_name": "User",
+        "user_input": user_input,
+        "long_term_memory": [],
+        "short_term_memory": [],
+        "today_date_context": datetime.now().strftime("%Y-%m-%d"),
+        "tasks": [],
+        "tasks_count": 0,
+        "task_cursor": 0,
+        "current_task": None,
+        "results": [],
+        "route_to": None,
+        "final_output": "",
+        "should_continue": True,
+        "stream_response": False
+    }
+
+
+def _turn_record(item: Dict[str, str], started: float, final_state: Optional[Dict[str, Any]], error: Optional[Exception]) -> Dict[str, Any]:
+    record = {
+        "type": item["type"],
+        "text": item["text"],
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "ok": error is None,
+        "trace_id": None,
+        "error_results": 0
+    }
+
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    else:
+        record["trace_id"] = final_state.get("trace_id")
+        record["error_results"] = sum(
+            1 for result in final_state.get("results", [])
+            if result.get("type") == "error" or result.get("error")
+        )
+
+    return record
+
+
+def run_turn(app, item: Dict[str, str], scheduled: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Runs one turn through the compiled graph.
+    scheduled: open loop only, the perf_counter() time the turn was due; latency
+    is counted from there so time spent queueing for a worker is included.
+    """
+    started = scheduled if scheduled is not None else time.perf_counter()
+    try:
+        final_state = app.invoke(_new_state(item["text"]))
+    except Exception as e:
+        return _turn_record(item, started, None, e)
+    return _turn_record(item, started, final_state, None)
+
+
+async def arun_turn(app, item: Dict[str, str], scheduled: Optional[float] = None) -> Dict[str, Any]:
+    started = scheduled if scheduled is not None else time.perf_counter()
+    try:
+        final_state = await app.ainvoke(_new_state(item["text"]))
+    except Exception as e:
+        return _turn_record(item, started, None, e)
+    return _turn_record(item, started, final_state, None)
+
+
+# ==== LOAD MODES ====
+def _arrival_offsets(count: int, rate: float, seed: int) -> List[float]:
+    # Poisson arrivals: exponential gaps averaging 1 / rate seconds
+    rng = random.Random(seed)
+    offsets, elapsed = [], 0.0
+    for _ in range(count):
+        offsets.append(elapsed)
+        elapsed += rng.expovariate(rate)
+    return offsets
+
+
+def _run_sync(app, workload: List[Dict[str, str]], concurrency: int, rate: Optional[float], seed: int) -> List[Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate is None:
+            # Closed loop: each worker starts its next turn as soon as the previous one ends
+            futures = [pool.submit(run_turn, app, item) for item in workload]
+        else:
+            # Open loop: turns arrive on schedule whether or not earlier ones finished
+            futures = []
+            start = time.perf_counter()
+            for item, offset in zip(workload, _arrival_offsets(len(workload), rate, seed)):
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(run_turn, app, item, start + offset))
+
+        return [future.result() for future in futures]
+
+
+async def _run_async(app, workload: List[Dict[str, str]], concurrency: int, rate: Optional[float], seed: int) -> List[Dict[str, Any]]:
+    if rate is None:
+        pending = iter(workload)
+        records = []
+
+        async def worker():
+            for item in pending:
+                records.append(await arun_turn(app, item))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return records
+
+    # Open loop: concurrency caps turns in flight; later arrivals wait (and that wait is counted)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(item, scheduled):
+        async with semaphore:
+            return await arun_turn(app, item, scheduled)
+
+    tasks = []
+    start = time.perf_counter()
+    for item, offset in zip(workload, _arrival_offsets(len(workload), rate, seed)):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(limited(item, start + offset)))
+
+    return list(await asyncio.gather(*tasks))
+
+
+# ==== REPORT ====
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Linear interpolation between closest ranks (same as numpy's default).
+    """
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_stats(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2)
+    }
+
+
+def find_intent_mismatches(records: List[Dict[str, Any]], spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Turns whose action nodes don't match their corpus label (e.g. an "add" utterance
+    planned as a conversation), which would put their latency under the wrong turn type.
+    """
+    nodes_by_trace: Dict[str, set] = {}
+    for span in spans:
+        nodes_by_trace.setdefault(span["trace_id"], set()).add(span["node"])
+
+    mismatches = []
+    for record in records:
+        if not record["ok"] or record["trace_id"] not in nodes_by_trace:
+            continue
+
+        ran = nodes_by_trace[record["trace_id"]] & ACTION_NODES
+        expected = EXPECTED_NODES[record["type"]]
+        matches = not ran if not expected else bool(ran) and ran <= expected
+        if not matches:
+            mismatches.append({"type": record["type"], "text": record["text"], "action_nodes": sorted(ran)})
+
+    return mismatches
+
+
+def summarize(records: List[Dict[str, Any]], spans: List[Dict[str, Any]], duration_s: float) -> Dict[str, Any]:
+    """
+    Turn latency per turn type, and node latency from the turns' trace spans.
+    Failed turns count towards throughput and error totals, not latency.
+    """
+    ok_records = [record for record in records if record["ok"]]
+
+    turn_latency = {"all": latency_stats([record["latency_ms"] for record in ok_records])}
+    for turn_type in TURN_TYPES:
+        values = [record["latency_ms"] for record in ok_records if record["type"] == turn_type]
+        if values:
+            turn_latency[turn_type] = latency_stats(values)
+
+    # Only spans of measured turns (warmup and failed turns have no trace id here)
+    measured_traces = {record["trace_id"] for record in ok_records if record["trace_id"]}
+    spans_by_node: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        if span["trace_id"] in measured_traces:
+            spans_by_node.setdefault(span["node"], []).append(span)
+
+    node_latency = {}
+    for node, node_spans in spans_by_node.items():
+        node_latency[node] = {
+            **latency_stats([span["duration_ms"] for span in node_spans]),
+            "llm_ms_mean": round(sum(span["llm_ms"] for span in node_spans) / len(node_spans), 2),
+            "db_ms_mean": round(sum(span["db_ms"] for span in node_spans) / len(node_spans), 2)
+        }
+
+    mismatches = find_intent_mismatches(ok_records, spans)
+
+    return {
+        "turns": len(records),
+        "failed_turns": len(records) - len(ok_records),
+        "intent_mismatches": len(mismatches),
+        "error_results": sum(record["error_results"] for record in ok_records),
+        "duration_s": round(duration_s, 3),
+        "throughput_tps": round(len(records) / duration_s, 2) if duration_s > 0 else None,
+        "turn_latency_ms": turn_latency,
+        "node_latency_ms": node_latency,
+        "errors": sorted({record["error"] for record in records if not record["ok"]})[:10],
+        # One example per mismatched utterance
+        "mismatched_turns": list({mismatch["text"]: mismatch for mismatch in mismatches}.values())[:10]
+    }
+
+
+def run_load_test(
+    turns: int = 200,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    use_async: bool = False,
+    mix: Optional[Dict[str, float]] = None,
+    corpus: Optional[Dict[str, List[str]]] = None,
+    warmup: int = 5,
+    seed: int = 7
+) -> Dict[str, Any]:
+    """
+    Drives the agent graph with a generated workload and reports throughput
+    and p50/p95/p99 latency per turn type and per node.
+
+    rate: None → closed loop with `concurrency` workers; turns/second → open loop
+    (Poisson arrivals, at most `concurrency` turns in flight).
+
+    Returns:
+        Report dict (config, counts, throughput, turn_latency_ms, node_latency_ms)
+    """
+    corpus = corpus or load_corpus()
+    mix = mix or DEFAULT_MIX
+    workload = build_workload(corpus, mix, turns, seed)
+
+    app = build_graph()
+    start_flush_worker()
+
+    spans = []
+    spans_lock = threading.Lock()
+
+    def collect(span):
+        with spans_lock:
+            spans.append({key: span.get(key) for key in ("trace_id", "node", "duration_ms", "llm_ms", "db_ms")})
+
+    add_span_listener(collect)
+    try:
+        # Warmup turns load models and open connections; they are not measured
+        for item in build_workload(corpus, mix, warmup, seed + 1):
+            run_turn(app, item)
+
+        started = time.perf_counter()
+        if use_async:
+            records = asyncio.run(_run_async(app, workload, concurrency, rate, seed))
+        else:
+            records = _run_sync(app, workload, concurrency, rate, seed)
+        duration_s = time.perf_counter() - started
+    finally:
+        remove_span_listener(collect)
+
+    report = summarize(records, spans, duration_s)
+    report["config"] = {
+        "turns": turns,
+        "concurrency": concurrency,
+        "mode": "closed" if rate is None else "open",
+        "rate": rate,
+        "path": "ainvoke" if use_async else "invoke",
+        "mix": mix,
+        "warmup": warmup,
+        "seed": seed,
+        "llm_backend": os.getenv("LLM_BACKEND"),
+        "storage_backend": os.getenv("STORAGE_BACKEND")
+    }
+
+    if not TRACE_ENABLED:
+        logger.warning("TRACE_ENABLED is off, so no per-node latencies were collected")
+
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    config = report["config"]
+    lines = [
+        f"Load test: {config['turns']} turns, {config['mode']} loop"
+        + (f" at {config['rate']}/s" if config["rate"] else "")
+        + f", concurrency {config['concurrency']}, {config['path']}"
+        + f" (llm={config['llm_backend']}, storage={config['storage_backend']})",
+        f"Duration {report['duration_s']}s, throughput {report['throughput_tps']} turns/s, "
+        f"{report['failed_turns']} failed turns, {report['error_results']} error results, "
+        f"{report['intent_mismatches']} intent mismatches",
+        ""
+    ]
+
+    def table(title, rows, extra_columns=()):
+        header = f"{title:<20}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+        header += "".join(f"{column:>13}" for column in extra_columns)
+        lines.append(header)
+        for name, stats in rows.items():
+            if not stats.get("count"):
+                continue
+            line = f"{name:<20}{stats['count']:>7}"
+            line += "".join(f"{stats[key]:>10.1f}" for key in ("mean", "p50", "p95", "p99", "max"))
+            line += "".join(f"{stats[column]:>13.1f}" for column in extra_columns)
+            lines.append(line)
+        lines.append("")
+
+    table("turn type (ms)", report["turn_latency_ms"])
+    table("node (ms)", report["node_latency_ms"], ("llm_ms_mean", "db_ms_mean"))
+
+    for error in report["errors"]:
+        lines.append(f"error: {error}")
+
+    for mismatch in report["mismatched_turns"]:
+        lines.append(f"mismatch: {mismatch['type']} turn \"{mismatch['text']}\" ran {mismatch['action_nodes'] or 'no action node'}")
+
+    return "\n".join(lines).rstrip()
+
+
+def _clear_state() -> None:
+    for name in ("SQLITE_STORAGE_PATH", "LLM_CACHE_PATH", "WRITE_BEHIND_JOURNAL_PATH", "TRACE_PATH"):
+        path = OFFLINE_DEFAULTS[name]
+        if os.environ.get(name) != path:
+            continue  # Pointed somewhere else on purpose
+        for suffix in ("", "-wal", "-shm", ".1"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.load_test",
+        description="Load-test the agent graph (stubbed LLM and SQLite storage unless the environment says otherwise)."
+    )
+    parser.add_argument("--turns", type=int, default=200, help="measured turns (default 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="workers / max turns in flight (default 8)")
+    parser.add_argument("--rate", type=float, default=None, help="open loop: arrivals per second (default: closed loop)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="drive ainvoke instead of invoke")
+    parser.add_argument("--mix", default="add=4,query=3,predict=1,convo=2", help="turn type weights")
+    parser.add_argument("--corpus", default=None, help="JSONL file of {type, text} utterances")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured turns run first (default 5)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep-state", action="store_true", help=f"reuse caches and data left in {LOAD_TEST_DIR}/")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="exit 1 if the overall turn p95 is above this")
+    args = parser.parse_args(argv)
+
+    if args.turns < 1 or args.concurrency < 1 or (args.rate is not None and args.rate <= 0):
+        parser.error("--turns, --concurrency and --rate must be positive")
+
+    # Files are opened lazily, so clearing them here still gives every run a cold start.
+    # Only the harness's own files are removed, never anything else in LOAD_TEST_DIR.
+    os.makedirs(LOAD_TEST_DIR, exist_ok=True)
+    if not args.keep_state:
+        _clear_state()
+
+    try:
+        report = run_load_test(
+            turns=args.turns,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            use_async=args.use_async,
+            mix=parse_mix(args.mix),
+            corpus=load_corpus(args.corpus),
+            warmup=args.warmup,
+            seed=args.seed
+        )
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    print(format_report(report))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    # Mislabelled turns make the per-type numbers meaningless, so they fail the run too
+    if report["failed_turns"] or report["intent_mismatches"]:
+        return 1
+    if args.max_p95_ms is not None and report["turn_latency_ms"]["all"].get("p95", 0) > args.max_p95_ms:
+        print(f"FAIL: turn p95 {report['turn_latency_ms']['all']['p95']} ms is above {args.max_p95_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
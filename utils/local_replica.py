@@ -0,0 +1,228 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Iterator
+from dotenv import load_dotenv
+from utils.pg_to_sqlite import translate_pg_to_sqlite, register_pg_functions
+from db.storage import storage, STORAGE_BACKEND
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("Replica")
+
+# Only used in front of Supabase; the SQLite storage backend is already local
+LOCAL_REPLICA_ENABLED = (
+    os.getenv("LOCAL_REPLICA_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+    and STORAGE_BACKEND == "supabase"
+)
+LOCAL_REPLICA_PATH = os.getenv("LOCAL_REPLICA_PATH", "transactions_replica.db")
+# Without local writes, changes made elsewhere show up at most this late
+LOCAL_REPLICA_MAX_STALENESS = float(os.getenv("LOCAL_REPLICA_MAX_STALENESS", "60"))
+LOCAL_REPLICA_SYNC_PAGE_SIZE = int(os.getenv("LOCAL_REPLICA_SYNC_PAGE_SIZE", "1000"))
+# SERIAL ids can commit out of order; re-reading a window below the watermark catches late ones
+LOCAL_REPLICA_SYNC_OVERLAP = int(os.getenv("LOCAL_REPLICA_SYNC_OVERLAP", "100"))
+
+REPLICA_COLUMNS = ["transaction_id", "amount", "category", "description", "date_of_transaction", "created_at"]
+
+
+class TransactionReplica:
+    """
+    Local SQLite copy of the Supabase transactions table for query execution.
+    - Incrementally synced by transaction_id watermark (transactions are insert-only)
+    - Generated PostgreSQL is translated to SQLite before execution
+    - Safe to share across threads (one connection behind a lock)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._last_sync_at = 0.0
+        self._stale = True
+        self.queries = 0
+        self.syncs = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transactions (
+                    transaction_id INTEGER PRIMARY KEY,
+                    amount REAL NOT NULL,
+                    category TEXT NOT NULL,
+                    description TEXT,
+                    date_of_transaction TEXT NOT NULL,
+                    created_at TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date_of_transaction)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date_of_transaction)")
+            conn.commit()
+            register_pg_functions(conn)
+            self._conn = conn
+        return self._conn
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def watermark(self) -> int:
+        with self._lock:
+            row = self._connection().execute("SELECT MAX(transaction_id) FROM transactions").fetchone()
+        return row[0] or 0
+
+    def load_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Upserts transaction rows (as returned by Supabase) into the replica.
+        """
+        if not rows:
+            return 0
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO transactions ({', '.join(REPLICA_COLUMNS)}) VALUES ({', '.join('?' * len(REPLICA_COLUMNS))})",
+                [tuple(row.get(column) for column in REPLICA_COLUMNS) for row in rows]
+            )
+            conn.commit()
+
+        return len(rows)
+
+    def sync(self) -> int:
+        """
+        Pulls transactions above the watermark (minus a small overlap) from Supabase.
+
+        Returns:
+            Number of rows pulled
+
+        Raises:
+            RuntimeError: If Supabase can't be read
+        """
+        with self._sync_lock:
+            synced_at = time.time()
+            after_id = max(self.watermark() - LOCAL_REPLICA_SYNC_OVERLAP, 0)
+            pulled = 0
+
+            while True:
+                try:
+                    rows = storage.get_transactions_after(after_id, LOCAL_REPLICA_SYNC_PAGE_SIZE, REPLICA_COLUMNS)
+                except Exception as e:
+                    raise RuntimeError(f"Replica sync failed: {e}")
+
+                pulled += self.load_rows(rows)
+
+                if len(rows) < LOCAL_REPLICA_SYNC_PAGE_SIZE:
+                    break
+                after_id = rows[-1]["transaction_id"]
+
+            self._last_sync_at = synced_at
+            self._stale = False
+            self.syncs += 1
+
+        logger.info("Synced %s rows (watermark %s)", pulled, self.watermark())
+        return pulled
+
+    def ensure_fresh(self) -> None:
+        if self._stale or time.time() - self._last_sync_at > LOCAL_REPLICA_MAX_STALENESS:
+            self.sync()
+
+    def execute(self, sql_query: str) -> List[Dict[str, Any]]:
+        """
+        Runs a validated PostgreSQL SELECT against the replica.
+
+        Raises:
+            ValueError / sqlite3.Error: If the query can't be translated or executed
+        """
+        sqlite_sql = translate_pg_to_sqlite(sql_query)
+
+        with self._lock:
+            # query_only: validation already blocks writes, this is defence in depth
+            conn = self._connection()
+            conn.execute("PRAGMA query_only = ON")
+            try:
+                rows = conn.execute(sqlite_sql).fetchall()
+            finally:
+                conn.execute("PRAGMA query_only = OFF")
+
+        self.queries += 1
+        return [dict(row) for row in rows]
+
+    def iter_pages(self, sql_query: str, page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams a validated PostgreSQL SELECT from the replica in pages.
+        Uses its own read-only connection, so an abandoned iteration never holds the shared lock.
+
+        Raises:
+            ValueError / sqlite3.Error: If the query can't be translated or executed
+        """
+        sqlite_sql = translate_pg_to_sqlite(sql_query)
+        self._connection()  # Make sure the schema exists
+
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            conn.row_factory = sqlite3.Row
+            register_pg_functions(conn)
+            cursor = conn.execute(sqlite_sql)
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row_count = self._connection().execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+        return {
+            "rows": row_count,
+            "queries": self.queries,
+            "syncs": self.syncs,
+            "seconds_since_sync": round(time.time() - self._last_sync_at, 1) if self._last_sync_at else None
+        }
+
+
+transaction_replica = TransactionReplica(LOCAL_REPLICA_PATH)
+
+
+def mark_replica_stale() -> None:
+    """
+    Called after this process writes transactions so the next query syncs first.
+    """
+    transaction_replica.mark_stale()
+
+
+def execute_on_replica(sql_query: str) -> List[Dict[str, Any]]:
+    """
+    Syncs the replica if needed and runs the query on it.
+
+    Raises:
+        RuntimeError: If the replica can't answer (sync, translation or execution failed);
+        callers fall back to Supabase
+    """
+    try:
+        transaction_replica.ensure_fresh()
+        start_time = time.perf_counter()
+        rows = transaction_replica.execute(sql_query)
+    except (ValueError, sqlite3.Error) as e:
+        raise RuntimeError(f"Replica could not run query: {e}")
+
+    logger.info("Query returned %s rows in %.1f ms", len(rows), (time.perf_counter() - start_time) * 1000)
+    return rows
+
+
+def get_replica_stats() -> Dict[str, Any]:
+    if not LOCAL_REPLICA_ENABLED:
+        return {"enabled": False}
+
+    try:
+        return {"enabled": True, **transaction_replica.stats()}
+    except sqlite3.Error:
+        return {"enabled": True}
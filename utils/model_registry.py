@@ -0,0 +1,139 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("ModelRegistry")
+
+PREDICTION_MODEL_PATH = os.getenv("PREDICTION_MODEL_PATH")
+
+# Process-wide: one loaded model package shared by every session.
+# Readers take the current entry reference without locking; a reload builds a
+# complete new entry and swaps the reference in one assignment.
+_current_entry: Optional[Dict[str, Any]] = None
+_load_lock = threading.Lock()
+_load_count = 0
+
+
+def _estimate_memory_bytes(model, file_bytes: int) -> int:
+    """
+    Approximates the in-memory size of a tree ensemble from its node arrays.
+    Falls back to the pickle size for other model types.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if not estimators:
+        return file_bytes
+
+    total = 0
+    for estimator in estimators:
+        tree = getattr(estimator, "tree_", None)
+        if tree is None:
+            return file_bytes
+        tree_state = tree.__getstate__()
+        total += tree_state["nodes"].nbytes + tree_state["values"].nbytes
+
+    return total
+
+
+def _load_entry(path: str, file_stat: os.stat_result, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    start_time = time.perf_counter()
+
+    with open(path, "rb") as file:
+        raw_bytes = file.read()
+
+    sha256 = hashlib.sha256(raw_bytes).hexdigest()
+
+    # Touched but identical content → keep the already deserialized model
+    if previous is not None and previous["sha256"] == sha256:
+        return {**previous, "mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size}
+
+    model_package = pickle.loads(raw_bytes)
+    load_time_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        "model": model_package["model"],
+        "metadata": model_package["metadata"],
+        "path": path,
+        "sha256": sha256,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "size": file_stat.st_size,
+        "loaded_at": time.time(),
+        "load_time_ms": round(load_time_ms, 2),
+        "memory_bytes": _estimate_memory_bytes(model_package["model"], len(raw_bytes))
+    }
+
+
+def get_prediction_model() -> Dict[str, Any]:
+    """
+    Returns the loaded prediction model package, loading it on first use and
+    reloading it when the file's mtime/size (and content hash) changes.
+
+    Returns:
+        {"model", "metadata", "path", "sha256", "loaded_at", "load_time_ms", "memory_bytes", ...}
+
+    Raises:
+        RuntimeError: If no model could ever be loaded
+    """
+    global _current_entry, _load_count
+
+    if not PREDICTION_MODEL_PATH:
+        raise RuntimeError("PREDICTION_MODEL_PATH is not set")
+
+    try:
+        file_stat = os.stat(PREDICTION_MODEL_PATH)
+    except OSError as e:
+        if _current_entry is not None:
+            logger.warning("Model file unavailable, serving loaded model: %s", e)
+            return _current_entry
+        raise RuntimeError(f"Prediction model file not found: {e}")
+
+    entry = _current_entry
+    if entry is not None and entry["mtime_ns"] == file_stat.st_mtime_ns and entry["size"] == file_stat.st_size:
+        return entry
+
+    with _load_lock:
+        # Another thread may have finished the reload while we waited
+        entry = _current_entry
+        if entry is not None and entry["mtime_ns"] == file_stat.st_mtime_ns and entry["size"] == file_stat.st_size:
+            return entry
+
+        try:
+            new_entry = _load_entry(PREDICTION_MODEL_PATH, file_stat, entry)
+        except Exception as e:
+            if entry is not None:
+                logger.warning("Reload failed, keeping previous model: %s", e)
+                return entry
+            raise RuntimeError(f"Failed to load prediction model: {e}")
+
+        if entry is None or new_entry["sha256"] != entry["sha256"]:
+            _load_count += 1
+            logger.info(
+                "Loaded model %s in %s ms (~%.1f MB)",
+                new_entry['sha256'][:12], new_entry['load_time_ms'], new_entry['memory_bytes'] / 1_000_000
+            )
+
+        _current_entry = new_entry
+        return new_entry
+
+
+def get_model_registry_stats() -> Dict[str, Any]:
+    entry = _current_entry
+
+    if entry is None:
+        return {"loaded": False, "path": PREDICTION_MODEL_PATH, "loads": _load_count}
+
+    return {
+        "loaded": True,
+        "path": entry["path"],
+        "sha256": entry["sha256"],
+        "loaded_at": entry["loaded_at"],
+        "load_time_ms": entry["load_time_ms"],
+        "memory_bytes": entry["memory_bytes"],
+        "loads": _load_count
+    }
@@ -0,0 +1,358 @@
+import re
+import sqlite3
+import calendar
+from datetime import datetime, date, timedelta
+from typing import Optional, Tuple, List
+
+# Translates the PostgreSQL dialect produced by the SQL generator prompt
+# (prompts/sql_query_generator.py) into SQLite. Dates are stored as ISO text,
+# so date values stay ISO strings and compare correctly as text.
+#
+# Handled:
+# - CURRENT_DATE / CURRENT_TIMESTAMP / NOW()  → literals (local time, like resolve_date_expression)
+# - DATE 'YYYY-MM-DD'                          → 'YYYY-MM-DD'
+# - <expr> +/- INTERVAL 'N unit'               → PG_DATE_ADD(<expr>, '+/-N unit')
+# - EXTRACT(unit FROM <expr>)                  → DATE_PART('unit', <expr>)
+# - <expr>::date                               → DATE(<expr>); other ::casts are dropped
+# - ILIKE → LIKE, STRING_AGG → GROUP_CONCAT
+# - DATE_TRUNC, DATE_PART, TO_CHAR            → Python functions registered on the connection
+#
+# Quoted strings and identifiers are masked while rewriting, so a category or
+# description containing "ILIKE", "::" or "NOW()" reaches SQLite unchanged.
+
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+MASKED_PATTERN = re.compile(r"\x00(\d+)\x00")
+DATE_LITERAL_PATTERN = re.compile(r"\bDATE\s+(?=')", re.IGNORECASE)
+CURRENT_DATE_PATTERN = re.compile(r"\bCURRENT_DATE\b", re.IGNORECASE)
+CURRENT_TIMESTAMP_PATTERN = re.compile(r"\b(?:CURRENT_TIMESTAMP|NOW\s*\(\s*\))", re.IGNORECASE)
+INTERVAL_PATTERN = re.compile(r"([+-])\s*INTERVAL\s*'([^']*)'", re.IGNORECASE)
+EXTRACT_PATTERN = re.compile(r"\bEXTRACT\s*\(\s*(\w+)\s+FROM\s+", re.IGNORECASE)
+DATE_CAST_PATTERN = re.compile(r"::\s*date\b", re.IGNORECASE)
+OTHER_CAST_PATTERN = re.compile(r"::\s*[a-z_]+(?:\s+precision)?(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?", re.IGNORECASE)
+INTERVAL_PART_PATTERN = re.compile(r"(\d+)\s*([a-z]+)")
+
+TO_CHAR_TOKENS = re.compile(r"FM|YYYY|YY|Month|Mon|MM|DDD|DD|Day|Dy|HH24|HH12|HH|MI|SS|AM|PM|Q")
+
+
+def _parse_moment(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+
+    text = str(value).strip().replace("T", " ")
+    # Drop fractional seconds / timezone suffixes from timestamptz text
+    text = re.sub(r"(\d{2}:\d{2}:\d{2})(?:\.\d+)?(?:[+-]\d{2}(?::?\d{2})?|Z)?$", r"\1", text)
+
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+
+    raise ValueError(f"Not a date: {value}")
+
+
+def _format_moment(moment: datetime) -> str:
+    # Midnight renders as a plain date so it compares equal to DATE columns
+    if moment.time() == datetime.min.time():
+        return moment.date().isoformat()
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    month_index = moment.month - 1 + months
+    year = moment.year + month_index // 12
+    month = month_index % 12 + 1
+    # Postgres clamps to the last day of the month (Jan 31 + 1 month = Feb 28/29)
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def pg_date_add(value, interval: str) -> Optional[str]:
+    moment = _parse_moment(value)
+    if moment is None:
+        return None
+
+    interval = interval.strip().lower()
+    sign = -1 if interval.startswith("-") else 1
+
+    months, delta = 0, timedelta()
+    parts = INTERVAL_PART_PATTERN.findall(interval)
+    if not parts:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    for amount, unit in parts:
+        amount = int(amount) * sign
+        unit = unit.rstrip("s")
+        if unit in ("year", "yr"):
+            months += 12 * amount
+        elif unit in ("month", "mon"):
+            months += amount
+        elif unit == "week":
+            delta += timedelta(weeks=amount)
+        elif unit == "day":
+            delta += timedelta(days=amount)
+        elif unit in ("hour", "hr"):
+            delta += timedelta(hours=amount)
+        elif unit in ("minute", "min"):
+            delta += timedelta(minutes=amount)
+        elif unit in ("second", "sec"):
+            delta += timedelta(seconds=amount)
+        else:
+            raise ValueError(f"Unsupported interval unit: {unit}")
+
+    return _format_moment(_add_months(moment, months) + delta)
+
+
+def pg_date_trunc(unit: str, value) -> Optional[str]:
+    moment = _parse_moment(value)
+    if moment is None:
+        return None
+
+    unit = unit.lower()
+    day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if unit == "day":
+        return _format_moment(day_start)
+    if unit == "week":
+        return _format_moment(day_start - timedelta(days=day_start.weekday()))
+    if unit == "month":
+        return _format_moment(day_start.replace(day=1))
+    if unit == "quarter":
+        return _format_moment(day_start.replace(month=(day_start.month - 1) // 3 * 3 + 1, day=1))
+    if unit == "year":
+        return _format_moment(day_start.replace(month=1, day=1))
+    if unit == "hour":
+        return _format_moment(moment.replace(minute=0, second=0, microsecond=0))
+
+    raise ValueError(f"Unsupported DATE_TRUNC unit: {unit}")
+
+
+def pg_date_part(unit: str, value) -> Optional[int]:
+    moment = _parse_moment(value)
+    if moment is None:
+        return None
+
+    unit = unit.lower()
+    parts = {
+        "year": moment.year,
+        "quarter": (moment.month - 1) // 3 + 1,
+        "month": moment.month,
+        "week": moment.isocalendar()[1],
+        "day": moment.day,
+        "dow": (moment.weekday() + 1) % 7,  # Sunday = 0 like Postgres
+        "isodow": moment.isoweekday(),
+        "doy": moment.timetuple().tm_yday,
+        "hour": moment.hour,
+        "minute": moment.minute,
+        "second": moment.second,
+    }
+    if unit not in parts:
+        raise ValueError(f"Unsupported date part: {unit}")
+    return parts[unit]
+
+
+def pg_to_char(value, pattern: str) -> Optional[str]:
+    moment = _parse_moment(value)
+    if moment is None:
+        return None
+
+    output = []
+    fill_mode = False
+    position = 0
+
+    for match in TO_CHAR_TOKENS.finditer(pattern):
+        output.append(pattern[position:match.start()])
+        position = match.end()
+        token = match.group(0)
+
+        if token == "FM":
+            fill_mode = True
+            continue
+
+        if token == "YYYY":
+            text = f"{moment.year:04d}"
+        elif token == "YY":
+            text = f"{moment.year % 100:02d}"
+        elif token == "Month":
+            text = moment.strftime("%B") if fill_mode else moment.strftime("%B").ljust(9)
+        elif token == "Mon":
+            text = moment.strftime("%b")
+        elif token == "MM":
+            text = str(moment.month) if fill_mode else f"{moment.month:02d}"
+        elif token == "DDD":
+            text = str(moment.timetuple().tm_yday) if fill_mode else f"{moment.timetuple().tm_yday:03d}"
+        elif token == "DD":
+            text = str(moment.day) if fill_mode else f"{moment.day:02d}"
+        elif token == "Day":
+            text = moment.strftime("%A") if fill_mode else moment.strftime("%A").ljust(9)
+        elif token == "Dy":
+            text = moment.strftime("%a")
+        elif token == "HH24":
+            text = f"{moment.hour:02d}"
+        elif token in ("HH12", "HH"):
+            text = f"{(moment.hour % 12) or 12:02d}"
+        elif token == "MI":
+            text = f"{moment.minute:02d}"
+        elif token == "SS":
+            text = f"{moment.second:02d}"
+        elif token in ("AM", "PM"):
+            text = "AM" if moment.hour < 12 else "PM"
+        else:  # Q
+            text = str((moment.month - 1) // 3 + 1)
+
+        output.append(text)
+        fill_mode = False
+
+    output.append(pattern[position:])
+    return "".join(output)
+
+
+def register_pg_functions(conn: sqlite3.Connection) -> None:
+    """
+    Registers the Postgres date functions used by generated SQL on a SQLite connection.
+    """
+    conn.create_function("DATE_TRUNC", 2, pg_date_trunc, deterministic=True)
+    conn.create_function("DATE_PART", 2, pg_date_part, deterministic=True)
+    conn.create_function("PG_DATE_ADD", 2, pg_date_add, deterministic=True)
+    conn.create_function("TO_CHAR", 2, pg_to_char, deterministic=True)
+
+
+def _operand_bounds(sql: str, end: int) -> Tuple[int, int]:
+    """
+    Finds the operand that ends right before position `end`:
+    a function call / parenthesized expression, a quoted literal or an identifier,
+    with any ::casts applied to it.
+    """
+    stop = end
+    while stop > 0 and sql[stop - 1].isspace():
+        stop -= 1
+
+    start = stop
+    if start == 0:
+        raise ValueError("Missing operand")
+
+    if sql[start - 1] == ")":
+        depth = 0
+        while start > 0:
+            start -= 1
+            if sql[start] == ")":
+                depth += 1
+            elif sql[start] == "(":
+                depth -= 1
+                if depth == 0:
+                    break
+        if depth != 0:
+            raise ValueError("Unbalanced parentheses")
+        while start > 0 and (sql[start - 1].isalnum() or sql[start - 1] == "_"):
+            start -= 1
+    elif sql[start - 1] == "'":
+        start -= 1
+        while start > 0 and sql[start - 1] != "'":
+            start -= 1
+        start -= 1
+    else:
+        while start > 0 and (sql[start - 1].isalnum() or sql[start - 1] in "_."):
+            start -= 1
+
+    if start < 0 or start == stop:
+        raise ValueError("Missing operand")
+
+    # A cast belongs to its operand: '2026-10-01'::date - INTERVAL ...
+    before = sql[:start].rstrip()
+    if before.endswith("::"):
+        start, _ = _operand_bounds(sql, len(before) - 2)
+
+    return start, stop
+
+
+def _closing_paren(sql: str, start: int) -> int:
+    """
+    Index of the parenthesis closing the group that is open at `start`.
+    """
+    depth = 1
+    for index in range(start, len(sql)):
+        if sql[index] == "(":
+            depth += 1
+        elif sql[index] == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced parentheses")
+
+
+def _mask_quoted(sql: str) -> Tuple[str, List[str]]:
+    """
+    Replaces the text inside every quoted string / identifier with a \\x00<n>\\x00
+    marker, keeping the quotes, so the rewrites below only see SQL syntax.
+
+    Raises:
+        ValueError: If a quote is left open or the SQL contains a NUL character
+    """
+    if "\x00" in sql:
+        raise ValueError("Unexpected NUL character")
+
+    contents = []
+
+    def mask(match):
+        contents.append(match.group(0)[1:-1])
+        quote = match.group(0)[0]
+        return f"{quote}\x00{len(contents) - 1}\x00{quote}"
+
+    masked = QUOTED_PATTERN.sub(mask, sql)
+    if re.search(r"['\"]", QUOTED_PATTERN.sub("", masked)):
+        raise ValueError("Unterminated quoted string")
+
+    return masked, contents
+
+
+def translate_pg_to_sqlite(sql: str, now: Optional[datetime] = None) -> str:
+    """
+    Translates a validated PostgreSQL SELECT into SQLite.
+    Functions it can't translate are left as-is and fail at execution, so callers
+    can fall back to Postgres.
+
+    Raises:
+        ValueError: If an expression can't be rewritten
+    """
+    now = now or datetime.now()
+
+    sql, quoted_contents = _mask_quoted(sql)
+
+    sql = DATE_LITERAL_PATTERN.sub("", sql)
+    sql = CURRENT_TIMESTAMP_PATTERN.sub(f"'{now.strftime('%Y-%m-%d %H:%M:%S')}'", sql)
+    sql = CURRENT_DATE_PATTERN.sub(f"'{now.date().isoformat()}'", sql)
+
+    # <expr> +/- INTERVAL '...' (left to right, so chains nest correctly)
+    match = INTERVAL_PATTERN.search(sql)
+    while match:
+        start, stop = _operand_bounds(sql, match.start())
+        sign = "-" if match.group(1) == "-" else ""
+        replacement = f"PG_DATE_ADD({sql[start:stop]}, '{sign}{match.group(2)}')"
+        sql = sql[:start] + replacement + sql[match.end():]
+        match = INTERVAL_PATTERN.search(sql, start + len(replacement))
+
+    # EXTRACT(unit FROM <expr>)
+    match = EXTRACT_PATTERN.search(sql)
+    while match:
+        close = _closing_paren(sql, match.end())
+        replacement = f"DATE_PART('{match.group(1).lower()}', {sql[match.end():close]})"
+        sql = sql[:match.start()] + replacement + sql[close + 1:]
+        match = EXTRACT_PATTERN.search(sql, match.start() + len(replacement))
+
+    # <expr>::date → DATE(<expr>)
+    match = DATE_CAST_PATTERN.search(sql)
+    while match:
+        start, stop = _operand_bounds(sql, match.start())
+        replacement = f"DATE({sql[start:stop]})"
+        sql = sql[:start] + replacement + sql[match.end():]
+        match = DATE_CAST_PATTERN.search(sql, start + len(replacement))
+
+    sql = OTHER_CAST_PATTERN.sub("", sql)
+    sql = re.sub(r"\bILIKE\b", "LIKE", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bSTRING_AGG\s*\(", "GROUP_CONCAT(", sql, flags=re.IGNORECASE)
+
+    return MASKED_PATTERN.sub(lambda match: quoted_contents[int(match.group(1))], sql)
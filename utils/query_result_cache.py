@@ -0,0 +1,123 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from core.llm_cache import SQLiteTTLCache, LLM_CACHE_PATH
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("QueryCache")
+
+QUERY_RESULT_CACHE_ENABLED = os.getenv("QUERY_RESULT_CACHE_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+# Writes from this app bump the data version; the TTL bounds staleness for writes made elsewhere
+QUERY_RESULT_CACHE_TTL = int(os.getenv("QUERY_RESULT_CACHE_TTL", "600"))
+QUERY_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_RESULT_CACHE_MAX_ENTRIES", "1000"))
+
+query_result_cache = SQLiteTTLCache(LLM_CACHE_PATH, "query_results", QUERY_RESULT_CACHE_MAX_ENTRIES)
+
+
+class DataVersion:
+    """
+    Monotonically increasing version of the transactions data, persisted next to
+    the cache so every process sharing the cache file sees each bump.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def current(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+    def bump(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+            conn.commit()
+            return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+data_version = DataVersion(LLM_CACHE_PATH)
+
+
+def bump_data_version() -> None:
+    """
+    Called after every transaction write; invalidates all cached query results.
+    """
+    try:
+        version = data_version.bump()
+        logger.info("Data version bumped to %s", version)
+    except sqlite3.Error as e:
+        # Can't invalidate → stop serving cached results
+        logger.warning("Bumping data version failed, clearing query cache: %s", e)
+        query_result_cache.clear()
+
+
+def _cache_key(clean_sql: str) -> Optional[str]:
+    try:
+        version = data_version.current()
+    except sqlite3.Error as e:
+        logger.warning("Reading data version failed: %s", e)
+        return None
+
+    # Today's date is part of the key because generated SQL uses CURRENT_DATE
+    today = datetime.now().date().isoformat()
+    return hashlib.sha256(f"{version}\x00{today}\x00{clean_sql}".encode("utf-8")).hexdigest()
+
+
+def lookup_query_result(clean_sql: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """
+    Looks up cached rows for the SQL at the current data version.
+
+    Returns:
+        (rows or None on a miss, cache_key to store the fresh rows under)
+        The key is taken before the query runs, so a write landing mid-query
+        can't get pre-write rows cached under the new version.
+    """
+    if not QUERY_RESULT_CACHE_ENABLED:
+        return None, None
+
+    cache_key = _cache_key(clean_sql)
+    if cache_key is None:
+        return None, None
+
+    cached = query_result_cache.get(cache_key)
+    if cached is None:
+        return None, cache_key
+
+    logger.debug("Hit")
+    return json.loads(cached), cache_key
+
+
+def store_query_result(cache_key: Optional[str], rows: List[Dict[str, Any]]) -> None:
+    if not QUERY_RESULT_CACHE_ENABLED or cache_key is None:
+        return
+
+    query_result_cache.set(cache_key, json.dumps(rows, default=str), QUERY_RESULT_CACHE_TTL)
+
+
+def get_query_result_cache_stats() -> dict:
+    try:
+        version = data_version.current()
+    except sqlite3.Error:
+        version = None
+
+    return {"enabled": QUERY_RESULT_CACHE_ENABLED, "data_version": version, **query_result_cache.stats()}
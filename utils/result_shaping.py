@@ -0,0 +1,146 @@
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from utils.execute_sql_query import execute_select_query
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("ResultShaping")
+
+# Rows passed on to the responder prompt per query; the summary always covers all rows
+QUERY_RESULT_MAX_ROWS = int(os.getenv("QUERY_RESULT_MAX_ROWS", "200"))
+
+TRAILING_LIMIT_PATTERN = re.compile(r"\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+ISO_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def apply_row_limit(clean_sql: str, max_rows: int = QUERY_RESULT_MAX_ROWS) -> str:
+    """
+    Caps how many rows a query can return: adds LIMIT max_rows + 1 (the extra row
+    tells us the result was truncated), or lowers a larger LIMIT.
+    """
+    match = TRAILING_LIMIT_PATTERN.search(clean_sql)
+    if match:
+        if int(match.group(1)) <= max_rows:
+            return clean_sql
+        return clean_sql[:match.start()] + f"LIMIT {max_rows + 1}" + (match.group(2) or "")
+
+    return f"{clean_sql.rstrip()} LIMIT {max_rows + 1}"
+
+
+def _column_kinds(rows: List[Dict[str, Any]], columns: List[str]) -> Dict[str, str]:
+    """
+    "number" / "date" for columns worth summarizing, based on their non-null values.
+    """
+    kinds = {}
+    for column in columns:
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        if not values:
+            continue
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            kinds[column] = "number"
+        elif all(isinstance(value, (date, datetime)) or (isinstance(value, str) and ISO_DATE_PATTERN.match(value)) for value in values):
+            kinds[column] = "date"
+    return kinds
+
+
+def _round(value):
+    return round(value, 2) if isinstance(value, float) else value
+
+
+def _summarize_rows(rows: List[Dict[str, Any]], kinds: Dict[str, str]) -> Dict[str, Any]:
+    summary = {"row_count": len(rows), "columns": {}}
+
+    for column, kind in kinds.items():
+        values = [row[column] for row in rows if row.get(column) is not None]
+        stats = {"min": _round(min(values)), "max": _round(max(values))}
+        if kind == "number":
+            stats["sum"] = _round(sum(values))
+        summary["columns"][column] = stats
+
+    return summary
+
+
+def _summarize_full_result(clean_sql: str, kinds: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Exact summary of a truncated result, computed by the database over the full query.
+
+    Raises:
+        RuntimeError: If the summary query fails
+    """
+    select_items = ["COUNT(*) AS row_count"]
+    for index, (column, kind) in enumerate(kinds.items()):
+        quoted = '"' + column.replace('"', '""') + '"'
+        select_items += [f"MIN({quoted}) AS min_{index}", f"MAX({quoted}) AS max_{index}"]
+        if kind == "number":
+            select_items.append(f"SUM({quoted}) AS sum_{index}")
+
+    summary_sql = f"SELECT {', '.join(select_items)} FROM ({clean_sql}) AS full_result"
+    row = execute_select_query(summary_sql)[0]
+
+    summary = {"row_count": row["row_count"], "columns": {}}
+    for index, (column, kind) in enumerate(kinds.items()):
+        stats = {"min": _round(row[f"min_{index}"]), "max": _round(row[f"max_{index}"])}
+        if kind == "number":
+            stats["sum"] = _round(row[f"sum_{index}"])
+        summary["columns"][column] = stats
+
+    return summary
+
+
+def shape_query_result(clean_sql: str, rows: List[Dict[str, Any]], max_rows: int = QUERY_RESULT_MAX_ROWS) -> Dict[str, Any]:
+    """
+    Result-shaping stage between query execution and the responder prompt:
+    - keeps at most max_rows rows
+    - adds totals, counts and min/max per numeric / date column, over ALL rows
+      (computed locally, or by the database when the result was truncated)
+    - encodes multi-row results column-wise: {"columns": [...], "rows": [[...], ...]}
+
+    Small results (0 or 1 row) are returned as-is.
+
+    Returns:
+        Fields for the query result entry: "data_fetched_from_database" and,
+        for multi-row results, "row_count", "summary" and "truncated"
+    """
+    if len(rows) <= 1:
+        return {"data_fetched_from_database": rows}
+
+    truncated = len(rows) > max_rows
+    shown_rows = rows[:max_rows]
+
+    columns = list(shown_rows[0].keys())
+    for row in shown_rows[1:]:
+        columns += [column for column in row if column not in columns]
+
+    kinds = _column_kinds(shown_rows, columns)
+    summary: Optional[Dict[str, Any]] = None
+
+    if truncated:
+        try:
+            summary = _summarize_full_result(clean_sql, kinds)
+        except (RuntimeError, LookupError) as e:
+            logger.warning("Full-result summary failed, summarizing shown rows only: %s", e)
+
+    if summary is None:
+        summary = _summarize_rows(shown_rows, kinds)
+        if truncated:
+            summary["covers_first_rows_only"] = True
+
+    shaped = {
+        "data_fetched_from_database": {
+            "columns": columns,
+            "rows": [[row.get(column) for column in columns] for row in shown_rows]
+        },
+        "row_count": summary["row_count"],
+        "summary": summary,
+        "truncated": truncated
+    }
+
+    if truncated:
+        shaped["rows_shown"] = len(shown_rows)
+        logger.info("Truncated to %s of %s rows", len(shown_rows), summary['row_count'])
+
+    return shaped
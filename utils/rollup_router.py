@@ -0,0 +1,144 @@
+import os
+import re
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from utils.execute_sql_query import execute_select_query
+from utils.local_replica import LOCAL_REPLICA_ENABLED
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("QueryRouter")
+
+# Enable once rebuild_transaction_rollups() has backfilled the rollup tables
+ROLLUP_ROUTING_ENABLED = os.getenv("ROLLUP_ROUTING_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+
+DAILY_ROLLUP_TABLE = "category_daily_rollups"
+MONTHLY_ROLLUP_TABLE = "category_monthly_rollups"
+
+UNROUTABLE_PATTERN = re.compile(r"\b(JOIN|UNION|INTERSECT|EXCEPT|OVER|DISTINCT|WITH)\b", re.IGNORECASE)
+FROM_PATTERN = re.compile(r"\bFROM\s+transactions\b(?=\s*(?:WHERE|GROUP|ORDER|LIMIT|HAVING|$))", re.IGNORECASE)
+RAW_COLUMN_PATTERN = re.compile(r"\b(amount|description|transaction_id|created_at)\b", re.IGNORECASE)
+
+SUM_PATTERN = re.compile(r"\bSUM\s*\(\s*amount\s*\)", re.IGNORECASE)
+COUNT_PATTERN = re.compile(r"\bCOUNT\s*\(\s*(?:\*|1|amount|transaction_id)\s*\)", re.IGNORECASE)
+AVG_PATTERN = re.compile(r"\bAVG\s*\(\s*amount\s*\)", re.IGNORECASE)
+
+# Date expressions that always fall on a month boundary
+MONTH_ALIGNED_BOUND = (
+    r"(?:DATE_TRUNC\s*\(\s*'(?:month|quarter|year)'\s*,\s*CURRENT_DATE\s*\)"
+    r"(?:\s*[+-]\s*INTERVAL\s*'\d+\s*(?:months?|years?)')*"
+    r"|(?:DATE\s*)?'\d{4}-\d{2}-01')"
+    r"(?!\s*[+-])"
+)
+MONTH_ALIGNED_USE = re.compile(
+    r"DATE_TRUNC\s*\(\s*'(?:month|quarter|year)'\s*,\s*date_of_transaction\s*\)"
+    r"|date_of_transaction\s*(?:>=|<)\s*" + MONTH_ALIGNED_BOUND,
+    re.IGNORECASE
+)
+
+
+def _split_top_level(text: str) -> List[str]:
+    items, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append("".join(current))
+    return items
+
+
+def _alias_bare_columns(sql: str) -> str:
+    """
+    Keeps the result column names of the original query after the rewrite:
+    - unaliased SUM(amount) / COUNT(*) / AVG(amount) are named "sum" / "count" / "avg" by Postgres
+    - a bare date_of_transaction column stays "date_of_transaction" once it reads day / month
+    """
+    select_start = re.search(r"\bSELECT\b", sql, re.IGNORECASE).end()
+    from_start = FROM_PATTERN.search(sql).start()
+
+    items = []
+    for item in _split_top_level(sql[select_start:from_start]):
+        stripped = item.strip()
+        if SUM_PATTERN.fullmatch(stripped):
+            item = f" {stripped} AS sum "
+        elif COUNT_PATTERN.fullmatch(stripped):
+            item = f" {stripped} AS count "
+        elif AVG_PATTERN.fullmatch(stripped):
+            item = f" {stripped} AS avg "
+        elif stripped.lower() == "date_of_transaction":
+            item = f" {stripped} AS date_of_transaction "
+        items.append(item)
+
+    return sql[:select_start] + ",".join(items) + sql[from_start:]
+
+
+def route_to_rollups(clean_sql: str) -> Optional[str]:
+    """
+    Rewrites a validated aggregate query over transactions to read the category
+    rollups instead, when its shape allows an exact answer:
+    SUM / COUNT / AVG of amount, grouped and filtered by category and date only.
+
+    The monthly rollup is used when every date reference is month-aligned,
+    otherwise the daily rollup (exact for any date filter).
+
+    Returns:
+        Rewritten SQL, or None when the query must run on raw transactions
+    """
+    if UNROUTABLE_PATTERN.search(clean_sql) or len(re.findall(r"\bSELECT\b", clean_sql, re.IGNORECASE)) != 1:
+        return None
+
+    if not FROM_PATTERN.search(clean_sql):
+        return None
+
+    if not (SUM_PATTERN.search(clean_sql) or COUNT_PATTERN.search(clean_sql) or AVG_PATTERN.search(clean_sql)):
+        return None
+
+    date_references = len(re.findall(r"\bdate_of_transaction\b", clean_sql, re.IGNORECASE))
+    month_aligned = len(MONTH_ALIGNED_USE.findall(clean_sql)) == date_references
+    table, date_column = (MONTHLY_ROLLUP_TABLE, "month") if month_aligned else (DAILY_ROLLUP_TABLE, "day")
+
+    sql = _alias_bare_columns(clean_sql)
+    sql = SUM_PATTERN.sub("SUM(total_amount)", sql)
+    sql = COUNT_PATTERN.sub("COALESCE(SUM(transaction_count), 0)", sql)
+    sql = AVG_PATTERN.sub("(SUM(total_amount) / NULLIF(SUM(transaction_count), 0))", sql)
+
+    # Any other use of per-transaction columns can't be answered from totals
+    if RAW_COLUMN_PATTERN.search(sql):
+        return None
+
+    # Output aliases ("... AS date_of_transaction") name result columns, they aren't references
+    sql = re.sub(r"(?<!AS )\bdate_of_transaction\b", date_column, sql, flags=re.IGNORECASE)
+    sql = FROM_PATTERN.sub(f"FROM {table}", sql)
+
+    return sql
+
+
+def execute_query_routed(clean_sql: str) -> Dict[str, Any]:
+    """
+    Query router: answers from the rollups when route_to_rollups allows it,
+    otherwise (or if that fails) runs the query on raw transactions.
+    Skipped with the local replica, where scanning transactions is already cheap.
+
+    Returns:
+        {"rows": List[Dict], "source": "rollups" | "transactions"}
+
+    Raises:
+        RuntimeError: If query execution fails
+    """
+    if ROLLUP_ROUTING_ENABLED and not LOCAL_REPLICA_ENABLED:
+        routed_sql = route_to_rollups(clean_sql)
+        if routed_sql:
+            logger.info("Answering from rollups: %s", routed_sql)
+            try:
+                return {"rows": execute_select_query(routed_sql), "source": "rollups"}
+            except RuntimeError as e:
+                logger.warning("Rollup query failed, using transactions: %s", e)
+
+    return {"rows": execute_select_query(clean_sql), "source": "transactions"}
@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import hashlib
+from typing import Optional, Dict, Tuple
+from dotenv import load_dotenv
+from core.llm import MODEL
+from core.llm_cache import SQLiteTTLCache, LLM_CACHE_PATH, LLM_CACHE_ENABLED
+from prompts.sql_query_generator import GENERATE_SQL_QUERY_TOOL_PROMPT
+from utils.validation import ALLOWED_CATEGORIES, validate_select_sql
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("SQLCache")
+
+SQL_TRANSLATION_CACHE_TTL = int(os.getenv("SQL_TRANSLATION_CACHE_TTL", str(7 * 24 * 60 * 60)))
+SQL_TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("SQL_TRANSLATION_CACHE_MAX_ENTRIES", "2000"))
+
+# Generated SQL expresses relative dates with CURRENT_DATE / DATE_TRUNC, so a
+# translation is time-independent. Prompt changes must invalidate old entries.
+_PROMPT_FINGERPRINT = hashlib.sha256(GENERATE_SQL_QUERY_TOOL_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+sql_translation_cache = SQLiteTTLCache(LLM_CACHE_PATH, "sql_translations", SQL_TRANSLATION_CACHE_MAX_ENTRIES)
+
+NUMBER_PATTERN = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+CATEGORY_ALIASES = {
+    **{category: category for category in ALLOWED_CATEGORIES},
+    "eating out": "eating_out",
+}
+CATEGORY_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(a) for a in CATEGORY_ALIASES), key=len, reverse=True)) + r")\b"
+)
+
+
+def normalize_query(natural_language_query: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Normalizes a natural language query into a reusable template.
+    Case, whitespace and punctuation are dropped; numbers and categories become slots.
+
+    "How much did I spend on Groceries in the last 7 days?"
+    → ("how much did i spend on <cat0> in the last <num0> days", {"cat0": "groceries", "num0": "7"})
+    """
+    text = natural_language_query.strip().lower()
+    text = re.sub(r"[^\w\s.\-]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip(" .")
+
+    slots = {}
+
+    def category_slot(match):
+        name = f"cat{sum(1 for s in slots if s.startswith('cat'))}"
+        slots[name] = CATEGORY_ALIASES[match.group(1)]
+        return f"<{name}>"
+
+    def number_slot(match):
+        name = f"num{sum(1 for s in slots if s.startswith('num'))}"
+        slots[name] = match.group(0)
+        return f"<{name}>"
+
+    text = CATEGORY_PATTERN.sub(category_slot, text)
+    text = NUMBER_PATTERN.sub(number_slot, text)
+
+    return text, slots
+
+
+def _cache_key(template: str) -> str:
+    return hashlib.sha256(f"{MODEL}\x00{_PROMPT_FINGERPRINT}\x00{template}".encode("utf-8")).hexdigest()
+
+
+def _slot_placeholder(name: str) -> str:
+    return f"__SLOT_{name.upper()}__"
+
+
+def _templatize_sql(sql: str, slots: Dict[str, str]) -> Optional[str]:
+    """
+    Replaces every slot value in the SQL with its placeholder.
+    Returns None when a slot can't be located unambiguously, since filling such a
+    template with other values would silently produce the wrong query.
+    """
+    if len(set(slots.values())) != len(slots):
+        return None
+
+    for name, value in slots.items():
+        if name.startswith("cat"):
+            literal = re.compile(r"'" + re.escape(value) + r"'")
+            if not literal.search(sql):
+                return None
+            sql = literal.sub(f"'{_slot_placeholder(name)}'", sql)
+        else:
+            literal = re.compile(r"(?<![\w.])" + re.escape(value) + r"(?![\w.])")
+            occurrences = len(literal.findall(sql))
+            # Short numbers (1, 7, 10) also show up for unrelated reasons; only years repeat safely
+            if occurrences == 0 or (occurrences > 1 and len(value) < 4):
+                return None
+            sql = literal.sub(_slot_placeholder(name), sql)
+
+    return sql
+
+
+def lookup_sql_translation(natural_language_query: str) -> Optional[str]:
+    """
+    Returns validated SQL for the query from the translation cache, or None on a miss.
+    """
+    if not LLM_CACHE_ENABLED or not natural_language_query:
+        return None
+
+    template, slots = normalize_query(natural_language_query)
+    cached = sql_translation_cache.get(_cache_key(template))
+    if cached is None:
+        return None
+
+    try:
+        entry = json.loads(cached)
+        sql = entry["sql_template"]
+        if set(entry["slots"]) != set(slots):
+            return None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    for name, value in slots.items():
+        sql = sql.replace(_slot_placeholder(name), value)
+
+    validation_result = validate_select_sql(sql)
+    if not validation_result["valid"]:
+        logger.warning("Cached translation failed validation: %s", validation_result['errors'])
+        return None
+
+    logger.debug("Hit for template: %s", template)
+    return validation_result["clean_data"]
+
+
+def store_sql_translation(natural_language_query: str, clean_sql: str) -> None:
+    """
+    Stores SQL that already passed validate_select_sql for reuse by equivalent queries.
+    """
+    if not LLM_CACHE_ENABLED or not natural_language_query:
+        return
+
+    template, slots = normalize_query(natural_language_query)
+    sql_template = _templatize_sql(clean_sql, slots)
+
+    if sql_template is None:
+        logger.info("Not caching, slots not found unambiguously in SQL: %s", slots)
+        return
+
+    sql_translation_cache.set(
+        _cache_key(template),
+        json.dumps({"sql_template": sql_template, "slots": list(slots)}),
+        SQL_TRANSLATION_CACHE_TTL
+    )
+
+
+def get_sql_translation_cache_stats() -> dict:
+    return sql_translation_cache.stats()
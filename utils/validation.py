@@ -1,5 +1,9 @@
 from typing import Dict, Any, List
 from datetime import datetime
+import pandas as pd
+from core.logger import get_logger
+
+logger = get_logger("Validation")
 
 ALLOWED_CATEGORIES = {
     "groceries", "transport", "eating_out", "entertainment",
@@ -7,7 +11,7 @@ ALLOWED_CATEGORIES = {
 }
 
 def validate_insert_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
-    print(f"[Validation] Validating insert payload: {payload}")
+    logger.debug("Validating insert payload: %s", payload)
 
     errors = []
     clean_data = {}
@@ -59,7 +63,7 @@ def validate_insert_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     is_valid = len(errors) == 0
 
-    print(f"[Validation] valid={is_valid}, errors={errors}, clean={clean_data}")
+    logger.debug("valid=%s, errors=%s, clean=%s", is_valid, errors, clean_data)
 
     return {
         "valid": is_valid,
@@ -67,6 +71,81 @@ def validate_insert_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
         "clean_data": clean_data
     }
 
+def validate_insert_batch(rows: List[Dict[str, Any]], absolute_amounts: bool = False) -> Dict[str, Any]:
+    """
+    Columnar version of validate_insert_payload for bulk imports: the same rules,
+    applied to whole columns of a batch at once instead of row by row.
+
+    Args:
+        rows: Raw transaction rows
+        absolute_amounts: Take abs() of amounts first, for bank exports that sign debits negative
+
+    Returns:
+        {
+            "clean_rows": List[Dict[str, Any]],   # valid rows, input order
+            "clean_indexes": List[int],           # their positions in rows
+            "rejected": List[Dict[str, Any]]      # {"index": int, "errors": List[str]}
+        }
+    """
+
+    frame = pd.DataFrame(rows, columns=["amount", "category", "description", "date_of_transaction"])
+    frame = frame.astype(object).where(frame.notna(), "MISSING")
+    row_errors = [[] for _ in range(len(frame))]
+
+    def add_errors(mask, message):
+        for index in mask.to_numpy().nonzero()[0]:
+            row_errors[index].append(message)
+
+    # -------- Amount (REQUIRED) --------
+    amount_missing = frame["amount"].eq("MISSING")
+    amounts = pd.to_numeric(frame["amount"].where(~amount_missing), errors="coerce")
+    amount_not_numeric = ~amount_missing & amounts.isna()
+    if absolute_amounts:
+        amounts = amounts.abs()
+    add_errors(amount_missing, "Amount is missing.")
+    add_errors(amount_not_numeric, "Amount must be numeric.")
+    add_errors(~amount_missing & ~amount_not_numeric & (amounts <= 0), "Amount must be greater than zero.")
+
+    # -------- Category (REQUIRED) --------
+    category_missing = frame["category"].eq("MISSING")
+    category_is_str = frame["category"].map(lambda value: isinstance(value, str))
+    categories = frame["category"].where(category_is_str, "").str.lower()
+    add_errors(category_missing, "Category is missing.")
+    add_errors(~category_missing & ~category_is_str, "Category is invalid.")
+    for index in (~category_missing & category_is_str & ~categories.isin(ALLOWED_CATEGORIES)).to_numpy().nonzero()[0]:
+        row_errors[index].append(f"Category '{categories.iat[index]}' is not allowed.")
+
+    # -------- Description (OPTIONAL) --------
+    descriptions = frame["description"].where(frame["description"].ne("MISSING"), "unspecified expense").astype(str)
+
+    # -------- Date (REQUIRED) --------
+    date_missing = frame["date_of_transaction"].eq("MISSING")
+    date_is_str = frame["date_of_transaction"].map(lambda value: isinstance(value, str))
+    add_errors(date_missing, "Date of transaction is missing.")
+    add_errors(~date_missing & ~date_is_str, "Date of transaction must be a string.")
+    dates = frame["date_of_transaction"].where(date_is_str, "").str.strip()
+
+    clean_rows, clean_indexes, rejected = [], [], []
+    for index, errors in enumerate(row_errors):
+        if errors:
+            rejected.append({"index": index, "errors": errors})
+            continue
+        clean_indexes.append(index)
+        clean_rows.append({
+            "amount": float(amounts.iat[index]),
+            "category": categories.iat[index],
+            "description": descriptions.iat[index],
+            "date_of_transaction": dates.iat[index]
+        })
+
+    logger.info("Batch of %s rows: %s valid, %s rejected", len(frame), len(clean_rows), len(rejected))
+
+    return {
+        "clean_rows": clean_rows,
+        "clean_indexes": clean_indexes,
+        "rejected": rejected
+    }
+
 def validate_select_sql(sql: str) -> Dict[str, Any]:
     """
     Validate that a SQL query is a safe SELECT query over the transactions table.
@@ -79,7 +158,7 @@ def validate_select_sql(sql: str) -> Dict[str, Any]:
         }
     """
 
-    print(f"[Validation] Validating SQL: {sql}")
+    logger.debug("Validating SQL: %s", sql)
 
     errors = []
 
@@ -112,7 +191,7 @@ def validate_select_sql(sql: str) -> Dict[str, Any]:
 
     is_valid = len(errors) == 0
 
-    print(f"[Validation] SQL valid={is_valid}, errors={errors}")
+    logger.debug("SQL valid=%s, errors=%s", is_valid, errors)
 
     return {
         "valid": is_valid,
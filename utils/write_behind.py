@@ -0,0 +1,420 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from db.storage import storage
+from utils.insert_data import insert_transactions_idempotent
+from core.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("WriteBehind")
+
+# Opt-in: needs db/write_behind.sql; without it every flush would fail after the user was told "saved"
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+WRITE_BEHIND_JOURNAL_PATH = os.getenv("WRITE_BEHIND_JOURNAL_PATH", "write_behind.db")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "2"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "60"))
+# A row the database rejects on its own this many times (while taking other writes) is set aside
+WRITE_BEHIND_MAX_ATTEMPTS = max(1, int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "8")))
+# Flushed entries are kept this long so provisional IDs can still be resolved
+WRITE_BEHIND_RETAIN_SECONDS = float(os.getenv("WRITE_BEHIND_RETAIN_SECONDS", str(24 * 60 * 60)))
+
+
+class TransactionJournal:
+    """
+    Durable local journal of transactions waiting to be written to Supabase.
+    - Appended before the insert is acknowledged, committed with synchronous=FULL
+    - Each entry carries the idempotency key used for the Supabase insert
+    - Failed flushes back off exponentially per entry; an entry the database keeps
+      rejecting is dead-lettered (kept for inspection, never flushed or overlaid)
+    - Entries being flushed are "in flight": they may already be committed upstream
+      before mark_flushed, so the pending overlay leaves them out
+    - Safe to share across threads (one connection behind a lock)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_transactions (
+                    idempotency_key TEXT PRIMARY KEY,
+                    provisional_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    flushed_at REAL,
+                    transaction_id TEXT,
+                    rejections INTEGER NOT NULL DEFAULT 0,
+                    dead_lettered_at REAL
+                )
+            """)
+            # Journal written by an older version
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(pending_transactions)")}
+            for column, definition in (("rejections", "INTEGER NOT NULL DEFAULT 0"), ("dead_lettered_at", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE pending_transactions ADD COLUMN {column} {definition}")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_pending_transactions_due
+                ON pending_transactions (flushed_at, next_attempt_at)
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def append(self, expense: Dict[str, Any]) -> Dict[str, str]:
+        idempotency_key = uuid.uuid4().hex
+        provisional_id = f"pending-{idempotency_key[:12]}"
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    """INSERT INTO pending_transactions
+                       (idempotency_key, provisional_id, payload, created_at, next_attempt_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (idempotency_key, provisional_id, json.dumps(expense), now, now)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                raise RuntimeError(f"Failed to journal transaction: {e}")
+
+        return {"idempotency_key": idempotency_key, "provisional_id": provisional_id}
+
+    def due(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Unflushed entries whose backoff has passed, oldest first.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                """SELECT idempotency_key, payload, attempts, rejections FROM pending_transactions
+                   WHERE flushed_at IS NULL AND dead_lettered_at IS NULL AND next_attempt_at <= ?
+                   ORDER BY created_at LIMIT ?""",
+                (time.time(), limit)
+            ).fetchall()
+
+        return [
+            {**json.loads(payload), "idempotency_key": key, "attempts": attempts, "rejections": rejections}
+            for key, payload, attempts, rejections in rows
+        ]
+
+    def begin_flush(self, keys: List[str]) -> None:
+        with self._lock:
+            self._in_flight.update(keys)
+
+    def end_flush(self, keys: List[str]) -> None:
+        with self._lock:
+            self._in_flight.difference_update(keys)
+
+    def mark_flushed(self, transaction_ids: Dict[str, Any]) -> None:
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "UPDATE pending_transactions SET flushed_at = ?, transaction_id = ?, last_error = NULL WHERE idempotency_key = ?",
+                [(now, str(transaction_id), key) for key, transaction_id in transaction_ids.items()]
+            )
+            conn.execute(
+                "DELETE FROM pending_transactions WHERE flushed_at IS NOT NULL AND flushed_at < ?",
+                (now - WRITE_BEHIND_RETAIN_SECONDS,)
+            )
+            conn.commit()
+
+    def mark_failed(self, entries: List[Dict[str, Any]], error: str, rejected: bool = False) -> bool:
+        """
+        Backs the entries off. rejected=True means the database refused the entry itself
+        (not an outage); the WRITE_BEHIND_MAX_ATTEMPTS-th rejection dead-letters it.
+
+        Returns:
+            True when the entries were dead-lettered
+        """
+        now = time.time()
+        dead_letter = rejected and all(entry["rejections"] + 1 >= WRITE_BEHIND_MAX_ATTEMPTS for entry in entries)
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                """UPDATE pending_transactions
+                   SET attempts = attempts + 1, rejections = rejections + ?,
+                       next_attempt_at = ?, last_error = ?, dead_lettered_at = ?
+                   WHERE idempotency_key = ?""",
+                [
+                    (
+                        int(rejected),
+                        now + min(2 ** entry["attempts"], WRITE_BEHIND_MAX_BACKOFF),
+                        error,
+                        now if dead_letter else None,
+                        entry["idempotency_key"]
+                    )
+                    for entry in entries
+                ]
+            )
+            conn.commit()
+
+        return dead_letter
+
+    def pending(self, include_in_flight: bool = False) -> List[Dict[str, Any]]:
+        """
+        Unflushed entries, oldest first. In-flight entries are left out by default:
+        counting them on top of upstream reads could count them twice (at worst
+        they are briefly missing from an overlay instead).
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                """SELECT idempotency_key, provisional_id, payload FROM pending_transactions
+                   WHERE flushed_at IS NULL AND dead_lettered_at IS NULL ORDER BY created_at"""
+            ).fetchall()
+            in_flight = set() if include_in_flight else set(self._in_flight)
+
+        return [
+            {**json.loads(payload), "transaction_id": provisional_id}
+            for key, provisional_id, payload in rows
+            if key not in in_flight
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending, failing, oldest, dead_lettered = self._connection().execute(
+                """SELECT SUM(dead_lettered_at IS NULL),
+                          SUM(dead_lettered_at IS NULL AND attempts > 0),
+                          MIN(CASE WHEN dead_lettered_at IS NULL THEN created_at END),
+                          SUM(dead_lettered_at IS NOT NULL)
+                   FROM pending_transactions
+                   WHERE flushed_at IS NULL"""
+            ).fetchone()
+
+        return {
+            "pending": pending or 0,
+            "failing": failing or 0,
+            "dead_lettered": dead_lettered or 0,
+            "oldest_pending_age_s": round(time.time() - oldest, 1) if oldest else 0.0
+        }
+
+
+transaction_journal = TransactionJournal(WRITE_BEHIND_JOURNAL_PATH)
+
+_flush_lock = threading.Lock()
+_worker_lock = threading.Lock()
+_worker_thread: Optional[threading.Thread] = None
+_wake_worker = threading.Event()
+_schema_checked = False
+_schema_ready = False
+
+
+def write_behind_active() -> bool:
+    """
+    True when write-behind is enabled and the database can take idempotent inserts.
+    The schema is checked once per process; without it inserts stay synchronous.
+    """
+    global _schema_checked, _schema_ready
+
+    if not WRITE_BEHIND_ENABLED:
+        return False
+
+    with _worker_lock:
+        if not _schema_checked:
+            _schema_ready = storage.supports_idempotent_inserts()
+            _schema_checked = True
+            if not _schema_ready:
+                logger.warning("Write-behind disabled: apply db/write_behind.sql and db/transaction_aggregates.sql")
+
+    return _schema_ready
+
+
+def _flush_batch(entries: List[Dict[str, Any]], counts: Dict[str, int]) -> bool:
+    """
+    Inserts a batch of due journal entries. When the insert fails but the database
+    still takes writes, the batch holds a bad row: it is split in halves until that
+    row is on its own, so its batch-mates go through and only the row backs off
+    (and is dead-lettered after WRITE_BEHIND_MAX_ATTEMPTS such rejections).
+
+    Returns:
+        False when the database looks unreachable and the flush should stop
+
+    Raises:
+        sqlite3.Error: If the journal can't be updated
+    """
+    keys = [entry["idempotency_key"] for entry in entries]
+    transaction_journal.begin_flush(keys)
+    try:
+        insert_result = insert_transactions_idempotent(entries)
+    except RuntimeError as e:
+        error = str(e)
+    else:
+        transaction_journal.mark_flushed(insert_result["transaction_ids"])
+        counts["flushed"] += len(entries)
+        return True
+    finally:
+        transaction_journal.end_flush(keys)
+
+    # Same empty call as the schema check: it only succeeds while the database is reachable
+    if not storage.supports_idempotent_inserts():
+        logger.warning("Flush of %s transactions failed, will retry: %s", len(entries), error)
+        transaction_journal.mark_failed(entries, error)
+        counts["failed"] += len(entries)
+        return False
+
+    if len(entries) > 1:
+        middle = len(entries) // 2
+        logger.info("Flush of %s transactions rejected, splitting the batch: %s", len(entries), error)
+        return _flush_batch(entries[:middle], counts) and _flush_batch(entries[middle:], counts)
+
+    entry = entries[0]
+    if transaction_journal.mark_failed(entries, error, rejected=True):
+        logger.error("Dead-lettered transaction %s after %s rejections: %s", entry["idempotency_key"], entry["rejections"] + 1, error)
+        counts["dead_lettered"] += 1
+    else:
+        logger.warning("Transaction %s rejected, will retry: %s", entry["idempotency_key"], error)
+        counts["failed"] += 1
+
+    return True
+
+
+def flush_pending_transactions() -> Dict[str, int]:
+    """
+    Writes every due journal entry to Supabase in batches.
+    Failed entries stay in the journal and are retried after a backoff;
+    see _flush_batch for rows the database keeps rejecting.
+
+    Returns:
+        {"flushed": int, "failed": int, "dead_lettered": int}
+    """
+    counts = {"flushed": 0, "failed": 0, "dead_lettered": 0}
+
+    with _flush_lock:
+        while True:
+            try:
+                entries = transaction_journal.due(WRITE_BEHIND_BATCH_SIZE)
+            except sqlite3.Error as e:
+                logger.warning("Reading journal failed: %s", e)
+                break
+
+            if not entries:
+                break
+
+            try:
+                if not _flush_batch(entries, counts):
+                    break
+            except sqlite3.Error as e:
+                # Rows inserted before the journal update are skipped as duplicates on the next flush
+                logger.warning("Updating journal failed: %s", e)
+                break
+
+    if counts["flushed"]:
+        logger.info("Flushed %s transactions", counts["flushed"])
+
+    return counts
+
+
+def _flush_loop():
+    while True:
+        _wake_worker.wait(WRITE_BEHIND_FLUSH_INTERVAL)
+        _wake_worker.clear()
+        try:
+            flush_pending_transactions()
+        except Exception as e:
+            logger.warning("Flush worker error: %s", e)
+
+
+def start_flush_worker() -> None:
+    """
+    Starts the background flush worker once per process. Entries left in the
+    journal by a previous run are flushed on its first pass.
+    Does nothing unless write_behind_active().
+    """
+    global _worker_thread
+
+    if not write_behind_active():
+        return
+
+    with _worker_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_flush_loop, name="write-behind-flush", daemon=True)
+        _worker_thread.start()
+        logger.info("Flush worker started")
+
+
+def enqueue_transaction(expense: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write-behind insert: journals the transaction locally and acknowledges it with
+    a provisional ID; the flush worker writes it to Supabase shortly after.
+
+    Returns:
+        {"transaction_id": provisional ID, "provisional": True}
+
+    Raises:
+        RuntimeError: If the transaction couldn't be journaled
+    """
+    entry = transaction_journal.append(expense)
+    logger.info("Journaled transaction %s", entry['provisional_id'])
+
+    start_flush_worker()
+    _wake_worker.set()
+
+    return {"transaction_id": entry["provisional_id"], "provisional": True}
+
+
+def get_pending_transactions() -> List[Dict[str, Any]]:
+    """
+    Journaled transactions not yet written to Supabase, oldest first.
+    Reads merge these so a just-added expense is visible before it's flushed.
+    Entries in the middle of a flush are left out (see TransactionJournal).
+    """
+    if not WRITE_BEHIND_ENABLED:
+        return []
+
+    try:
+        return transaction_journal.pending()
+    except sqlite3.Error as e:
+        logger.warning("Reading journal failed: %s", e)
+        return []
+
+
+def flush_before_read() -> List[Dict[str, Any]]:
+    """
+    Read-your-writes for queries that run on Supabase: flushes due entries first.
+
+    Returns:
+        Transactions still unflushed afterwards (e.g. during an outage)
+    """
+    if not WRITE_BEHIND_ENABLED:
+        return []
+
+    # In-flight entries count here: the flush below waits for the running one to finish
+    try:
+        if not transaction_journal.pending(include_in_flight=True):
+            return []
+    except sqlite3.Error as e:
+        logger.warning("Reading journal failed: %s", e)
+        return []
+
+    flush_pending_transactions()
+    return get_pending_transactions()
+
+
+def get_write_behind_stats() -> Dict[str, Any]:
+    try:
+        journal_stats = transaction_journal.stats()
+    except sqlite3.Error:
+        journal_stats = {}
+
+    return {"enabled": WRITE_BEHIND_ENABLED, "schema_ready": _schema_ready if _schema_checked else None, **journal_stats}